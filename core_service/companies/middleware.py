@@ -1,6 +1,7 @@
 from django.http import JsonResponse
-from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from companies.models import Company
+from companies.subscriptions import get_subscription_status, is_subscription_status_valid
 
 class SubscriptionMiddleware:
     def __init__(self, get_response):
@@ -22,22 +23,20 @@ class SubscriptionMiddleware:
                 'error': 'No company associated with this user'
             }, status=403)
 
-        try:
-            company = Company.objects.get(id=company_id)
-            
-            # Check if subscription is valid
-            if not company.is_subscription_valid():
-                return JsonResponse({
-                    'error': 'Subscription has expired',
-                    'expired_at': company.subscription_expiration_date.isoformat() if company.subscription_expiration_date else None
-                }, status=403)
-
-            # Add company to request for easy access in views
-            request.company = company
-            
-        except Company.DoesNotExist:
+        subscription = get_subscription_status(company_id)
+        if not subscription['exists']:
             return JsonResponse({
                 'error': 'Company not found'
             }, status=403)
 
-        return self.get_response(request) 
\ No newline at end of file
+        # Check if subscription is valid
+        if not is_subscription_status_valid(subscription):
+            return JsonResponse({
+                'error': 'Subscription has expired',
+                'expired_at': subscription['expires_at'].isoformat() if subscription['expires_at'] else None
+            }, status=403)
+
+        # Add company to request for easy access in views; only loaded if used
+        request.company = SimpleLazyObject(lambda: Company.objects.get(id=company_id))
+
+        return self.get_response(request)
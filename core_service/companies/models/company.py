@@ -1,5 +1,8 @@
 import uuid
-from django.db import models
+from functools import partial
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 from datetime import timedelta
 from companies.models.currency import Currency
@@ -69,4 +72,16 @@ class Company(models.Model):
     duration = months or (self.subscription_plan.duration_in_months if self.subscription_plan else 1)
     self.subscription_expiration_date = now + timedelta(days=30 * duration)
     self.save()
-    return True
\ No newline at end of file
+    return True
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_cached_subscription(sender, instance, **kwargs):
+  """
+  Drop the cached subscription state used by SubscriptionMiddleware (e.g.
+  after renew_subscription) once the change commits; evicting earlier would
+  let a concurrent request cache the old state again for the full TTL.
+  """
+  from companies.subscriptions import invalidate_subscription_status
+  transaction.on_commit(partial(invalidate_subscription_status, instance.id))
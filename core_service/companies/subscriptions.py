@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from core_auth.utils import TTLCache
+from companies.models.company import Company
+
+# Per-process cache of company subscription state, keyed by company id.
+# Entries are dropped by the Company post_save/post_delete signal handlers;
+# the TTL bounds staleness for changes made by other processes.
+subscription_cache = TTLCache(
+    ttl=settings.SUBSCRIPTION_CACHE_TTL,
+    maxsize=settings.SUBSCRIPTION_CACHE_SIZE
+)
+
+
+def shared_cache():
+    """The cache backend shared across workers, if one is configured."""
+    alias = settings.SUBSCRIPTION_SHARED_CACHE
+    return caches[alias] if alias else None
+
+
+def shared_cache_key(company_id):
+    return f'company-subscription:{company_id}'
+
+
+def load_subscription_status(company_id):
+    company = Company.objects.filter(id=company_id).values(
+        'is_active', 'subscription_expiration_date'
+    ).first()
+    if company is None:
+        return {'exists': False, 'is_active': False, 'expires_at': None}
+    return {
+        'exists': True,
+        'is_active': company['is_active'],
+        'expires_at': company['subscription_expiration_date'],
+    }
+
+
+def get_subscription_status(company_id):
+    """
+    Return a company's subscription state as a dict with `exists`,
+    `is_active` and `expires_at`, from the local cache, then the shared
+    cache, then the database.
+    """
+    key = str(company_id)
+    status = subscription_cache.get(key)
+    if status is not None:
+        return status
+
+    shared = shared_cache()
+    if shared is not None:
+        status = shared.get(shared_cache_key(key))
+
+    if status is None:
+        status = load_subscription_status(company_id)
+        if shared is not None:
+            shared.set(shared_cache_key(key), status, settings.SUBSCRIPTION_CACHE_TTL)
+
+    subscription_cache.set(key, status)
+    return status
+
+
+def is_subscription_status_valid(status):
+    """Mirror of Company.is_subscription_valid for a cached status."""
+    if not status['expires_at']:
+        return False
+    return timezone.now() <= status['expires_at']
+
+
+def invalidate_subscription_status(company_id):
+    key = str(company_id)
+    subscription_cache.delete(key)
+    shared = shared_cache()
+    if shared is not None:
+        shared.delete(shared_cache_key(key))
@@ -1,3 +1,63 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
+import uuid
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from core_auth.utils import StatelessUser, TTLCache
+from companies import subscriptions
+from companies.middleware import SubscriptionMiddleware
+from companies.models import Company
 
-# Create your tests here.
+
+class SubscriptionMiddlewareTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(subscriptions, 'subscription_cache', TTLCache(ttl=60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.middleware = SubscriptionMiddleware(lambda request: HttpResponse('ok'))
+        self.company = Company.objects.create(
+            name='Subscribed Company',
+            subscription_expiration_date=timezone.now() + timedelta(days=30)
+        )
+
+    def call(self, company_id):
+        request = RequestFactory().get('/')
+        request.user = StatelessUser({'id': 'user-1', 'company_id': company_id})
+        return self.middleware(request)
+
+    def test_valid_subscription_is_looked_up_once(self):
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                self.assertEqual(self.call(self.company.id).status_code, 200)
+
+    def test_rejects_expired_unknown_and_missing_companies(self):
+        Company.objects.filter(id=self.company.id).update(
+            subscription_expiration_date=timezone.now() - timedelta(days=1)
+        )
+
+        self.assertEqual(self.call(self.company.id).status_code, 403)
+        self.assertEqual(self.call(uuid.uuid4()).status_code, 403)
+        self.assertEqual(self.call('').status_code, 403)
+
+    def test_saving_the_company_drops_the_cached_state(self):
+        self.company.subscription_expiration_date = timezone.now() - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company.save()
+        self.assertEqual(self.call(self.company.id).status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company.renew_subscription(months=1)
+        self.assertEqual(self.call(self.company.id).status_code, 200)
+
+    def test_cached_state_is_dropped_only_on_commit(self):
+        self.assertEqual(self.call(self.company.id).status_code, 200)
+        self.company.subscription_expiration_date = timezone.now() - timedelta(days=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company.save()
+            # Until the change commits, other requests keep the committed state
+            self.assertIsNotNone(subscriptions.subscription_cache.get(str(self.company.id)))
+
+        self.assertIsNone(subscriptions.subscription_cache.get(str(self.company.id)))
+        self.assertEqual(self.call(self.company.id).status_code, 403)
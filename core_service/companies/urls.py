@@ -3,7 +3,8 @@ from companies.views.company import (
     CompanyListView, 
     CompanyDetailView,
     CompanySubscriptionCheckView,
-    CompanySubscriptionRenewView
+    CompanySubscriptionRenewView,
+    SubscriptionCacheStatsView
 )
 from companies.views.store import (
     StoreListView,
@@ -20,6 +21,7 @@ urlpatterns = [
     path('companies/<uuid:id>/', CompanyDetailView.as_view(), name='company-detail'),
     path('companies/<uuid:id>/subscription/check/', CompanySubscriptionCheckView.as_view(), name='company-subscription-check'),
     path('companies/<uuid:id>/subscription/renew/', CompanySubscriptionRenewView.as_view(), name='company-subscription-renew'),
+    path('companies/subscription-cache/stats/', SubscriptionCacheStatsView.as_view(), name='subscription-cache-stats'),
     
     # Subscription plan endpoints
     path('subscription-plans/', SubscriptionPlanListView.as_view(), name='subscription-plan-list'),
@@ -6,6 +6,7 @@ from rest_framework.request import Request
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 from companies.models import Company
 from companies.serializers.company import CompanySerializer
+from companies.subscriptions import subscription_cache
 from django.utils import timezone
 import logging
 
@@ -172,4 +173,15 @@ class CompanySubscriptionRenewView(APIView):
             return Response(
                 {'error': 'Invalid months value'},
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+class SubscriptionCacheStatsView(APIView):
+    @extend_schema(
+        description="Hit/miss counters of the subscription cache used by SubscriptionMiddleware (for the worker process that serves the request)",
+        responses={
+            200: OpenApiResponse(description="Cache statistics retrieved successfully"),
+            401: OpenApiResponse(description="Unauthorized")
+        }
+    )
+    def get(self, request: Request):
+        return Response(subscription_cache.stats(), status=status.HTTP_200_OK)
@@ -1,91 +1,144 @@
 # core_service/core_service/authentication.py
 import requests
 from rest_framework import authentication, exceptions
-from core_auth.utils import StatelessUser
-import os
-import json
+from core_auth.utils import StatelessUser, TTLCache
 import logging
+import time
 import jwt
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+# Claims the user service embeds in access tokens
+PROFILE_CLAIMS = ('email', 'role', 'company_id', 'first_name', 'last_name')
+
+# Profiles fetched from the user service for tokens issued without claims,
+# keyed by user id (or by token when tokens cannot be verified locally)
+user_profile_cache = TTLCache(ttl=settings.USER_PROFILE_CACHE_TTL, maxsize=10000)
+
+# Keep-alive connection to the user service for cache misses
+user_service_session = requests.Session()
+
+
+def decode_token(token):
+    """
+    Verify the token's signature and expiry against the shared signing key.
+    Returns (payload, verified); without a configured key the payload is
+    decoded unverified and must be checked by the user service.
+    """
+    if not settings.JWT_SIGNING_KEY:
+        return jwt.decode(token, options={"verify_signature": False}), False
+
+    try:
+        payload = jwt.decode(
+            token,
+            settings.JWT_SIGNING_KEY,
+            algorithms=[settings.JWT_ALGORITHM],
+            options={"require": ["exp", "user_id"]}
+        )
+    except jwt.ExpiredSignatureError:
+        raise exceptions.AuthenticationFailed('Token has expired')
+    except jwt.InvalidTokenError as e:
+        logger.warning(f"Token verification failed: {str(e)}")
+        raise exceptions.AuthenticationFailed('Invalid token')
+
+    if payload.get('token_type', 'access') != 'access':
+        raise exceptions.AuthenticationFailed('Invalid token type')
+
+    return payload, True
+
+
+def fetch_user_profile(token):
+    """Ask the user service to verify a token and return the user's profile, or None."""
+    if not settings.USER_SERVICE_URL:
+        return None
+
+    verify_url = f"{settings.USER_SERVICE_URL.rstrip('/')}/auth/verify-token/"
+    try:
+        response = user_service_session.post(
+            verify_url,
+            headers={'Authorization': f'Bearer {token}'},
+            timeout=settings.USER_SERVICE_TIMEOUT,
+            json={'token': token},
+            verify=False
+        )
+    except requests.RequestException as e:
+        logger.warning(f"Failed to get additional user info from user service: {str(e)}")
+        return None
+
+    if not response.ok:
+        return None
+
+    try:
+        data = response.json()
+    except ValueError:
+        logger.warning(f"User service returned a non-JSON response with status {response.status_code}")
+        raise exceptions.AuthenticationFailed('Unable to verify token')
+
+    if not isinstance(data, dict) or not data.get('is_valid'):
+        return None
+    return {claim: data[claim] for claim in PROFILE_CLAIMS if claim in data}
+
+
 class UserServiceAuthentication(authentication.BaseAuthentication):
     def authenticate(self, request):
-        print('mahfouz')
         # Extract token from Authorization header
         auth_header = request.META.get('HTTP_AUTHORIZATION')
-        logger.info(f"Authentication attempt - Authorization header present: {bool(auth_header)}")
 
         if not auth_header:
-            logger.warning("No Authorization header found in request")
+            logger.debug("No Authorization header found in request")
             return None
-        
+
         # Handle both "Bearer token" and "Bearer Bearer token" formats
         parts = auth_header.split()
-        
+
         if len(parts) == 2:
             token = parts[1]
         elif len(parts) == 3 and parts[0] == 'Bearer' and parts[1] == 'Bearer':
             token = parts[2]
         else:
-            logger.warning(f"Invalid Authorization header format: {auth_header}")
+            logger.warning("Invalid Authorization header format")
             return None
-            
-        logger.info("Token successfully extracted from header")
-        
+
         try:
-            # First try to decode the token to get user_id
-            decoded_token = jwt.decode(token, options={"verify_signature": False})
-            logger.info(f"Decoded token payload: {decoded_token}")
-            
-            user_id = decoded_token.get('user_id')
-            if not user_id:
-                logger.error("No user_id found in token")
-                raise exceptions.AuthenticationFailed('Invalid token: no user_id')
-
-            # Create basic user data from token
-            user_data = {
-                'id': user_id,
-                'is_active': True
-            }
-            
-            # Get User Service URL from environment
-            user_service_url = os.getenv('USER_SERVICE_URL')
-            logger.info(f"Using USER_SERVICE_URL: {user_service_url}")
-            
-            if user_service_url:
-                verify_url = f"{user_service_url.rstrip('/')}/auth/verify-token/"
-                headers = {'Authorization': f'Bearer {token}'}
-                
-                try:
-                    logger.info(f"Making verification request to: {verify_url}")
-                    response = requests.post(
-                        verify_url, 
-                        headers=headers, 
-                        timeout=30,
-                        json={'token': token},
-                        verify=False
-                    )
-                    
-                    if response.ok:
-                        data = response.json()
-                        if data.get('is_valid'):
-                            # Update user data with additional info from user service
-                            user_info = data
-                            if user_info:
-                                user_data.update(user_info)
-                except Exception as e:
-                    logger.warning(f"Failed to get additional user info from user service: {str(e)}")
-                    # Continue with basic user data since we have the user_id from token
-            
-            user = StatelessUser(user_data=user_data)
-            logger.info(f"Successfully created StatelessUser with ID: {user.id}")
-            return (user, token)
-            
+            decoded_token, verified = decode_token(token)
         except jwt.DecodeError as e:
             logger.error(f"Failed to decode token: {str(e)}")
             raise exceptions.AuthenticationFailed('Invalid token format')
-        except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
-            raise exceptions.AuthenticationFailed('Authentication failed')
\ No newline at end of file
+
+        user_id = decoded_token.get('user_id')
+        if not user_id:
+            logger.error("No user_id found in token")
+            raise exceptions.AuthenticationFailed('Invalid token: no user_id')
+
+        # Create basic user data from token
+        user_data = {
+            'id': user_id,
+            'is_active': True
+        }
+
+        claims = {claim: decoded_token[claim] for claim in PROFILE_CLAIMS if claim in decoded_token}
+        if verified and 'role' in claims and 'company_id' in claims:
+            # Signed profile claims: nothing else to look up
+            user_data.update(claims)
+        else:
+            # Tokens issued before claims were embedded (or that we cannot
+            # verify ourselves) fall back to the user service, cached
+            cache_key = user_id if verified else token
+            profile = user_profile_cache.get(cache_key)
+            if profile is None:
+                profile = fetch_user_profile(token)
+                if profile is not None:
+                    user_profile_cache.set(cache_key, profile, ttl=self.cache_ttl(decoded_token, verified))
+            if profile:
+                user_data.update(profile)
+
+        user = StatelessUser(user_data=user_data)
+        return (user, token)
+
+    def cache_ttl(self, decoded_token, verified):
+        # An unverified token's profile must not outlive the token itself
+        exp = decoded_token.get('exp')
+        if verified or not exp:
+            return None
+        return max(0, min(settings.USER_PROFILE_CACHE_TTL, exp - time.time()))
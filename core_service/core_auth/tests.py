@@ -1,3 +1,119 @@
-from django.test import TestCase
+import time
+from unittest import mock
+import jwt
+from django.test import SimpleTestCase, override_settings
+from rest_framework import exceptions
+from rest_framework.test import APIRequestFactory
+from core_auth import authentication
+from core_auth.authentication import UserServiceAuthentication, decode_token, fetch_user_profile
+from core_auth.utils import TTLCache
 
-# Create your tests here.
+SIGNING_KEY = 'test-signing-key'
+
+
+def make_token(key=SIGNING_KEY, **claims):
+    payload = {'user_id': 'user-1', 'exp': int(time.time()) + 60, 'token_type': 'access', **claims}
+    return jwt.encode(payload, key, algorithm='HS256')
+
+
+def profile_response(status_code=200, data=None, body=None):
+    response = mock.Mock(status_code=status_code, ok=status_code < 400)
+    if body is not None:
+        response.json.side_effect = ValueError(body)
+    else:
+        response.json.return_value = data
+    return response
+
+
+@override_settings(JWT_SIGNING_KEY=SIGNING_KEY, JWT_ALGORITHM='HS256')
+class DecodeTokenTests(SimpleTestCase):
+    def test_valid_token_is_verified(self):
+        payload, verified = decode_token(make_token(role='admin'))
+        self.assertTrue(verified)
+        self.assertEqual(payload['role'], 'admin')
+
+    def test_rejects_expired_forged_and_refresh_tokens(self):
+        for token in (
+            make_token(exp=int(time.time()) - 1),
+            make_token(key='another-key'),
+            make_token(token_type='refresh'),
+            jwt.encode({'exp': int(time.time()) + 60}, SIGNING_KEY, algorithm='HS256'),
+        ):
+            with self.subTest(token=token), self.assertRaises(exceptions.AuthenticationFailed):
+                decode_token(token)
+
+    @override_settings(JWT_SIGNING_KEY=None)
+    def test_without_signing_key_decodes_unverified(self):
+        payload, verified = decode_token(make_token(key='any-key'))
+        self.assertFalse(verified)
+        self.assertEqual(payload['user_id'], 'user-1')
+
+
+@override_settings(
+    JWT_SIGNING_KEY=SIGNING_KEY, JWT_ALGORITHM='HS256',
+    USER_SERVICE_URL='http://users.test', USER_SERVICE_TIMEOUT=1
+)
+class UserServiceAuthenticationTests(SimpleTestCase):
+    def setUp(self):
+        cache = TTLCache(ttl=60)
+        patcher = mock.patch.object(authentication, 'user_profile_cache', cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = cache
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return UserServiceAuthentication().authenticate(request)
+
+    def test_signed_claims_skip_the_user_service(self):
+        with mock.patch.object(authentication.user_service_session, 'post') as post:
+            user, _ = self.authenticate(make_token(role='admin', company_id='company-1'))
+
+        post.assert_not_called()
+        self.assertEqual((user.role, user.company_id), ('admin', 'company-1'))
+
+    def test_profile_is_fetched_once_per_user(self):
+        response = profile_response(data={'is_valid': True, 'role': 'staff', 'company_id': 'company-1'})
+        with mock.patch.object(authentication.user_service_session, 'post', return_value=response) as post:
+            first, _ = self.authenticate(make_token())
+            second, _ = self.authenticate(make_token(exp=int(time.time()) + 120))
+
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual((first.role, second.role), ('staff', 'staff'))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_failed_lookup_is_not_cached(self):
+        with mock.patch.object(authentication.user_service_session, 'post', return_value=profile_response(503)) as post:
+            self.authenticate(make_token())
+            user, _ = self.authenticate(make_token())
+
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(user.role, '')
+
+    def test_non_json_response_fails_authentication(self):
+        response = profile_response(body='<html>Bad gateway</html>')
+        with mock.patch.object(authentication.user_service_session, 'post', return_value=response):
+            with self.assertRaises(exceptions.AuthenticationFailed):
+                fetch_user_profile(make_token())
+
+
+class TTLCacheTests(SimpleTestCase):
+    def test_entries_expire(self):
+        cache = TTLCache(ttl=60)
+        with mock.patch('core_auth.utils.time.monotonic', return_value=100.0):
+            cache.set('key', 'value')
+            cache.set('short', 'value', ttl=5)
+        with mock.patch('core_auth.utils.time.monotonic', return_value=110.0):
+            self.assertEqual(cache.get('key'), 'value')
+            self.assertIsNone(cache.get('short'))
+        with mock.patch('core_auth.utils.time.monotonic', return_value=161.0):
+            self.assertIsNone(cache.get('key'))
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(ttl=60, maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
@@ -1,4 +1,7 @@
 # core_service/core/utils.py
+import threading
+import time
+from collections import OrderedDict
 from django.contrib.auth.models import AnonymousUser
 
 class StatelessUser(AnonymousUser):
@@ -16,4 +19,52 @@ class StatelessUser(AnonymousUser):
         return True
     
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.email
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache whose entries expire after `ttl` seconds.
+    Once `maxsize` entries are held the least recently used one is evicted.
+    """
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
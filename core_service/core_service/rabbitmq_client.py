@@ -13,6 +13,7 @@ class RabbitMQClient:
     def __init__(self):
         self.connection = None
         self.channel = None
+        self.confirming = False
         
     def connect(self):
         """Connect to CloudAMQP with improved SSL handling"""
@@ -48,6 +49,7 @@ class RabbitMQClient:
             
             self.connection = pika.BlockingConnection(connection_params)
             self.channel = self.connection.channel()
+            self.confirming = False
             
             # Declare the queue (create if doesn't exist)
             self.channel.queue_declare(queue='low_stock_notifications', durable=True)
@@ -117,6 +119,59 @@ class RabbitMQClient:
         
         return False
     
+    def publish_batch(self, queue, messages):
+        """
+        Publish messages to a durable queue with publisher confirms, in order.
+        Returns (confirmed, rejected): how many were confirmed by the broker,
+        publishing stopping at the first message that is not, and whether that
+        message was nacked or unroutable rather than lost with the connection.
+
+        pika's BlockingChannel waits for each confirm before returning from
+        basic_publish and cannot keep several outstanding, so a batch costs
+        one broker round trip per message. That is accepted here: waiting per
+        message is what lets a nack stop the batch at the failing message.
+        Relays that need more throughput run side by side, as relay_outbox
+        supports.
+        """
+        if not self.connection or self.connection.is_closed:
+            if not self.connect():
+                return 0, False
+
+        try:
+            if not self.confirming:
+                self.channel.confirm_delivery()
+                self.confirming = True
+            self.channel.queue_declare(queue=queue, durable=True)
+        except Exception as e:
+            logger.error(f"Failed to prepare channel for queue {queue}: {e}")
+            self.close()
+            return 0, False
+
+        confirmed = 0
+        for message in messages:
+            try:
+                # Blocks until the broker confirms; raises if it nacks
+                self.channel.basic_publish(
+                    exchange='',
+                    routing_key=queue,
+                    body=json.dumps(message),
+                    properties=pika.BasicProperties(
+                        delivery_mode=2,  # Make message persistent
+                        content_type='application/json'
+                    ),
+                    mandatory=True
+                )
+            except (pika.exceptions.UnroutableError, pika.exceptions.NackError) as e:
+                logger.error(f"Broker rejected message for queue {queue}: {e}")
+                return confirmed, True
+            except (pika.exceptions.AMQPError, ssl.SSLError, OSError) as e:
+                logger.warning(f"Connection lost while publishing to {queue}: {e}")
+                self.close()
+                break
+            confirmed += 1
+
+        return confirmed, False
+
     def close(self):
         """Close connection safely"""
         try:
@@ -13,6 +13,13 @@ SECRET_KEY = os.getenv('SECRET_KEY', default='-asdf&*YJHKP908yuik')
 DEBUG = os.getenv('DEBUG', default='True').lower() == 'true'
 USER_SERVICE_URL = os.getenv('USER_SERVICE_URL')
 print("USER_SERVICE_URL loaded:", USER_SERVICE_URL)
+USER_SERVICE_TIMEOUT = int(os.getenv('USER_SERVICE_TIMEOUT', 5))
+
+# Access tokens are issued by the user service; sharing its signing key lets
+# them be verified locally instead of calling /auth/verify-token/ per request
+JWT_SIGNING_KEY = os.getenv('JWT_SECRET_KEY')
+JWT_ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
+USER_PROFILE_CACHE_TTL = int(os.getenv('USER_PROFILE_CACHE_TTL', 300))
 
 ALLOWED_HOSTS = ['*']
 
@@ -49,6 +56,15 @@ MIDDLEWARE = [
     'companies.middleware.SubscriptionMiddleware',
 ]
 
+# SubscriptionMiddleware caches each company's subscription state per process;
+# set SUBSCRIPTION_SHARED_CACHE to a CACHES alias to share it across workers
+SUBSCRIPTION_CACHE_TTL = int(os.getenv('SUBSCRIPTION_CACHE_TTL', 60))
+SUBSCRIPTION_CACHE_SIZE = int(os.getenv('SUBSCRIPTION_CACHE_SIZE', 1024))
+SUBSCRIPTION_SHARED_CACHE = os.getenv('SUBSCRIPTION_SHARED_CACHE')
+
+# Processes used by batch forecasting; 0 means one per available CPU
+FORECAST_MAX_WORKERS = int(os.getenv('FORECAST_MAX_WORKERS', 0))
+
 CORS_ALLOW_ALL_ORIGINS = True
 
 ROOT_URLCONF = 'core_service.urls'
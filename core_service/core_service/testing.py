@@ -0,0 +1,48 @@
+from datetime import date
+from decimal import Decimal
+from companies.models import Company, Store
+from clothings.models import Color, Collection, Season
+from inventory.models import Product, ProductCategory, ProductUnit
+from inventory.models.inventory import Inventory
+from transactions.models import Customer
+
+
+class StoreTestData:
+    """Minimal store/product/customer graph shared by the app test suites."""
+
+    purchase_price = Decimal('5')
+
+    @classmethod
+    def create_store_with_products(cls, num_products=3, stock=None):
+        """Create a store with `num_products` products and a walk-in customer.
+
+        Products are stocked with `stock` units each when it is given.
+        """
+        company = Company.objects.create(name='Test Company')
+        store = Store.objects.create(company_id=company, name='Test Store', location='Addis Ababa')
+        category = ProductCategory.objects.create(store_id=store, name='Shirts')
+        unit = ProductUnit.objects.create(store_id=store, name='Piece')
+        color = Color.objects.create(store_id=store, name='Black', color_code='#000000')
+        season = Season.objects.create(
+            store_id=store, name='Summer', start_date=date(2025, 6, 1), end_date=date(2025, 8, 31)
+        )
+        collection = Collection.objects.create(
+            store_id=store, season_id=season, name='Basics', release_date=date(2025, 6, 1)
+        )
+        products = []
+        for i in range(num_products):
+            product = Product.objects.create(
+                store_id=store,
+                color_id=color,
+                collection_id=collection,
+                name=f'Product {i}',
+                product_unit=unit,
+                product_category=category,
+                purchase_price=cls.purchase_price,
+                sale_price=Decimal('10') * (i + 1),
+            )
+            if stock is not None:
+                Inventory.objects.create(product=product, store=store, quantity=stock)
+            products.append(product)
+        customer = Customer.objects.create(store_id=store, name='Walk-in', email='walkin@example.com')
+        return store, products, customer
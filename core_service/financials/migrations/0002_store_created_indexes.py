@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0004_remove_subscriptionplan_features_and_more'),
+        ('financials', '0001_initial'),
+        ('transactions', '0007_sale_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['store_id', 'created_at'], name='expenses_store_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentin',
+            index=models.Index(fields=['store_id', 'created_at'], name='payment_ins_store_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentout',
+            index=models.Index(fields=['store_id', 'created_at'], name='payment_outs_store_created_idx'),
+        ),
+    ]
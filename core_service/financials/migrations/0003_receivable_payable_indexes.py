@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0004_remove_subscriptionplan_features_and_more'),
+        ('financials', '0002_store_created_indexes'),
+        ('transactions', '0008_store_created_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payable',
+            index=models.Index(fields=['store_id', 'created_at'], name='payables_store_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receivable',
+            index=models.Index(fields=['store_id', 'created_at'], name='receivables_store_created_idx'),
+        ),
+    ]
@@ -45,4 +45,7 @@ class Expense(models.Model):
   class Meta:
     db_table = 'expenses'
     ordering = ['-created_at']
+    indexes = [
+      models.Index(fields=['store_id', 'created_at'], name='expenses_store_created_idx'),
+    ]
     
\ No newline at end of file
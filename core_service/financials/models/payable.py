@@ -36,4 +36,7 @@ class Payable(models.Model):
   class Meta:
     db_table = 'payables'
     ordering = ['-created_at']
+    indexes = [
+      models.Index(fields=['store_id', 'created_at'], name='payables_store_created_idx'),
+    ]
     
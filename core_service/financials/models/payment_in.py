@@ -53,4 +53,7 @@ class PaymentIn(models.Model):
   class Meta:
     db_table = 'payment_ins'
     ordering = ['-created_at']
+    indexes = [
+      models.Index(fields=['store_id', 'created_at'], name='payment_ins_store_created_idx'),
+    ]
     
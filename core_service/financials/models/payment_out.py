@@ -53,4 +53,7 @@ class PaymentOut(models.Model):
   class Meta:
     db_table = 'payment_outs'
     ordering = ['-created_at']
+    indexes = [
+      models.Index(fields=['store_id', 'created_at'], name='payment_outs_store_created_idx'),
+    ]
     
@@ -36,4 +36,7 @@ class Receivable(models.Model):
   class Meta:
     db_table = 'receivables'
     ordering = ['-created_at']
+    indexes = [
+      models.Index(fields=['store_id', 'created_at'], name='receivables_store_created_idx'),
+    ]
     
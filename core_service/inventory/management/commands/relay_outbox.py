@@ -0,0 +1,122 @@
+import time
+from datetime import timedelta
+from itertools import groupby
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from core_service.rabbitmq_client import rabbitmq_client
+from inventory.models.outbox_event import OutboxEvent
+
+# Delay before re-publishing an event the broker rejected, doubling per attempt
+RETRY_BASE_DELAY = 10
+RETRY_MAX_DELAY = 3600
+
+
+class Command(BaseCommand):
+    help = 'Publishes queued outbox events (e.g. low stock alerts) to RabbitMQ with publisher confirms'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Events published per transaction')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the outbox is empty')
+        parser.add_argument('--max-backoff', type=float, default=60.0, help='Longest wait after a failed publish')
+        parser.add_argument('--retention-days', type=int, default=7, help='Delete published events older than this')
+        parser.add_argument('--max-attempts', type=int, default=10, help='Broker rejections after which an event is parked')
+        parser.add_argument('--once', action='store_true', help='Exit once the outbox is empty')
+
+    def handle(self, *args, **options):
+        failures = 0
+        try:
+            while True:
+                published, failed, rejected = self.relay_batch(options['batch_size'], options['max_attempts'])
+                if published:
+                    self.stdout.write(f'Published {published} outbox events')
+
+                if failed:
+                    failures += 1
+                    delay = min(options['poll_interval'] * 2 ** failures, options['max_backoff'])
+                    self.stdout.write(self.style.WARNING(f'{failed} events not confirmed, retrying in {delay:.0f}s'))
+                    if options['once']:
+                        break
+                    time.sleep(delay)
+                    continue
+
+                failures = 0
+                if rejected or published == options['batch_size']:
+                    continue
+
+                self.prune(options['retention_days'])
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            rabbitmq_client.close()
+
+    def relay_batch(self, batch_size, max_attempts):
+        """
+        Publish the oldest due events and mark the confirmed ones. Returns
+        (published, failed, rejected). The rows stay locked while publishing
+        so several relays can run side by side; an event confirmed just before
+        a crash is published again, so consumers may see it twice.
+
+        When the connection is lost the remaining events are simply retried
+        later. An event the broker nacks or cannot route is retried after a
+        growing delay instead, so it does not block the events queued behind
+        it, and is parked once it has been rejected `max_attempts` times.
+
+        publish_batch waits for each event's confirm in turn, so a batch takes
+        one broker round trip per event and the rows stay locked for that
+        long. Keep `batch_size` modest and start more relays to publish
+        faster.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(published_at__isnull=True, parked_at__isnull=True)
+                .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+                .order_by('created_at')[:batch_size]
+            )
+            if not events:
+                return 0, 0, 0
+
+            confirmed, failed, rejected = [], [], False
+            for queue, group in groupby(events, key=lambda event: event.queue):
+                group = list(group)
+                count, rejected = rabbitmq_client.publish_batch(
+                    queue,
+                    [{**event.payload, 'event_id': str(event.id)} for event in group]
+                )
+                confirmed.extend(group[:count])
+                if count < len(group):
+                    failed = events[events.index(group[count]):]
+                    break
+
+            if confirmed:
+                OutboxEvent.objects.filter(pk__in=[event.pk for event in confirmed]).update(
+                    published_at=now,
+                    attempts=F('attempts') + 1
+                )
+            if rejected:
+                self.defer(failed[0], max_attempts, now)
+                return len(confirmed), 0, 1
+
+        return len(confirmed), len(failed), 0
+
+    def defer(self, event, max_attempts, now):
+        """Schedule a rejected event's next attempt, or park it after too many."""
+        attempts = event.attempts + 1
+        updates = {'attempts': attempts, 'last_error': 'Rejected by the broker'}
+        if attempts >= max_attempts:
+            updates['parked_at'] = now
+            self.stderr.write(f'Parked outbox event {event.id} after {attempts} rejected attempts')
+        else:
+            delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+            updates['next_attempt_at'] = now + timedelta(seconds=delay)
+        OutboxEvent.objects.filter(pk=event.pk).update(**updates)
+
+    def prune(self, retention_days):
+        cutoff = timezone.now() - timedelta(days=retention_days)
+        OutboxEvent.objects.filter(published_at__lt=cutoff).delete()
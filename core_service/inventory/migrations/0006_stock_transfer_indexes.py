@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0004_remove_subscriptionplan_features_and_more'),
+        ('inventory', '0005_outbox_event'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stocktransfer',
+            index=models.Index(fields=['source_store', 'created_at'], name='stock_transfers_source_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransfer',
+            index=models.Index(fields=['destination_store', 'created_at'], name='stock_transfers_dest_idx'),
+        ),
+    ]
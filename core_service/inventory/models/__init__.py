@@ -1,5 +1,6 @@
 from .product import Product
 from .product_category import ProductCategory
 from .product_unit import ProductUnit
+from .outbox_event import OutboxEvent
 
-__all__ = ['Product', 'ProductCategory', 'ProductUnit']
\ No newline at end of file
+__all__ = ['Product', 'ProductCategory', 'ProductUnit', 'OutboxEvent']
\ No newline at end of file
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
 import uuid
 from decimal import Decimal
 from django.db.models.signals import post_save, pre_save
@@ -7,9 +8,13 @@ from django.utils import timezone
 import logging
 
 from inventory.models.product import Product
+from inventory.models.outbox_event import OutboxEvent
 from companies.models.store import Store
 
 logger = logging.getLogger(__name__)
+
+LOW_STOCK_QUEUE = 'low_stock_notifications'
+
 class Inventory(models.Model):
     id = models.UUIDField(primary_key=True, editable=False, default=uuid.uuid4)
     product = models.ForeignKey(
@@ -35,58 +40,159 @@ class Inventory(models.Model):
         ordering = ['-created_at']
         unique_together = ['product', 'store']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored stock level so check_stock_level_change does
+        # not have to query it again on save
+        if 'quantity' in field_names and 'low_stock_threshold' in field_names:
+            instance._loaded_quantity = instance.quantity
+            instance._loaded_threshold = instance.low_stock_threshold
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Keep the row and the low stock event written by the signal
+        # handlers in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def is_low_stock(self):
         return self.quantity <= self.low_stock_threshold
 
+    @classmethod
+    def lock_stock(cls, store_id, product_ids):
+        """
+        Lock a store's inventory rows for the given products, in product id
+        order, and return them keyed by product id. Must run inside a
+        transaction.
+        """
+        rows = (
+            cls.objects.select_for_update(of=('self',))
+            .select_related('product', 'store')
+            .filter(store_id=store_id, product_id__in=[str(product_id) for product_id in product_ids])
+            .order_by('product_id')
+        )
+        return {str(row.product_id): row for row in rows}
+
+    @classmethod
+    def adjust_stock(cls, store_id, changes, locked_rows=None):
+        """
+        Apply stock changes ({product_id: signed quantity}) to a store's
+        inventory in a single UPDATE and return the affected rows with their
+        new quantities.
+
+        Must run inside a transaction. The rows are locked in product id
+        order, so concurrent sales over overlapping products queue behind
+        each other instead of deadlocking. Raises Inventory.DoesNotExist for
+        a product without inventory in the store and ValueError when a
+        decrement would take stock below zero. Rows already locked with
+        lock_stock can be passed as `locked_rows`.
+        """
+        changes = {str(product_id): Decimal(delta) for product_id, delta in changes.items() if delta}
+        if not changes:
+            return []
+
+        if locked_rows is None:
+            locked_rows = cls.lock_stock(store_id, changes.keys())
+
+        missing = [product_id for product_id in changes if product_id not in locked_rows]
+        if missing:
+            raise cls.DoesNotExist(f"No inventory record found for product {missing[0]} in store {store_id}")
+        rows = [locked_rows[product_id] for product_id in sorted(changes)]
+
+        notify, reset = [], []
+        for row in rows:
+            old_quantity = row.quantity
+            row.quantity = old_quantity + changes[str(row.product_id)]
+            if row.quantity < 0:
+                raise ValueError(f"Insufficient inventory for product {row.product.name}")
+
+            # Same transitions as check_stock_level_change, from the locked rows
+            if row.quantity > row.low_stock_threshold:
+                if row.low_stock_notified:
+                    reset.append(row.pk)
+                    row.low_stock_notified = False
+            elif old_quantity > row.low_stock_threshold and not row.low_stock_notified:
+                notify.append(row)
+
+        updates = {
+            'quantity': F('quantity') + Case(
+                *[When(product_id=product_id, then=Value(delta)) for product_id, delta in changes.items()],
+                default=Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=19, decimal_places=4)
+            ),
+            'updated_at': timezone.now(),
+        }
+        if reset or notify:
+            updates['low_stock_notified'] = Case(
+                When(pk__in=reset, then=Value(False)),
+                When(pk__in=[row.pk for row in notify], then=Value(True)),
+                default=F('low_stock_notified')
+            )
+        cls.objects.filter(pk__in=[row.pk for row in rows]).update(**updates)
+
+        # Queued in this transaction; relay_outbox publishes them
+        OutboxEvent.objects.bulk_create([low_stock_event(row) for row in notify])
+        for row in notify:
+            row.low_stock_notified = True
+
+        return rows
+
 @receiver(pre_save, sender=Inventory)
 def check_stock_level_change(sender, instance, **kwargs):
     """Check if stock is crossing the threshold"""
     if instance.pk:  # Only for updates
         try:
-            old_instance = Inventory.objects.get(pk=instance.pk)
+            if hasattr(instance, '_loaded_quantity'):
+                old_quantity = instance._loaded_quantity
+                old_threshold = instance._loaded_threshold
+            else:
+                old_instance = Inventory.objects.get(pk=instance.pk)
+                old_quantity = old_instance.quantity
+                old_threshold = old_instance.low_stock_threshold
             
             # Reset notification flag if stock goes above threshold
             if instance.quantity > instance.low_stock_threshold:
                 instance.low_stock_notified = False
             
             # Check if crossing from above to below threshold
-            was_above_threshold = old_instance.quantity > old_instance.low_stock_threshold
+            was_above_threshold = old_quantity > old_threshold
             is_now_below_threshold = instance.quantity <= instance.low_stock_threshold
             
             if was_above_threshold and is_now_below_threshold and not instance.low_stock_notified:
+                # The event is queued with this save, so mark it notified in the same UPDATE
                 instance._should_notify = True
+                instance.low_stock_notified = True
             else:
                 instance._should_notify = False
                 
         except Inventory.DoesNotExist:
             pass
 
-@receiver(post_save, sender=Inventory)
-def handle_low_stock_notification(sender, instance, created, **kwargs):
-    """Send notification if stock is low"""
-    if hasattr(instance, '_should_notify') and instance._should_notify:
-        # Import here to avoid circular imports
-        from core_service.rabbitmq_client import rabbitmq_client
-        
-        print(instance.store.company_id.id)
-        # Prepare data for notification
-        notification_data = {
+def low_stock_event(instance):
+    """Build the outbox event announcing that an inventory row fell to its low stock threshold"""
+    return OutboxEvent(
+        event_type=OutboxEvent.EventType.LOW_STOCK_ALERT,
+        queue=LOW_STOCK_QUEUE,
+        payload={
+            'type': OutboxEvent.EventType.LOW_STOCK_ALERT.value,
             'inventory_id': str(instance.id),
             'product_name': instance.product.name,
             'store_name': instance.store.name,
             'current_quantity': float(instance.quantity),
             'threshold': float(instance.low_stock_threshold),
-            'store_id': str(instance.store.id),
-            'company_id': str(instance.store.company_id.id),
+            'store_id': str(instance.store_id),
+            'company_id': str(instance.store.company_id_id),
             'timestamp': timezone.now().isoformat()
         }
-        
-        # Send notification
-        success = rabbitmq_client.send_low_stock_notification(notification_data)
-        
-        if success:
-            # Mark as notified
-            Inventory.objects.filter(pk=instance.pk).update(low_stock_notified=True)
-            logger.info(f"Low stock notification sent for {instance.product.name}")
-        else:
-            logger.error(f"Failed to send notification for {instance.product.name}")
\ No newline at end of file
+    )
+
+@receiver(post_save, sender=Inventory)
+def handle_low_stock_notification(sender, instance, created, **kwargs):
+    """Queue a low stock notification if stock crossed the threshold"""
+    instance._loaded_quantity = instance.quantity
+    instance._loaded_threshold = instance.low_stock_threshold
+    if hasattr(instance, '_should_notify') and instance._should_notify:
+        instance._should_notify = False
+        low_stock_event(instance).save()
+        logger.info(f"Low stock notification queued for {instance.product.name}")
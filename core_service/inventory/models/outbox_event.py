@@ -0,0 +1,44 @@
+from django.db import models
+from django.db.models import Q
+import uuid
+
+
+class OutboxEvent(models.Model):
+    """
+    A message waiting to be published to RabbitMQ.
+
+    Events are written in the same transaction as the change that caused
+    them and published later by the `relay_outbox` command, so requests never
+    wait on the broker and a committed change always gets its message.
+    """
+    class EventType(models.TextChoices):
+        LOW_STOCK_ALERT = 'low_stock_alert', 'Low Stock Alert'
+
+    id = models.UUIDField(primary_key=True, editable=False, default=uuid.uuid4)
+    event_type = models.CharField(max_length=50, choices=EventType.choices)
+    queue = models.CharField(max_length=100)
+    payload = models.JSONField()
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+    # Set when the broker rejects the event: it is skipped until then, so it
+    # does not hold back the events queued after it
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    # Set once the broker has rejected the event too many times; parked
+    # events are no longer relayed and must be inspected by hand
+    parked_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbox_events'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(
+                fields=['created_at'],
+                name='outbox_events_pending',
+                condition=Q(published_at__isnull=True, parked_at__isnull=True)
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.id}"
@@ -44,6 +44,11 @@ class StockTransfer(models.Model):
     class Meta:
         db_table = 'stock_transfers'
         ordering = ['-created_at']
+        # A store's transfers are listed from both sides
+        indexes = [
+            models.Index(fields=['source_store', 'created_at'], name='stock_transfers_source_idx'),
+            models.Index(fields=['destination_store', 'created_at'], name='stock_transfers_dest_idx'),
+        ]
 
 
     def __str__(self):
@@ -1,3 +1,124 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.db import transaction
 from django.test import TestCase
+from django.utils import timezone
+from inventory.management.commands.relay_outbox import Command as RelayOutboxCommand
+from inventory.models.inventory import Inventory
+from inventory.models.outbox_event import OutboxEvent
+from transactions.tests import SaleTestData
 
-# Create your tests here.
+
+class AdjustStockTests(TestCase):
+    def setUp(self):
+        self.store, self.products, _, _ = SaleTestData.create_store_with_products(num_products=3, stock=Decimal('20'))
+        self.first, self.second, self.third = self.products
+
+    def stock(self):
+        return {
+            row.product_id: (row.quantity, row.low_stock_notified)
+            for row in Inventory.objects.filter(store=self.store)
+        }
+
+    def test_applies_signed_changes_in_one_update(self):
+        with transaction.atomic(), self.assertNumQueries(2):
+            Inventory.adjust_stock(self.store.id, {
+                str(self.first.id): Decimal('-5'),
+                str(self.second.id): Decimal('7'),
+                str(self.third.id): Decimal('0'),
+            })
+
+        self.assertEqual(self.stock(), {
+            self.first.id: (Decimal('15'), False),
+            self.second.id: (Decimal('27'), False),
+            self.third.id: (Decimal('20'), False),
+        })
+
+    def test_crossing_the_threshold_queues_one_event(self):
+        with transaction.atomic():
+            Inventory.adjust_stock(self.store.id, {str(self.first.id): Decimal('-12')})
+        with transaction.atomic():
+            Inventory.adjust_stock(self.store.id, {str(self.first.id): Decimal('-1')})
+
+        self.assertEqual(self.stock()[self.first.id], (Decimal('7'), True))
+        events = OutboxEvent.objects.all()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].payload['current_quantity'], 8.0)
+
+        # Restocking above the threshold re-arms the alert
+        with transaction.atomic():
+            Inventory.adjust_stock(self.store.id, {str(self.first.id): Decimal('10')})
+        self.assertEqual(self.stock()[self.first.id], (Decimal('17'), False))
+
+    def test_rejects_the_whole_change_when_one_product_runs_out(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            Inventory.adjust_stock(self.store.id, {
+                str(self.first.id): Decimal('-5'),
+                str(self.second.id): Decimal('-21'),
+            })
+
+        self.assertEqual(self.stock()[self.first.id], (Decimal('20'), False))
+        self.assertEqual(self.stock()[self.second.id], (Decimal('20'), False))
+
+    def test_missing_inventory_raises_does_not_exist(self):
+        Inventory.objects.filter(product=self.third).delete()
+        with self.assertRaises(Inventory.DoesNotExist), transaction.atomic():
+            Inventory.adjust_stock(self.store.id, {str(self.third.id): Decimal('-1')})
+
+
+class RelayOutboxTests(TestCase):
+    def setUp(self):
+        self.events = [
+            OutboxEvent.objects.create(
+                event_type=OutboxEvent.EventType.LOW_STOCK_ALERT, queue='low_stock_notifications', payload={'n': n}
+            )
+            for n in range(3)
+        ]
+        self.relay = RelayOutboxCommand(stderr=StringIO())
+
+    def publish(self, *results):
+        return mock.patch(
+            'inventory.management.commands.relay_outbox.rabbitmq_client.publish_batch', side_effect=results
+        )
+
+    def test_publishes_with_event_ids(self):
+        with self.publish((3, False)) as publish_batch:
+            self.assertEqual(self.relay.relay_batch(100, max_attempts=3), (3, 0, 0))
+
+        messages = publish_batch.call_args.args[1]
+        self.assertEqual([message['event_id'] for message in messages], [str(event.id) for event in self.events])
+        self.assertFalse(OutboxEvent.objects.filter(published_at__isnull=True).exists())
+
+    def test_rejected_event_does_not_block_the_rest(self):
+        with self.publish((0, True), (2, False)) as publish_batch:
+            self.assertEqual(self.relay.relay_batch(100, max_attempts=3), (0, 0, 1))
+            self.assertEqual(self.relay.relay_batch(100, max_attempts=3), (2, 0, 0))
+
+        self.assertEqual([message['n'] for message in publish_batch.call_args.args[1]], [1, 2])
+        head = OutboxEvent.objects.get(pk=self.events[0].pk)
+        self.assertIsNone(head.published_at)
+        self.assertEqual(head.attempts, 1)
+        self.assertGreater(head.next_attempt_at, timezone.now())
+
+    def test_event_is_parked_after_max_attempts(self):
+        OutboxEvent.objects.exclude(pk=self.events[0].pk).delete()
+        with self.publish((0, True), (0, True)):
+            self.relay.relay_batch(100, max_attempts=2)
+            OutboxEvent.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+            self.relay.relay_batch(100, max_attempts=2)
+            self.assertEqual(self.relay.relay_batch(100, max_attempts=2), (0, 0, 0))
+
+        head = OutboxEvent.objects.get()
+        self.assertEqual(head.attempts, 2)
+        self.assertIsNotNone(head.parked_at)
+
+    def test_lost_connection_leaves_events_untouched(self):
+        with self.publish((1, False)):
+            self.assertEqual(self.relay.relay_batch(100, max_attempts=3), (1, 2, 0))
+
+        pending = OutboxEvent.objects.filter(published_at__isnull=True)
+        self.assertEqual(
+            list(pending.values_list('attempts', 'next_attempt_at')), [(0, None), (0, None)]
+        )
@@ -0,0 +1,216 @@
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+import django
+from django.conf import settings
+from django.utils import timezone
+from companies.models import Store, Company
+from predictions.models import Forecast
+from predictions.services import (
+    METRICS,
+    build_series,
+    fit_forecast,
+    forecast_key,
+    get_company_store_series,
+    has_prophet_history,
+    history_fingerprint,
+    last_closed_day,
+    period_starts,
+    trend_based_predictions,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def pool_size(num_jobs, max_workers=None):
+    limit = max_workers or settings.FORECAST_MAX_WORKERS or available_cpus()
+    return max(1, min(num_jobs, limit))
+
+
+def init_worker():
+    # Fitting never touches the database, but the forecasting code imports
+    # models, so spawned workers need the app registry
+    django.setup()
+
+
+def run_fit(job):
+    historical_data, num_projection_months, metric = job
+    return fit_forecast(historical_data, num_projection_months, metric)
+
+
+def fit_trends(jobs):
+    """
+    Fit short-history jobs with the vectorized trend forecaster, one call
+    per (history length, horizon). Each job is charged an equal share of
+    its group's time.
+    """
+    groups = defaultdict(list)
+    for index, (historical_data, num_projection_months, _) in enumerate(jobs):
+        groups[(len(historical_data), num_projection_months)].append(index)
+
+    results = [None] * len(jobs)
+    for (_, num_projection_months), indexes in groups.items():
+        started = perf_counter()
+        predictions = trend_based_predictions([jobs[i][0] for i in indexes], num_projection_months)
+        share = (perf_counter() - started) / len(indexes)
+        for i, series_predictions in zip(indexes, predictions):
+            results[i] = (series_predictions, 'trend_based', share)
+    return results
+
+
+def fit_all(jobs, max_workers=None):
+    """
+    Fit (historical_data, horizon, metric) jobs. Histories too short for
+    Prophet are forecast together in-process; Prophet fits run across a
+    process pool when there is more than one CPU to use. Returns the results
+    in job order and the number of pool workers used.
+    """
+    prophet_jobs, trend_jobs = [], []
+    for i, job in enumerate(jobs):
+        (prophet_jobs if has_prophet_history(job[0]) else trend_jobs).append(i)
+
+    results = [None] * len(jobs)
+    for i, result in zip(trend_jobs, fit_trends([jobs[i] for i in trend_jobs])):
+        results[i] = result
+
+    if not prophet_jobs:
+        return results, 0
+
+    workers = pool_size(len(prophet_jobs), max_workers)
+    if workers == 1:
+        fits = [run_fit(jobs[i]) for i in prophet_jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+            fits = list(executor.map(run_fit, [jobs[i] for i in prophet_jobs]))
+
+    for i, result in zip(prophet_jobs, fits):
+        results[i] = result
+    return results, workers
+
+
+def load_company_series(company_id, store_ids, metrics, num_historical_months):
+    """
+    Load the closed-month series of every store (one query per metric) and
+    sum them into the company aggregate, as get_forecast does. Returns
+    {(identifier, is_company, metric): series}.
+    """
+    end = last_closed_day()
+    series = {}
+    for metric in metrics:
+        per_store = get_company_store_series(company_id, metric, store_ids, num_historical_months, end=end)
+        aggregate = build_series(period_starts(num_historical_months, end=end), {}, metric)
+        for store_id, store_series in per_store.items():
+            series[(store_id, False, metric)] = store_series
+            for point, store_point in zip(aggregate, store_series):
+                point['value'] += store_point['value']
+        series[(str(company_id), True, metric)] = aggregate
+    return series
+
+
+def forecast_company(company_id, metrics=METRICS, num_projection_months=6, num_historical_months=12, max_workers=None, refresh=False):
+    """
+    Forecast every store of a company plus the company aggregate.
+
+    Histories are loaded with one grouped query per metric, forecasts whose
+    history is unchanged are served from the Forecast table and the rest are
+    fitted: short histories together with the NumPy trend forecaster, the
+    others with Prophet across a process pool. Each forecast reports its fit
+    time.
+    """
+    started = perf_counter()
+    if not Company.objects.filter(id=company_id).exists():
+        raise ValueError(f"Company with ID {company_id} not found")
+
+    stores = {str(store_id): name for store_id, name in Store.objects.filter(company_id=company_id).values_list('id', 'name')}
+    series = load_company_series(company_id, list(stores), metrics, num_historical_months)
+
+    cached = {}
+    if not refresh:
+        rows = Forecast.objects.filter(
+            identifier__in=[identifier for identifier, _, _ in series],
+            metric__in=metrics,
+            num_historical_months=num_historical_months,
+            num_projection_months=num_projection_months
+        ).values('scope', 'identifier', 'metric', 'history_fingerprint', 'projection_method', 'projections', 'fit_seconds')
+        cached = {
+            (str(row['identifier']), row['scope'] == Forecast.Scope.COMPANY, row['metric']): row
+            for row in rows
+        }
+
+    results, misses = {}, []
+    for key, historical_data in series.items():
+        fingerprint = history_fingerprint(historical_data)
+        row = cached.get(key)
+        if row is not None and row['history_fingerprint'] == fingerprint:
+            results[key] = {
+                'projection_method': row['projection_method'],
+                'projections': row['projections'],
+                'fit_seconds': round(row['fit_seconds'], 3),
+                'cached': True,
+            }
+        else:
+            misses.append((key, fingerprint))
+
+    fits, workers = fit_all(
+        [(series[key], num_projection_months, key[2]) for key, _ in misses],
+        max_workers
+    )
+
+    forecasts = []
+    for (key, fingerprint), (predictions, projection_method, fit_seconds) in zip(misses, fits):
+        identifier, is_company, metric = key
+        results[key] = {
+            'projection_method': projection_method,
+            'projections': predictions,
+            'fit_seconds': round(fit_seconds, 3),
+            'cached': False,
+        }
+        forecasts.append(Forecast(
+            **forecast_key(identifier, metric, num_projection_months, num_historical_months, is_company),
+            history_fingerprint=fingerprint,
+            projection_method=projection_method,
+            projections=predictions,
+            fit_seconds=fit_seconds,
+            updated_at=timezone.now()
+        ))
+
+    if forecasts:
+        Forecast.objects.bulk_create(
+            forecasts,
+            update_conflicts=True,
+            unique_fields=['scope', 'identifier', 'metric', 'num_historical_months', 'num_projection_months'],
+            update_fields=['history_fingerprint', 'projection_method', 'projections', 'fit_seconds', 'updated_at']
+        )
+
+    total_seconds = perf_counter() - started
+    logger.info(
+        f"Batch forecast for company {company_id}: {len(fits)} fitted on {workers} workers, "
+        f"{len(results) - len(fits)} cached, {total_seconds:.2f}s"
+    )
+
+    return {
+        'company_id': str(company_id),
+        'metrics_predicted': list(metrics),
+        'num_projected_months': num_projection_months,
+        'workers': workers,
+        'fitted': len(fits),
+        'total_seconds': round(total_seconds, 3),
+        'aggregate': {metric: results[(str(company_id), True, metric)] for metric in metrics},
+        'stores': [
+            {
+                'store_id': store_id,
+                'store_name': name,
+                'forecasts': {metric: results[(store_id, False, metric)] for metric in metrics},
+            }
+            for store_id, name in stores.items()
+        ],
+    }
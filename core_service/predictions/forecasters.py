@@ -0,0 +1,107 @@
+# NumPy forecasters for monthly metric series. Each takes a 2-D array of
+# shape (series, periods), oldest period first, and returns (forecast, lower,
+# upper) arrays of shape (series, horizon), so many stores are forecast in
+# one call without Prophet.
+from statistics import NormalDist
+import numpy as np
+
+
+def z_score(level: float) -> float:
+    return NormalDist().inv_cdf((1 + level) / 2)
+
+
+def as_series_array(values) -> np.ndarray:
+    array = np.asarray(values, dtype=float)
+    if array.ndim == 1:
+        array = array[np.newaxis, :]
+    if array.ndim != 2 or array.shape[1] == 0:
+        raise ValueError("values must be a non-empty (series, periods) array")
+    return array
+
+
+def linear_trend(values, horizon: int, level: float = 0.95):
+    """
+    Least-squares line through each series, extended `horizon` periods, with
+    prediction intervals from the residual spread.
+    """
+    y = as_series_array(values)
+    n = y.shape[1]
+    t = np.arange(n, dtype=float)
+    t_mean = t.mean()
+    sxx = ((t - t_mean) ** 2).sum()
+
+    y_mean = y.mean(axis=1, keepdims=True)
+    slope = ((y - y_mean) * (t - t_mean)).sum(axis=1, keepdims=True) / sxx if n > 1 else np.zeros_like(y_mean)
+    intercept = y_mean - slope * t_mean
+
+    future = np.arange(n, n + horizon, dtype=float)
+    forecast = intercept + slope * future
+
+    if n > 2:
+        residuals = y - (intercept + slope * t)
+        sigma = np.sqrt((residuals ** 2).sum(axis=1, keepdims=True) / (n - 2))
+        spread = sigma * np.sqrt(1 + 1 / n + (future - t_mean) ** 2 / sxx)
+    else:
+        spread = np.zeros_like(forecast)
+
+    margin = z_score(level) * spread
+    return forecast, forecast - margin, forecast + margin
+
+
+def seasonal_naive(values, horizon: int, season_length: int = 12, level: float = 0.95):
+    """
+    Repeat the last observed season. Series shorter than one season fall
+    back to the last value.
+    """
+    y = as_series_array(values)
+    n = y.shape[1]
+    if n < season_length:
+        # A naive forecast: the last value, with one-step differences as the error
+        season_length = 1
+
+    steps = np.arange(horizon)
+    forecast = y[:, n - season_length + steps % season_length]
+
+    if n > season_length:
+        errors = y[:, season_length:] - y[:, :-season_length]
+        sigma = np.sqrt((errors ** 2).mean(axis=1, keepdims=True))
+    else:
+        sigma = np.zeros((y.shape[0], 1))
+
+    margin = z_score(level) * sigma * np.sqrt(steps // season_length + 1)
+    return forecast, forecast - margin, forecast + margin
+
+
+def exponential_smoothing(values, horizon: int, alpha: float = 0.3, level: float = 0.95):
+    """Simple exponential smoothing: a flat forecast at the smoothed level."""
+    y = as_series_array(values)
+    smoothed = y[:, 0].copy()
+    squared_errors = np.zeros_like(smoothed)
+    for i in range(1, y.shape[1]):
+        error = y[:, i] - smoothed
+        squared_errors += error ** 2
+        smoothed += alpha * error
+
+    sigma = np.sqrt(squared_errors / max(y.shape[1] - 1, 1))[:, np.newaxis]
+    forecast = np.repeat(smoothed[:, np.newaxis], horizon, axis=1)
+    steps = np.arange(horizon)
+    margin = z_score(level) * sigma * np.sqrt(1 + steps * alpha ** 2)
+    return forecast, forecast - margin, forecast + margin
+
+
+FORECASTERS = {
+    'linear': linear_trend,
+    'seasonal_naive': seasonal_naive,
+    'exponential_smoothing': exponential_smoothing,
+}
+
+
+def forecast_array(values, horizon: int, method: str = 'linear', level: float = 0.95):
+    """
+    Forecast every row of `values` with the named method. Predictions and
+    bounds are clipped at zero since the metrics cannot go negative.
+    """
+    if method not in FORECASTERS:
+        raise ValueError(f"Unknown forecaster {method}. Choose from {', '.join(FORECASTERS)}")
+    forecast, lower, upper = FORECASTERS[method](values, horizon, level=level)
+    return np.maximum(forecast, 0), np.maximum(lower, 0), np.maximum(upper, 0)
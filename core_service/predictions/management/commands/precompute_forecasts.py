@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from companies.models import Store, Company
+from predictions.services import METRICS, get_forecast
+
+class Command(BaseCommand):
+    help = 'Refreshes stored forecasts for every store and company so prediction requests are served from cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metrics', nargs='+', choices=METRICS, default=list(METRICS), help='Metrics to forecast')
+        parser.add_argument('--projection-months', type=int, default=6, help='Forecast horizon in months')
+        parser.add_argument('--historical-months', type=int, default=12, help='Months of history to fit on')
+        parser.add_argument('--store', action='append', dest='stores', help='Only this store (repeatable)')
+        parser.add_argument('--skip-companies', action='store_true', help='Do not refresh company-level forecasts')
+        parser.add_argument('--force', action='store_true', help='Refit even when the history is unchanged')
+
+    def handle(self, *args, **options):
+        stores = Store.objects.all()
+        if options['stores']:
+            stores = stores.filter(id__in=options['stores'])
+
+        targets = [(store_id, False) for store_id in stores.values_list('id', flat=True)]
+        if not options['skip_companies'] and not options['stores']:
+            targets += [(company_id, True) for company_id in Company.objects.values_list('id', flat=True)]
+
+        refreshed = failed = 0
+        for identifier, is_company in targets:
+            for metric in options['metrics']:
+                try:
+                    get_forecast(
+                        str(identifier),
+                        metric,
+                        options['projection_months'],
+                        options['historical_months'],
+                        is_company=is_company,
+                        refresh=options['force']
+                    )
+                    refreshed += 1
+                except Exception as e:
+                    failed += 1
+                    scope = 'company' if is_company else 'store'
+                    self.stdout.write(self.style.ERROR(f'{metric} forecast for {scope} {identifier} failed: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {refreshed} forecasts ({failed} failed)'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:13
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Forecast',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('scope', models.CharField(choices=[('store', 'Store'), ('company', 'Company')], max_length=10)),
+                ('identifier', models.UUIDField()),
+                ('metric', models.CharField(max_length=20)),
+                ('num_historical_months', models.PositiveIntegerField()),
+                ('num_projection_months', models.PositiveIntegerField()),
+                ('history_fingerprint', models.CharField(max_length=64)),
+                ('projection_method', models.CharField(max_length=20)),
+                ('projections', models.JSONField()),
+                ('fit_seconds', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'forecasts',
+                'unique_together': {('scope', 'identifier', 'metric', 'num_historical_months', 'num_projection_months')},
+            },
+        ),
+    ]
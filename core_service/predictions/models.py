@@ -1,3 +1,36 @@
 from django.db import models
+import uuid
 
-# Create your models here.
+
+class Forecast(models.Model):
+    """
+    Latest fitted forecast of a store or company metric.
+
+    Reused for as long as the history it was fitted on (identified by
+    `history_fingerprint`) is unchanged. Histories only cover closed months,
+    so a forecast normally lasts until the month ends; refreshed nightly by
+    the `precompute_forecasts` command.
+    """
+    class Scope(models.TextChoices):
+        STORE = 'store', 'Store'
+        COMPANY = 'company', 'Company'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    scope = models.CharField(max_length=10, choices=Scope.choices)
+    identifier = models.UUIDField()
+    metric = models.CharField(max_length=20)
+    num_historical_months = models.PositiveIntegerField()
+    num_projection_months = models.PositiveIntegerField()
+    history_fingerprint = models.CharField(max_length=64)
+    projection_method = models.CharField(max_length=20)
+    projections = models.JSONField()
+    fit_seconds = models.FloatField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'forecasts'
+        unique_together = ['scope', 'identifier', 'metric', 'num_historical_months', 'num_projection_months']
+
+    def __str__(self):
+        return f"{self.metric} forecast for {self.scope} {self.identifier}"
@@ -0,0 +1,16 @@
+from rest_framework import serializers
+from predictions.services import METRICS
+
+
+class BatchPredictionSerializer(serializers.Serializer):
+    metrics = serializers.ListField(
+        child=serializers.ChoiceField(choices=METRICS),
+        allow_empty=False,
+        default=list(METRICS)
+    )
+    num_projection_months = serializers.IntegerField(min_value=1, default=6)
+    num_historical_months = serializers.IntegerField(min_value=1, default=12)
+
+    def validate_metrics(self, metrics):
+        # Each metric is forecast once, in the order first requested
+        return list(dict.fromkeys(metrics))
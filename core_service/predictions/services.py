@@ -1,12 +1,18 @@
+import hashlib
+import json
+import logging
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
+from time import perf_counter
 from django.utils import timezone
 from django.db.models import Sum, F, Count
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth, TruncWeek
 from transactions.models import Sale, SaleItem, Customer
 from inventory.models import Product
 from companies.models import Store, Company
-import pandas as pd
-from prophet import Prophet
+from predictions.models import Forecast
+
+logger = logging.getLogger(__name__)
 
 def calculate_monthly_revenue(store_id: str, year: int, month: int) -> Decimal:
     """
@@ -23,7 +29,7 @@ def calculate_monthly_revenue(store_id: str, year: int, month: int) -> Decimal:
         sale__created_at__gte=start_date,
         sale__created_at__lt=end_date
     ).select_related('product', 'sale').aggregate(
-        total=Sum(F('quantity') * F('product__sale_price'))
+        total=Sum(F('quantity') * Coalesce('item_sale_price', 'product__sale_price'))
     )['total']
 
     return Decimal('0.00') if revenue is None else revenue
@@ -43,7 +49,9 @@ def calculate_monthly_profit(store_id: str, year: int, month: int) -> Decimal:
         sale__created_at__gte=start_date,
         sale__created_at__lt=end_date
     ).select_related('product', 'sale').aggregate(
-        total=Sum(F('quantity') * (F('product__sale_price') - F('product__purchase_price')))
+        total=Sum(F('quantity') * (
+            Coalesce('item_sale_price', 'product__sale_price') - Coalesce('item_cost_price', 'product__purchase_price')
+        ))
     )['total']
 
     return Decimal('0.00') if profit is None else profit
@@ -85,7 +93,7 @@ def calculate_company_monthly_revenue(company_id: str, year: int, month: int) ->
         sale__created_at__gte=start_date,
         sale__created_at__lt=end_date
     ).select_related('product', 'sale').aggregate(
-        total=Sum(F('quantity') * F('product__sale_price'))
+        total=Sum(F('quantity') * Coalesce('item_sale_price', 'product__sale_price'))
     )['total']
 
     return Decimal('0.00') if revenue is None else revenue
@@ -109,7 +117,9 @@ def calculate_company_monthly_profit(company_id: str, year: int, month: int) ->
         sale__created_at__gte=start_date,
         sale__created_at__lt=end_date
     ).select_related('product', 'sale').aggregate(
-        total=Sum(F('quantity') * (F('product__sale_price') - F('product__purchase_price')))
+        total=Sum(F('quantity') * (
+            Coalesce('item_sale_price', 'product__sale_price') - Coalesce('item_cost_price', 'product__purchase_price')
+        ))
     )['total']
 
     return Decimal('0.00') if profit is None else profit
@@ -137,13 +147,171 @@ def calculate_company_monthly_customers(company_id: str, year: int, month: int)
 
     return customer_count
 
+METRICS = ('revenue', 'profit', 'customers')
+
+PERIOD_TRUNCATIONS = {
+    'month': TruncMonth,
+    'week': TruncWeek,
+    'day': TruncDay,
+}
+
+def add_months(day: date, months: int) -> date:
+    """Return the first day of the month `months` away from `day`'s month."""
+    month_index = day.year * 12 + (day.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def period_start(day: date, period: str = 'month') -> date:
+    if period == 'month':
+        return day.replace(day=1)
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+def shift_period(start: date, periods: int, period: str = 'month') -> date:
+    """Step a period start date by whole calendar periods."""
+    if period == 'month':
+        return add_months(start, periods)
+    if period == 'week':
+        return start + timedelta(weeks=periods)
+    return start + timedelta(days=periods)
+
+def period_starts(num_periods: int, period: str = 'month', end: date = None) -> list:
+    """
+    Start dates of the last num_periods periods, oldest first, ending with
+    the period that contains `end` (today by default).
+    """
+    last = period_start(end or timezone.localdate(), period)
+    return [shift_period(last, i - num_periods + 1, period) for i in range(num_periods)]
+
+def last_closed_day(period: str = 'month') -> date:
+    """Last day of the most recent period that has already ended."""
+    return period_start(timezone.localdate(), period) - timedelta(days=1)
+
+def series_bounds(starts: list, period: str = 'month') -> tuple:
+    """Aware datetimes from the first of `starts` to the end of the last period."""
+    return (
+        timezone.make_aware(datetime.combine(starts[0], time.min)),
+        timezone.make_aware(datetime.combine(shift_period(starts[-1], 1, period), time.min)),
+    )
+
+def metric_queryset(identifier: str, metric: str, since: datetime, period: str = 'month', is_company: bool = False, by_store: bool = False, until: datetime = None):
+    """
+    Build the grouped query returning (period, total) rows for a metric of a
+    store or of every store of a company, from `since` up to (but excluding)
+    `until`. With `by_store` the rows are also grouped per store and carry
+    its id as `store`.
+    """
+    truncate = PERIOD_TRUNCATIONS[period]
+
+    if metric == 'customers':
+        scope = {'store_id__company_id': identifier} if is_company else {'store_id': identifier}
+        if until is not None:
+            scope['created_at__lt'] = until
+        return Customer.objects.filter(
+            created_at__gte=since, **scope
+        ).annotate(period=truncate('created_at')).values(
+            'period', **({'store': F('store_id')} if by_store else {})
+        ).annotate(
+            total=Count('id')
+        ).order_by()
+
+    # Items are valued at the prices recorded when they were sold
+    if metric == 'revenue':
+        amount = F('quantity') * Coalesce('item_sale_price', 'product__sale_price')
+    elif metric == 'profit':
+        amount = F('quantity') * (
+            Coalesce('item_sale_price', 'product__sale_price') - Coalesce('item_cost_price', 'product__purchase_price')
+        )
+    else:
+        raise ValueError(f"Unknown metric {metric}. Choose from {', '.join(METRICS)}")
+
+    scope = {'sale__store_id__company_id': identifier} if is_company else {'sale__store_id': identifier}
+    if until is not None:
+        scope['sale__created_at__lt'] = until
+    return SaleItem.objects.filter(
+        sale__created_at__gte=since, **scope
+    ).annotate(period=truncate('sale__created_at')).values(
+        'period', **({'store': F('sale__store_id')} if by_store else {})
+    ).annotate(
+        total=Sum(amount)
+    ).order_by()
+
+def get_metric_series(identifier: str, metric: str, num_periods: int = 12, period: str = 'month', is_company: bool = False, end: date = None) -> list:
+    """
+    Retrieve a store's (or company's) revenue, profit or new customer series
+    over the last num_periods calendar months, weeks or days, ending with the
+    one containing `end` (the current one by default), with one grouped
+    query. Periods without activity are zero.
+    """
+    if period not in PERIOD_TRUNCATIONS:
+        raise ValueError(f"Unknown period {period}. Choose from {', '.join(PERIOD_TRUNCATIONS)}")
+
+    # Validate identifier exists
+    if is_company:
+        if not Company.objects.filter(id=identifier).exists():
+            raise ValueError(f"Company with ID {identifier} not found")
+    else:
+        if not Store.objects.filter(id=identifier).exists():
+            raise ValueError(f"Store with ID {identifier} not found")
+
+    starts = period_starts(num_periods, period, end)
+    since, until = series_bounds(starts, period)
+
+    totals = {}
+    for row in metric_queryset(identifier, metric, since, period, is_company, until=until):
+        totals[period_key(row['period'])] = row['total']
+
+    return build_series(starts, totals, metric)
+
+def period_key(value) -> date:
+    """Local start date of a truncated period returned by the database."""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+def build_series(starts: list, totals: dict, metric: str) -> list:
+    zero = 0 if metric == 'customers' else Decimal('0.00')
+    return [
+        {'date': start.strftime('%Y-%m-%d'), 'value': totals.get(start) or zero}
+        for start in starts
+    ]
+
+def get_company_store_series(company_id: str, metric: str, store_ids: list, num_periods: int = 12, period: str = 'month', end: date = None) -> dict:
+    """
+    Retrieve the metric series of every given store of a company, ending
+    with the period containing `end`, with one query grouped by store and
+    period. Returns {store_id: series}.
+    """
+    starts = period_starts(num_periods, period, end)
+    since, until = series_bounds(starts, period)
+
+    totals = {str(store_id): {} for store_id in store_ids}
+    for row in metric_queryset(company_id, metric, since, period, is_company=True, by_store=True, until=until):
+        store_totals = totals.get(str(row['store']))
+        if store_totals is not None:
+            store_totals[period_key(row['period'])] = row['total']
+
+    return {store_id: build_series(starts, store_totals, metric) for store_id, store_totals in totals.items()}
+
+METRIC_CALCULATORS = {
+    calculate_monthly_revenue: ('revenue', False),
+    calculate_monthly_profit: ('profit', False),
+    calculate_monthly_customers: ('customers', False),
+    calculate_company_monthly_revenue: ('revenue', True),
+    calculate_company_monthly_profit: ('profit', True),
+    calculate_company_monthly_customers: ('customers', True),
+}
+
 def get_historical_monthly_data(identifier: str, metric_calculator_func: callable, num_months: int = 12, is_company: bool = False) -> list:
     """
     Retrieve historical data for the specified metric over the past num_months.
-    Supports both store-level and company-level metrics.
+    Supports both store-level and company-level metrics. The built-in
+    calculators are served by get_metric_series in a single query; other
+    calculators are called once per calendar month.
     """
-    current_date = timezone.now()
-    historical_data = []
+    if metric_calculator_func in METRIC_CALCULATORS:
+        metric, _ = METRIC_CALCULATORS[metric_calculator_func]
+        return get_metric_series(identifier, metric, num_months, is_company=is_company)
 
     # Validate identifier exists
     if is_company:
@@ -153,29 +321,30 @@ def get_historical_monthly_data(identifier: str, metric_calculator_func: callabl
         if not Store.objects.filter(id=identifier).exists():
             raise ValueError(f"Store with ID {identifier} not found")
 
-    for i in range(num_months):
-        target_date = current_date - timedelta(days=30 * i)
-        year = target_date.year
-        month = target_date.month
-
-        value = metric_calculator_func(identifier, year, month)
-        historical_data.append({
-            'date': f"{year}-{month:02d}-01",
-            'value': value
-        })
+    return [
+        {
+            'date': start.strftime('%Y-%m-%d'),
+            'value': metric_calculator_func(identifier, start.year, start.month)
+        }
+        for start in period_starts(num_months)
+    ]
 
-    return sorted(historical_data, key=lambda x: x['date'])
+def has_prophet_history(historical_data: list) -> bool:
+    """Prophet needs at least 6 non-zero points; shorter histories use the trend forecaster."""
+    return sum(1 for d in historical_data if float(d['value']) > 0) >= 6
 
 def predict_future_months(historical_data: list, num_future_periods: int, metric: str = 'revenue') -> tuple[list, str]:
     """
     Predict future values using Prophet if enough data is available, otherwise use a simple trend-based approach.
     Returns both predictions and the method used.
     """
-    # Check if we have enough non-zero data points for Prophet
-    non_zero_data = [d for d in historical_data if float(d['value']) > 0]
-    
-    if len(non_zero_data) >= 6:
+    if has_prophet_history(historical_data):
         try:
+            # pandas and Prophet take seconds to import and a few hundred MB,
+            # so they are only loaded by the processes that actually fit
+            import pandas as pd
+            from prophet import Prophet
+
             # Use Prophet for prediction
             df = pd.DataFrame([
                 {'ds': pd.to_datetime(d['date']), 'y': float(d['value'])}
@@ -199,7 +368,9 @@ def predict_future_months(historical_data: list, num_future_periods: int, metric
             predictions = [
                 {
                     'date': row['ds'].strftime('%Y-%m-%d'),
-                    'predicted_value': max(0, float(row['yhat']))  # Ensure non-negative predictions
+                    'predicted_value': max(0, float(row['yhat'])),  # Ensure non-negative predictions
+                    'lower_bound': max(0, float(row['yhat_lower'])),
+                    'upper_bound': max(0, float(row['yhat_upper']))
                 }
                 for _, row in future_predictions.iterrows()
             ]
@@ -211,45 +382,102 @@ def predict_future_months(historical_data: list, num_future_periods: int, metric
         # Use trend-based prediction for small datasets
         return trend_based_prediction(historical_data, num_future_periods), 'trend_based'
 
-def trend_based_prediction(historical_data: list, num_future_periods: int) -> list:
+def trend_based_prediction(historical_data: list, num_future_periods: int, method: str = 'linear') -> list:
     """
     Make predictions based on simple trend analysis when there isn't enough data for Prophet.
     """
     if not historical_data:
         return []
-    
-    # Convert to numpy arrays for easier calculation
-    dates = [datetime.strptime(d['date'], '%Y-%m-%d') for d in historical_data]
-    values = [float(d['value']) for d in historical_data]
-    
-    # Calculate simple moving average and trend
-    if len(values) > 1:
-        # Calculate trend (average change per period)
-        changes = [values[i] - values[i-1] for i in range(1, len(values))]
-        avg_change = sum(changes) / len(changes)
-        
-        # Use last known value and trend for prediction
-        last_value = values[-1]
-        last_date = dates[-1]
-        
-        predictions = []
-        for i in range(num_future_periods):
-            next_date = last_date + timedelta(days=30 * (i + 1))
-            predicted_value = max(0, last_value + (avg_change * (i + 1)))  # Ensure non-negative
-            predictions.append({
-                'date': next_date.strftime('%Y-%m-%d'),
-                'predicted_value': predicted_value
-            })
-    else:
-        # If only one data point, use it as constant prediction
-        last_value = values[0]
-        last_date = dates[0]
-        predictions = []
-        for i in range(num_future_periods):
-            next_date = last_date + timedelta(days=30 * (i + 1))
-            predictions.append({
-                'date': next_date.strftime('%Y-%m-%d'),
-                'predicted_value': last_value
-            })
-    
-    return predictions 
\ No newline at end of file
+    return trend_based_predictions([historical_data], num_future_periods, method)[0]
+
+def trend_based_predictions(series_list: list, num_future_periods: int, method: str = 'linear') -> list:
+    """
+    Forecast many equally long monthly series in one vectorized pass with
+    the NumPy forecasters. Returns one prediction list per series, stepping
+    calendar months from each series' last date, with 95% bounds.
+    """
+    if not series_list:
+        return []
+
+    from predictions.forecasters import forecast_array
+
+    values = [[float(d['value']) for d in historical_data] for historical_data in series_list]
+    forecast, lower, upper = forecast_array(values, num_future_periods, method)
+
+    results = []
+    for i, historical_data in enumerate(series_list):
+        last_date = date.fromisoformat(historical_data[-1]['date'])
+        results.append([
+            {
+                'date': add_months(last_date, step + 1).strftime('%Y-%m-%d'),
+                'predicted_value': float(forecast[i, step]),
+                'lower_bound': float(lower[i, step]),
+                'upper_bound': float(upper[i, step])
+            }
+            for step in range(num_future_periods)
+        ])
+    return results
+
+# Bump when forecasting changes so stored forecasts are refitted
+FORECASTER_VERSION = 2
+
+def fingerprint_value(value) -> str:
+    """Canonical text of a series value, so 30, 30.00 and 30.0000 hash alike."""
+    value = Decimal(str(value)).normalize()
+    return format(value if value else Decimal('0'), 'f')
+
+def history_fingerprint(historical_data: list) -> str:
+    """Hash of a metric series; equal fingerprints mean the same fit inputs."""
+    series = [[d['date'], fingerprint_value(d['value'])] for d in historical_data]
+    return hashlib.sha256(json.dumps([FORECASTER_VERSION, series]).encode()).hexdigest()
+
+def get_forecast(identifier: str, metric: str, num_projection_months: int = 6, num_historical_months: int = 12, is_company: bool = False, refresh: bool = False) -> tuple[list, str]:
+    """
+    Return (predictions, method) for a store's or company's metric, reusing
+    the stored forecast while its history fingerprint still matches and
+    fitting (and storing) a new one otherwise. `refresh` forces a new fit.
+
+    The history is the num_historical_months closed months before the
+    current one, so sales in the month under way do not force a refit; the
+    projections start with the current month.
+    """
+    historical_data = get_metric_series(
+        identifier, metric, num_historical_months, is_company=is_company, end=last_closed_day()
+    )
+    fingerprint = history_fingerprint(historical_data)
+    key = forecast_key(identifier, metric, num_projection_months, num_historical_months, is_company)
+
+    if not refresh:
+        cached = Forecast.objects.filter(**key, history_fingerprint=fingerprint).values(
+            'projections', 'projection_method'
+        ).first()
+        if cached is not None:
+            return cached['projections'], cached['projection_method']
+
+    predictions, projection_method, fit_seconds = fit_forecast(historical_data, num_projection_months, metric)
+    save_forecast(key, fingerprint, predictions, projection_method, fit_seconds)
+    return predictions, projection_method
+
+def forecast_key(identifier: str, metric: str, num_projection_months: int, num_historical_months: int, is_company: bool = False) -> dict:
+    return {
+        'scope': Forecast.Scope.COMPANY if is_company else Forecast.Scope.STORE,
+        'identifier': identifier,
+        'metric': metric,
+        'num_historical_months': num_historical_months,
+        'num_projection_months': num_projection_months,
+    }
+
+def fit_forecast(historical_data: list, num_projection_months: int, metric: str) -> tuple[list, str, float]:
+    """Fit one series and return (predictions, method, seconds spent fitting)."""
+    started = perf_counter()
+    predictions, projection_method = predict_future_months(historical_data, num_projection_months, metric=metric)
+    return predictions, projection_method, perf_counter() - started
+
+def save_forecast(key: dict, fingerprint: str, predictions: list, projection_method: str, fit_seconds: float):
+    Forecast.objects.update_or_create(**key, defaults={
+        'history_fingerprint': fingerprint,
+        'projection_method': projection_method,
+        'projections': predictions,
+        'fit_seconds': fit_seconds,
+    })
+    logger.info(f"Fitted {key['metric']} forecast for {key['scope']} {key['identifier']} in {fit_seconds:.2f}s ({projection_method})")
@@ -1,3 +1,283 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import unittest
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from unittest import mock
+from django.utils import timezone
+from transactions.models import Sale, SaleItem
+from transactions.tests import SaleTestData
+from core_auth.utils import StatelessUser
+import numpy as np
+from predictions import batch, services
+from predictions.forecasters import forecast_array, linear_trend, seasonal_naive
+from predictions.models import Forecast
+from predictions.services import add_months, get_forecast, get_metric_series, period_start, period_starts
 
-# Create your tests here.
+# Run in a fresh interpreter: load settings, apps and the URLconf the way a
+# gunicorn worker does, then report the cost
+WORKER_STARTUP_SCRIPT = """
+import json, resource, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({
+    'seconds': time.perf_counter() - started,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'heavy_modules': [name for name in %r if name in sys.modules],
+}))
+"""
+
+HEAVY_MODULES = ('pandas', 'prophet', 'cmdstanpy', 'numpy')
+
+
+class WorkerStartupBenchmarkTests(SimpleTestCase):
+    """
+    Guards core_service worker startup against regressions. Loading the app
+    without the forecasting stack took about 0.8s and 70 MB RSS; importing
+    pandas and Prophet eagerly roughly doubled both.
+    """
+    MAX_SECONDS = 4.0
+    MAX_RSS_MB = 110
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if sys.platform not in ('linux', 'darwin'):
+            raise unittest.SkipTest('resource module unavailable')
+
+        result = subprocess.run(
+            [sys.executable, '-c', WORKER_STARTUP_SCRIPT % (HEAVY_MODULES,)],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'core_service.settings'},
+            capture_output=True,
+            text=True,
+            timeout=120
+        )
+        if result.returncode:
+            raise AssertionError(f"Worker startup failed:\n{result.stderr}")
+        # settings.py prints while loading; the report is the last line
+        cls.startup = json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_forecasting_stack_not_imported(self):
+        self.assertEqual(self.startup['heavy_modules'], [])
+
+    def test_startup_time(self):
+        self.assertLess(self.startup['seconds'], self.MAX_SECONDS)
+
+    def test_startup_memory(self):
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        self.assertLess(self.startup['max_rss_kb'] / divisor, self.MAX_RSS_MB)
+
+
+class PeriodStepTests(SimpleTestCase):
+    def test_months_step_by_calendar_month(self):
+        self.assertEqual(add_months(date(2024, 1, 31), 1), date(2024, 2, 1))
+        self.assertEqual(add_months(date(2024, 3, 15), -3), date(2023, 12, 1))
+        self.assertEqual(
+            period_starts(3, 'month', end=date(2025, 1, 15)),
+            [date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1)]
+        )
+
+    def test_weeks_start_on_monday(self):
+        # 2025-01-01 is a Wednesday
+        self.assertEqual(period_starts(2, 'week', end=date(2025, 1, 1)), [date(2024, 12, 23), date(2024, 12, 30)])
+
+    def test_days(self):
+        self.assertEqual(period_starts(2, 'day', end=date(2025, 3, 1)), [date(2025, 2, 28), date(2025, 3, 1)])
+
+
+class SeriesTestCase(TestCase):
+    def setUp(self):
+        self.store, self.products, self.customer, _ = SaleTestData.create_store_with_products()
+        self.today = timezone.localdate()
+
+    def add_sale(self, day, quantity, item_sale_price=None, item_cost_price=None):
+        sale = Sale.objects.create(store_id=self.store, customer=self.customer, total_amount=Decimal('0'))
+        Sale.objects.filter(id=sale.id).update(
+            created_at=timezone.make_aware(datetime.combine(day, time(12)))
+        )
+        SaleItem.objects.create(
+            sale=sale, product=self.products[0], quantity=quantity,
+            item_sale_price=item_sale_price, item_cost_price=item_cost_price
+        )
+
+
+class MetricSeriesTests(SeriesTestCase):
+
+    def values(self, metric, num_periods, period):
+        return [point['value'] for point in get_metric_series(str(self.store.id), metric, num_periods, period)]
+
+    def test_monthly_series_zero_fills_gaps_and_uses_item_prices(self):
+        this_month = period_start(self.today)
+        self.add_sale(add_months(this_month, -2), 2, item_sale_price=Decimal('15'), item_cost_price=Decimal('6'))
+        self.add_sale(this_month, 1)
+
+        self.assertEqual(self.values('revenue', 4, 'month'), [0, Decimal('30'), 0, Decimal('10')])
+        self.assertEqual(self.values('profit', 4, 'month'), [0, Decimal('18'), 0, Decimal('6')])
+
+    def test_weekly_series(self):
+        this_week = period_start(self.today, 'week')
+        self.add_sale(this_week - timedelta(weeks=2), 1)
+        self.add_sale(this_week, 3)
+
+        self.assertEqual(self.values('revenue', 3, 'week'), [Decimal('10'), 0, Decimal('30')])
+
+    def test_daily_series(self):
+        self.add_sale(self.today - timedelta(days=2), 1)
+        self.add_sale(self.today, 2)
+
+        self.assertEqual(self.values('revenue', 3, 'day'), [Decimal('10'), 0, Decimal('20')])
+
+
+class ForecastCacheTests(SeriesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.this_month = period_start(self.today)
+        self.add_sale(add_months(self.this_month, -2), 2)
+        self.add_sale(add_months(self.this_month, -1), 3)
+
+    def forecast(self, **kwargs):
+        with mock.patch.object(services, 'fit_forecast', wraps=services.fit_forecast) as fit_forecast:
+            predictions, _ = get_forecast(str(self.store.id), 'revenue', 2, 3, **kwargs)
+        return predictions, fit_forecast.call_count
+
+    def test_fits_once_and_reuses_the_stored_forecast(self):
+        first, fits = self.forecast()
+        self.assertEqual(fits, 1)
+
+        second, fits = self.forecast()
+        self.assertEqual(fits, 0)
+        self.assertEqual(second, first)
+        self.assertEqual(Forecast.objects.count(), 1)
+
+    def test_sales_in_the_current_month_do_not_invalidate(self):
+        self.forecast()
+        self.add_sale(self.today, 5)
+
+        _, fits = self.forecast()
+        self.assertEqual(fits, 0)
+
+    def test_changes_to_a_closed_month_refit(self):
+        self.forecast()
+        self.add_sale(add_months(self.this_month, -1), 1)
+
+        _, fits = self.forecast()
+        self.assertEqual(fits, 1)
+
+    def test_refresh_forces_a_fit(self):
+        self.forecast()
+        _, fits = self.forecast(refresh=True)
+        self.assertEqual(fits, 1)
+
+    def test_projections_start_with_the_current_month(self):
+        predictions, _ = self.forecast()
+        self.assertEqual(
+            [prediction['date'] for prediction in predictions],
+            [self.this_month.isoformat(), add_months(self.this_month, 1).isoformat()]
+        )
+
+    def test_batch_and_single_forecasts_share_the_cache(self):
+        company_id = str(self.store.company_id_id)
+        with mock.patch.object(batch, 'fit_all', wraps=batch.fit_all) as fit_all:
+            batch.forecast_company(company_id, ['revenue'], 2, 3)
+        self.assertEqual(len(fit_all.call_args.args[0]), 2)
+
+        # The company aggregate is summed in Python but hashes like the company query
+        _, fits = self.forecast()
+        self.assertEqual(fits, 0)
+        with mock.patch.object(services, 'fit_forecast', wraps=services.fit_forecast) as fit_forecast:
+            get_forecast(company_id, 'revenue', 2, 3, is_company=True)
+        self.assertEqual(fit_forecast.call_count, 0)
+
+        with mock.patch.object(batch, 'fit_all', wraps=batch.fit_all) as fit_all:
+            batch.forecast_company(company_id, ['revenue'], 2, 3)
+        self.assertEqual(fit_all.call_args.args[0], [])
+        self.assertEqual(Forecast.objects.count(), 2)
+
+
+class CompanyBatchPredictionViewTests(SeriesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(StatelessUser({'id': 'prediction-tests', 'role': 'admin'}))
+        self.url = reverse('predict_company_batch', kwargs={'company_id': self.store.company_id_id})
+        self.add_sale(add_months(period_start(self.today), -1), 2)
+
+    def test_invalid_parameters_are_rejected(self):
+        for data in (
+            {'num_projection_months': 'abc'},
+            {'num_historical_months': 0},
+            {'metrics': ['revenue', 'weather']},
+            {'metrics': []},
+        ):
+            response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code, 400, data)
+
+    def test_fits_in_process(self):
+        with mock.patch.object(batch, 'ProcessPoolExecutor') as pool, \
+                mock.patch.object(batch, 'has_prophet_history', return_value=True), \
+                mock.patch.object(batch, 'run_fit', return_value=([], 'prophet', 0.0)):
+            response = self.client.post(
+                self.url, {'metrics': ['revenue', 'revenue'], 'num_projection_months': '2'}, format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        pool.assert_not_called()
+        self.assertEqual((response.data['workers'], response.data['fitted']), (1, 2))
+        self.assertEqual(response.data['metrics_predicted'], ['revenue'])
+
+
+class ForecasterTests(SimpleTestCase):
+    def test_batch_output_shape(self):
+        values = np.arange(24, dtype=float).reshape(3, 8)
+        for method in ('linear', 'seasonal_naive', 'exponential_smoothing'):
+            with self.subTest(method=method):
+                forecast, lower, upper = forecast_array(values, 5, method)
+                self.assertEqual([forecast.shape, lower.shape, upper.shape], [(3, 5)] * 3)
+                self.assertTrue((lower <= forecast).all() and (forecast <= upper).all())
+
+    def test_linear_series_is_extended_exactly(self):
+        forecast, lower, upper = linear_trend([[3, 5, 7, 9, 11]], 3)
+        np.testing.assert_allclose(forecast, [[13, 15, 17]])
+        # A perfect fit leaves no residual spread
+        np.testing.assert_allclose(upper - lower, np.zeros((1, 3)), atol=1e-9)
+
+    def test_one_and_two_points(self):
+        forecast, lower, upper = linear_trend([[4]], 2)
+        np.testing.assert_allclose(forecast, [[4, 4]])
+        np.testing.assert_allclose(upper, forecast)
+
+        forecast, _, _ = linear_trend([[4, 6]], 2)
+        np.testing.assert_allclose(forecast, [[8, 10]])
+
+        forecast, _, _ = seasonal_naive([[4]], 2)
+        np.testing.assert_allclose(forecast, [[4, 4]])
+
+    def test_series_shorter_than_a_season_repeats_the_last_value(self):
+        forecast, lower, upper = seasonal_naive([[1, 2, 6]], 3, season_length=12)
+        np.testing.assert_allclose(forecast, [[6, 6, 6]])
+        # The interval widens with the horizon
+        self.assertTrue((np.diff(upper - lower) > 0).all())
+
+    def test_full_season_is_repeated(self):
+        forecast, _, _ = seasonal_naive([[1, 2, 3, 4, 5, 6]], 4, season_length=3)
+        np.testing.assert_allclose(forecast, [[4, 5, 6, 4]])
+
+    def test_predictions_are_clipped_at_zero(self):
+        forecast, lower, upper = forecast_array([[9, 6, 3, 0]], 3, 'linear')
+        np.testing.assert_allclose(forecast, np.zeros((1, 3)))
+        self.assertTrue((lower >= 0).all() and (upper >= 0).all())
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            forecast_array([[1, 2]], 1, 'arima')
@@ -3,16 +3,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from companies.models import Store, Company
-from .services import (
-    calculate_monthly_revenue,
-    calculate_monthly_profit,
-    calculate_monthly_customers,
-    calculate_company_monthly_revenue,
-    calculate_company_monthly_profit,
-    calculate_company_monthly_customers,
-    get_historical_monthly_data,
-    predict_future_months
-)
+from .batch import forecast_company
+from .serializers import BatchPredictionSerializer
+from .services import get_forecast
 
 # Create your views here.
 
@@ -36,20 +29,14 @@ class RevenuePredictionAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get historical data
-        historical_data = get_historical_monthly_data(
+        # Reuse the stored forecast unless the history changed
+        predictions, projection_method = get_forecast(
             store_id,
-            calculate_monthly_revenue,
+            'revenue',
+            num_projection_months,
             num_historical_months
         )
 
-        # Generate predictions
-        predictions = predict_future_months(historical_data, num_projection_months)
-
-        # Determine projection method based on data availability
-        non_zero_data = [d for d in historical_data if float(d['value']) > 0]
-        projection_method = 'prophet' if len(non_zero_data) >= 6 else 'trend_based'
-
         return Response({
             'store_id': store_id,
             'metric_predicted': 'revenue',
@@ -78,20 +65,14 @@ class ProfitPredictionAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get historical data
-        historical_data = get_historical_monthly_data(
+        # Reuse the stored forecast unless the history changed
+        predictions, projection_method = get_forecast(
             store_id,
-            calculate_monthly_profit,
+            'profit',
+            num_projection_months,
             num_historical_months
         )
 
-        # Generate predictions
-        predictions = predict_future_months(historical_data, num_projection_months)
-
-        # Determine projection method based on data availability
-        non_zero_data = [d for d in historical_data if float(d['value']) > 0]
-        projection_method = 'prophet' if len(non_zero_data) >= 6 else 'trend_based'
-
         return Response({
             'store_id': store_id,
             'metric_predicted': 'profit',
@@ -120,18 +101,12 @@ class CustomerPredictionAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get historical data
-        historical_data = get_historical_monthly_data(
+        # Reuse the stored forecast unless the history changed
+        predictions, projection_method = get_forecast(
             store_id,
-            calculate_monthly_customers,
-            num_historical_months
-        )
-
-        # Generate predictions
-        predictions, projection_method = predict_future_months(
-            historical_data,
+            'customers',
             num_projection_months,
-            metric='customers'
+            num_historical_months
         )
 
         return Response({
@@ -156,21 +131,15 @@ class CompanyRevenuePredictionAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Get historical data
-            historical_data = get_historical_monthly_data(
+            # Reuse the stored forecast unless the history changed
+            predictions, projection_method = get_forecast(
                 company_id,
-                calculate_company_monthly_revenue,
+                'revenue',
+                num_projection_months,
                 num_historical_months,
                 is_company=True
             )
 
-            # Generate predictions
-            predictions, projection_method = predict_future_months(
-                historical_data,
-                num_projection_months,
-                metric='revenue'
-            )
-
             return Response({
                 'company_id': company_id,
                 'metric_predicted': 'revenue',
@@ -198,21 +167,15 @@ class CompanyProfitPredictionAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Get historical data
-            historical_data = get_historical_monthly_data(
+            # Reuse the stored forecast unless the history changed
+            predictions, projection_method = get_forecast(
                 company_id,
-                calculate_company_monthly_profit,
+                'profit',
+                num_projection_months,
                 num_historical_months,
                 is_company=True
             )
 
-            # Generate predictions
-            predictions, projection_method = predict_future_months(
-                historical_data,
-                num_projection_months,
-                metric='profit'
-            )
-
             return Response({
                 'company_id': company_id,
                 'metric_predicted': 'profit',
@@ -240,21 +203,15 @@ class CompanyCustomerPredictionAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Get historical data
-            historical_data = get_historical_monthly_data(
+            # Reuse the stored forecast unless the history changed
+            predictions, projection_method = get_forecast(
                 company_id,
-                calculate_company_monthly_customers,
+                'customers',
+                num_projection_months,
                 num_historical_months,
                 is_company=True
             )
 
-            # Generate predictions
-            predictions, projection_method = predict_future_months(
-                historical_data,
-                num_projection_months,
-                metric='customers'
-            )
-
             return Response({
                 'company_id': company_id,
                 'metric_predicted': 'customers',
@@ -267,3 +224,28 @@ class CompanyCustomerPredictionAPIView(APIView):
                 {'error': str(e)},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+class CompanyBatchPredictionAPIView(APIView):
+    def post(self, request, company_id):
+        serializer = BatchPredictionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
+
+        try:
+            # Forecast every store and the company aggregate in one pass. Fits
+            # run in this process, since forking a pool from a web worker
+            # copies its open connections; the forecast_company and
+            # precompute_forecasts commands fit across processes
+            return Response(forecast_company(
+                company_id,
+                params['metrics'],
+                params['num_projection_months'],
+                params['num_historical_months'],
+                max_workers=1
+            ))
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
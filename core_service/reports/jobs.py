@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from functools import wraps
+from django.db import transaction, IntegrityError
+from django.http import QueryDict
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from reports.models import Report, ReportJob
+
+logger = logging.getLogger(__name__)
+
+ASYNC_PARAM = 'async'
+ASYNC_TRUE_VALUES = ('1', 'true', 'yes')
+ACTIVE_STATUSES = [ReportJob.Status.PENDING, ReportJob.Status.RUNNING]
+
+# Views whose `get` the worker runs for each report type
+REPORT_VIEWS = {
+    Report.ReportType.SALES: 'reports.views.GenerateSalesReportView',
+    Report.ReportType.INVENTORY: 'reports.views.GenerateInventoryReportView',
+    Report.ReportType.FINANCIAL: 'reports.views.GenerateFinancialReportView',
+    Report.ReportType.CUSTOMER: 'reports.views.GenerateCustomerReportView',
+    Report.ReportType.PRODUCT: 'reports.views.GenerateProductPerformanceReportView',
+    Report.ReportType.PROFIT: 'reports.views.GenerateProfitReportView',
+    Report.ReportType.REVENUE: 'reports.views.GenerateRevenueReportView',
+    Report.ReportType.PURCHASE: 'reports.views.GeneratePurchaseReportView',
+}
+
+
+class JobRequest:
+    """The part of a DRF request the report views read, rebuilt from stored job params."""
+
+    def __init__(self, params):
+        self.query_params = QueryDict(mutable=True)
+        for key, value in params.items():
+            self.query_params[key] = value
+
+
+def wants_async(request):
+    return request.query_params.get(ASYNC_PARAM, '').lower() in ASYNC_TRUE_VALUES
+
+
+def job_params(request):
+    return {
+        key: value
+        for key, value in request.query_params.items()
+        if key != ASYNC_PARAM
+    }
+
+
+def params_key(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def enqueue_report_job(store_id, report_type, params):
+    """
+    Queue a report job, or return the pending/running job for an identical
+    request so concurrent callers share one computation.
+    """
+    key = params_key(params)
+    active = ReportJob.objects.filter(
+        store_id=store_id,
+        report_type=report_type,
+        params_key=key,
+        status__in=ACTIVE_STATUSES
+    )
+
+    job = active.first()
+    if job:
+        return job
+
+    try:
+        with transaction.atomic():
+            return ReportJob.objects.create(
+                store_id=store_id,
+                report_type=report_type,
+                params=params,
+                params_key=key
+            )
+    except IntegrityError:
+        # An identical request queued its job first
+        job = active.first()
+        if job is None:
+            raise
+        return job
+
+
+def job_status_data(job, include_result=True):
+    data = {
+        'job_id': job.id,
+        'store_id': job.store_id,
+        'report_type': job.report_type,
+        'params': job.params,
+        'status': job.status,
+        'status_url': reverse('report-job-detail', kwargs={'job_id': job.id}),
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+    if job.status == ReportJob.Status.FAILED:
+        data['error'] = job.error
+    if include_result and job.status == ReportJob.Status.COMPLETED:
+        data['result'] = job.result
+    return data
+
+
+def async_report(report_type):
+    """
+    Let a report view's `get` run as a background job.
+
+    With `?async=1` the request is queued (or joined to an identical queued
+    request) and answered with 202 and the job's status URL; the
+    `run_report_jobs` worker generates the report later. Without it the
+    view runs inline as before.
+    """
+    def decorator(get):
+        @wraps(get)
+        def wrapper(view, request, store_id, *args, **kwargs):
+            if not wants_async(request):
+                return get(view, request, store_id, *args, **kwargs)
+
+            job = enqueue_report_job(store_id, report_type, job_params(request))
+            response = Response(job_status_data(job, include_result=False), status=status.HTTP_202_ACCEPTED)
+            response['Location'] = reverse('report-job-detail', kwargs={'job_id': job.id})
+            return response
+        return wrapper
+    return decorator
+
+
+def claim_next_job():
+    """Mark the oldest pending job as running and return it, or None if the queue is empty."""
+    with transaction.atomic():
+        job = ReportJob.objects.select_for_update(skip_locked=True).filter(
+            status=ReportJob.Status.PENDING
+        ).order_by('created_at').first()
+        if job is None:
+            return None
+
+        now = timezone.now()
+        # The status guard keeps two workers from claiming the same job on
+        # databases without row locks
+        claimed = ReportJob.objects.filter(pk=job.pk, status=ReportJob.Status.PENDING).update(
+            status=ReportJob.Status.RUNNING,
+            started_at=now,
+            updated_at=now
+        )
+        if not claimed:
+            return None
+
+    job.status = ReportJob.Status.RUNNING
+    job.started_at = now
+    return job
+
+
+def run_report_job(job):
+    """Generate the report for a claimed job and store its result or error."""
+    try:
+        view = import_string(REPORT_VIEWS[job.report_type])()
+        response = view.get(JobRequest(job.params), job.store_id)
+        if response.status_code == status.HTTP_200_OK:
+            job.result = json.loads(json.dumps(response.data, cls=JSONEncoder))
+            job.status = ReportJob.Status.COMPLETED
+        else:
+            job.error = json.dumps(response.data, cls=JSONEncoder)
+            job.status = ReportJob.Status.FAILED
+    except Exception as e:
+        logger.exception(f"Report job {job.id} failed")
+        job.error = str(e)
+        job.status = ReportJob.Status.FAILED
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at', 'updated_at'])
+    return job
+
+
+def requeue_stale_jobs(timeout):
+    """Return jobs left running longer than `timeout` seconds (e.g. by a killed worker) to the queue."""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return ReportJob.objects.filter(
+        status=ReportJob.Status.RUNNING,
+        started_at__lt=cutoff
+    ).update(status=ReportJob.Status.PENDING, started_at=None, updated_at=timezone.now())
+
+
+def prune_finished_jobs(retention_days):
+    """Delete completed and failed jobs, with their results, finished more than `retention_days` ago."""
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = ReportJob.objects.filter(
+        status__in=[ReportJob.Status.COMPLETED, ReportJob.Status.FAILED],
+        finished_at__lt=cutoff
+    ).delete()
+    return deleted
@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connection
+from reports.jobs import claim_next_job, prune_finished_jobs, run_report_job, requeue_stale_jobs
+
+# Seconds between retention passes while the workers are idle
+PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Runs queued report jobs (requested with ?async=1) in a pool of worker threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of jobs generated concurrently')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=900,
+                            help='Requeue jobs left running longer than this many seconds')
+        parser.add_argument('--retention-days', type=int, default=7,
+                            help='Delete finished and failed jobs older than this')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(options['stale_after'])
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale report jobs'))
+
+        self.retention_days = options['retention_days']
+        self.prune_lock = threading.Lock()
+        self.next_prune = 0
+        self.prune()
+
+        stop = threading.Event()
+        workers = max(1, options['workers'])
+        self.stdout.write(f'Starting {workers} report job workers')
+
+        if workers == 1:
+            processed = self.work(stop, options['poll_interval'], options['once'])
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-job') as pool:
+                futures = [
+                    pool.submit(self.pool_work, stop, options['poll_interval'], options['once'])
+                    for _ in range(workers)
+                ]
+                try:
+                    processed = sum(future.result() for future in futures)
+                except KeyboardInterrupt:
+                    stop.set()
+                    processed = sum(future.result() for future in futures)
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} report jobs'))
+
+    def pool_work(self, stop, poll_interval, once):
+        try:
+            return self.work(stop, poll_interval, once)
+        finally:
+            # Each pool thread opens its own database connection
+            connection.close()
+
+    def work(self, stop, poll_interval, once):
+        processed = 0
+        while not stop.is_set():
+            job = claim_next_job()
+            if job is None:
+                self.prune()
+                if once:
+                    break
+                stop.wait(poll_interval)
+                continue
+
+            started = time.monotonic()
+            job = run_report_job(job)
+            processed += 1
+            self.stdout.write(
+                f'{job.report_type} job {job.id} {job.status.lower()} in {time.monotonic() - started:.2f}s'
+            )
+        return processed
+
+    def prune(self):
+        """Run the retention pass, at most once per PRUNE_INTERVAL across all workers."""
+        with self.prune_lock:
+            if time.monotonic() < self.next_prune:
+                return
+            self.next_prune = time.monotonic() + PRUNE_INTERVAL
+        pruned = prune_finished_jobs(self.retention_days)
+        if pruned:
+            self.stdout.write(f'Pruned {pruned} finished report jobs')
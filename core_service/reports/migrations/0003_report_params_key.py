@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0004_remove_subscriptionplan_features_and_more'),
+        ('reports', '0002_report_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='report',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='params_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AlterUniqueTogether(
+            name='report',
+            unique_together={('store', 'report_type', 'date_range_start', 'date_range_end', 'params_key')},
+        ),
+    ]
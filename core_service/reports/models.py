@@ -1,128 +1,300 @@
-# from django.db import models
-# import uuid
-# from django.utils import timezone
-# from decimal import Decimal
-
-# class Report(models.Model):
-#     class ReportType(models.TextChoices):
-#         SALES = 'SALES', 'Sales Report'
-#         INVENTORY = 'INVENTORY', 'Inventory Report'
-#         FINANCIAL = 'FINANCIAL', 'Financial Report'
-#         CUSTOMER = 'CUSTOMER', 'Customer Report'
-#         PRODUCT = 'PRODUCT', 'Product Performance Report'
-#         PROFIT = 'PROFIT', 'Profit Report'
-#         REVENUE = 'REVENUE', 'Revenue Report'
-    
-#     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-#     store = models.ForeignKey('companies.Store', on_delete=models.CASCADE)
-#     report_type = models.CharField(max_length=20, choices=ReportType.choices)
-#     title = models.CharField(max_length=255)
-#     description = models.TextField(blank=True)
-#     date_range_start = models.DateTimeField()
-#     date_range_end = models.DateTimeField()
-#     created_at = models.DateTimeField(auto_now_add=True)
-#     updated_at = models.DateTimeField(auto_now=True)
-    
-#     class Meta:
-#         ordering = ['-created_at']
-    
-#     def __str__(self):
-#         return f"{self.title} - {self.store.name}"
-
-
-# class SalesReport(models.Model):
-#     report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
-#     total_sales = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     total_items_sold = models.IntegerField(default=0)
-#     average_sale_value = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0')) 
-#     highest_sale_value = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     total_credit_sales = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     total_cash_sales = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     top_selling_products = models.JSONField(default=dict)
-#     daily_sales_breakdown = models.JSONField(default=dict)
-    
-#     def __str__(self):
-#         return f"Sales Report - {self.report.store.name}"
-
-
-# class InventoryReport(models.Model):
-#     report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
-#     total_products = models.IntegerField(default=0)
-#     low_stock_products = models.JSONField(default=dict)
-#     out_of_stock_products = models.JSONField(default=dict)
-#     overstocked_products = models.JSONField(default=dict)
-#     inventory_value = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     inventory_turnover_rate = models.DecimalField(max_digits=10, decimal_places=4, default=Decimal('0'))
-    
-#     def __str__(self):
-#         return f"Inventory Report - {self.report.store.name}"
-
-
-# class FinancialReport(models.Model):
-#     report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
-#     total_sales = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     total_expenses = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     total_purchases = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     total_payment_ins = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     total_payment_outs = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     gross_profit = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     net_profit = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     profit_margin_percentage = models.DecimalField(max_digits=10, decimal_places=4, default=Decimal('0'))
-#     expense_breakdown = models.JSONField(default=dict)
-    
-#     def __str__(self):
-#         return f"Financial Report - {self.report.store.name}"
-
-
-# class CustomerReport(models.Model):
-#     report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
-#     total_customers = models.IntegerField(default=0)
-#     new_customers = models.IntegerField(default=0)
-#     returning_customers = models.IntegerField(default=0)
-#     top_customers = models.JSONField(default=dict)
-#     average_purchase_value = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     customer_retention_rate = models.DecimalField(max_digits=10, decimal_places=4, default=Decimal('0'))
-    
-#     def __str__(self):
-#         return f"Customer Report - {self.report.store.name}"
-
-
-# class ProductPerformanceReport(models.Model):
-#     report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
-#     top_performing_products = models.JSONField(default=dict)
-#     worst_performing_products = models.JSONField(default=dict)
-#     product_category_breakdown = models.JSONField(default=dict)
-#     seasonal_product_trends = models.JSONField(default=dict)
-    
-#     def __str__(self):
-#         return f"Product Performance Report - {self.report.store.name}"
-
-
-# class ProfitReport(models.Model):
-#     report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
-#     gross_profit = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     net_profit = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     profit_margin_percentage = models.DecimalField(max_digits=10, decimal_places=4, default=Decimal('0'))
-#     sales_revenue = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     cost_of_goods_sold = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     operating_expenses = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     profit_by_product_category = models.JSONField(default=dict)
-#     profit_trend = models.JSONField(default=dict)  # Daily/monthly trend data
-    
-#     def __str__(self):
-#         return f"Profit Report - {self.report.store.name}"
-
-
-# class RevenueReport(models.Model):
-#     report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
-#     total_revenue = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     sales_revenue = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     other_revenue = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-#     revenue_by_payment_mode = models.JSONField(default=dict)
-#     revenue_by_product_category = models.JSONField(default=dict)
-#     daily_revenue = models.JSONField(default=dict)
-#     monthly_revenue = models.JSONField(default=dict)
-#     average_daily_revenue = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
-    
-#     def __str__(self):
-#         return f"Revenue Report - {self.report.store.name}"
+from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.core.exceptions import ObjectDoesNotExist
+import uuid
+from decimal import Decimal
+
+class Report(models.Model):
+    """
+    Snapshot of a generated report for a closed date range.
+
+    `data` holds the full report payload exactly as the report endpoint
+    returned it; the per-type models below keep the headline figures in
+    typed columns.
+    """
+    class ReportType(models.TextChoices):
+        SALES = 'SALES', 'Sales Report'
+        INVENTORY = 'INVENTORY', 'Inventory Report'
+        FINANCIAL = 'FINANCIAL', 'Financial Report'
+        CUSTOMER = 'CUSTOMER', 'Customer Report'
+        PRODUCT = 'PRODUCT', 'Product Performance Report'
+        PROFIT = 'PROFIT', 'Profit Report'
+        REVENUE = 'REVENUE', 'Revenue Report'
+        PURCHASE = 'PURCHASE', 'Purchase Report'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    store = models.ForeignKey('companies.Store', on_delete=models.CASCADE)
+    report_type = models.CharField(max_length=20, choices=ReportType.choices)
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    date_range_start = models.DateTimeField()
+    date_range_end = models.DateTimeField()
+    # Hash of the report's other query parameters; empty when it has none
+    params_key = models.CharField(max_length=64, blank=True, default='')
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'reports'
+        ordering = ['-created_at']
+        unique_together = ['store', 'report_type', 'date_range_start', 'date_range_end', 'params_key']
+
+    def __str__(self):
+        return f"{self.title} - {self.store.name}"
+
+
+class SalesReport(models.Model):
+    report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
+    total_sales = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    total_items_sold = models.IntegerField(default=0)
+    average_sale_value = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    highest_sale_value = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    total_credit_sales = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    total_cash_sales = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    top_selling_products = models.JSONField(default=dict)
+    daily_sales_breakdown = models.JSONField(default=dict)
+
+    # Report payload keys for fields whose names differ from the payload
+    payload_fields = {
+        'total_sales': 'total_amount_received',
+        'average_sale_value': 'average_sale_received',
+        'total_credit_sales': 'credit_sales_amount',
+        'total_cash_sales': 'cash_sales_amount',
+    }
+
+    class Meta:
+        db_table = 'sales_reports'
+
+    def __str__(self):
+        return f"Sales Report - {self.report.store.name}"
+
+
+class InventoryReport(models.Model):
+    report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
+    total_products = models.IntegerField(default=0)
+    low_stock_products = models.JSONField(default=dict)
+    out_of_stock_products = models.JSONField(default=dict)
+    overstocked_products = models.JSONField(default=dict)
+    inventory_value = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    inventory_turnover_rate = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+
+    class Meta:
+        db_table = 'inventory_reports'
+
+    def __str__(self):
+        return f"Inventory Report - {self.report.store.name}"
+
+
+class FinancialReport(models.Model):
+    report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
+    total_sales = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    total_expenses = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    total_purchases = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    total_payment_ins = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    total_payment_outs = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    gross_profit = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    net_profit = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    profit_margin_percentage = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    expense_breakdown = models.JSONField(default=dict)
+
+    class Meta:
+        db_table = 'financial_reports'
+
+    def __str__(self):
+        return f"Financial Report - {self.report.store.name}"
+
+
+class CustomerReport(models.Model):
+    report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
+    total_customers = models.IntegerField(default=0)
+    new_customers = models.IntegerField(default=0)
+    returning_customers = models.IntegerField(default=0)
+    top_customers = models.JSONField(default=dict)
+    average_purchase_value = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    customer_retention_rate = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+
+    class Meta:
+        db_table = 'customer_reports'
+
+    def __str__(self):
+        return f"Customer Report - {self.report.store.name}"
+
+
+class ProductPerformanceReport(models.Model):
+    report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
+    top_performing_products = models.JSONField(default=dict)
+    worst_performing_products = models.JSONField(default=dict)
+    product_category_breakdown = models.JSONField(default=dict)
+    seasonal_product_trends = models.JSONField(default=dict)
+
+    class Meta:
+        db_table = 'product_performance_reports'
+
+    def __str__(self):
+        return f"Product Performance Report - {self.report.store.name}"
+
+
+class ProfitReport(models.Model):
+    report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
+    gross_profit = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    net_profit = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    profit_margin_percentage = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    sales_revenue = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    cost_of_goods_sold = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    operating_expenses = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    profit_by_product_category = models.JSONField(default=dict)
+    profit_trend = models.JSONField(default=dict)  # Daily/monthly trend data
+
+    class Meta:
+        db_table = 'profit_reports'
+
+    def __str__(self):
+        return f"Profit Report - {self.report.store.name}"
+
+
+class RevenueReport(models.Model):
+    report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
+    total_revenue = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    sales_revenue = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    other_revenue = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    revenue_by_payment_mode = models.JSONField(default=dict)
+    revenue_by_product_category = models.JSONField(default=dict)
+    daily_revenue = models.JSONField(default=dict)
+    monthly_revenue = models.JSONField(default=dict)
+    average_daily_revenue = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+
+    class Meta:
+        db_table = 'revenue_reports'
+
+    def __str__(self):
+        return f"Revenue Report - {self.report.store.name}"
+
+
+class PurchaseReport(models.Model):
+    report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True)
+    total_amount_paid = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    total_amount_expected = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    total_items_purchased = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    highest_purchase_value = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    outstanding_amount = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+    top_suppliers = models.JSONField(default=dict)
+    top_purchased_products = models.JSONField(default=dict)
+
+    class Meta:
+        db_table = 'purchase_reports'
+
+    def __str__(self):
+        return f"Purchase Report - {self.report.store.name}"
+
+
+class ReportJob(models.Model):
+    """
+    A report generation request queued for the `run_report_jobs` worker.
+
+    Identical requests (same store, report type and query parameters) that
+    arrive while a job is still pending or running share that job.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        COMPLETED = 'COMPLETED', 'Completed'
+        FAILED = 'FAILED', 'Failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    store = models.ForeignKey('companies.Store', on_delete=models.CASCADE)
+    report_type = models.CharField(max_length=20, choices=Report.ReportType.choices)
+    params = models.JSONField(default=dict)
+    params_key = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'report_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='report_jobs_status_created'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['store', 'report_type', 'params_key'],
+                condition=models.Q(status__in=['PENDING', 'RUNNING']),
+                name='report_jobs_unique_active'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.report_type} job {self.id} ({self.status})"
+
+
+REPORT_DETAIL_MODELS = {
+    Report.ReportType.SALES: SalesReport,
+    Report.ReportType.INVENTORY: InventoryReport,
+    Report.ReportType.FINANCIAL: FinancialReport,
+    Report.ReportType.CUSTOMER: CustomerReport,
+    Report.ReportType.PRODUCT: ProductPerformanceReport,
+    Report.ReportType.PROFIT: ProfitReport,
+    Report.ReportType.REVENUE: RevenueReport,
+    Report.ReportType.PURCHASE: PurchaseReport,
+}
+
+
+# Reports that also read before their range: the customer report compares
+# against the previous period and reports retention of earlier cohorts
+LOOKBACK_REPORT_TYPES = [Report.ReportType.CUSTOMER]
+
+
+def invalidate_report_snapshots(store_id, timestamp):
+    """
+    Drop every stored report whose computation reads the given write: those
+    whose date range covers it, and look-back reports ending after it.
+    """
+    if not store_id or not timestamp:
+        return
+    Report.objects.filter(store_id=store_id).filter(
+        models.Q(date_range_start__lte=timestamp, date_range_end__gte=timestamp)
+        | models.Q(report_type__in=LOOKBACK_REPORT_TYPES, date_range_end__gte=timestamp)
+    ).delete()
+
+
+@receiver(post_save, sender='transactions.Sale')
+@receiver(post_delete, sender='transactions.Sale')
+@receiver(post_save, sender='transactions.Purchase')
+@receiver(post_delete, sender='transactions.Purchase')
+@receiver(post_save, sender='financials.Expense')
+@receiver(post_delete, sender='financials.Expense')
+@receiver(post_save, sender='financials.PaymentIn')
+@receiver(post_delete, sender='financials.PaymentIn')
+@receiver(post_save, sender='financials.PaymentOut')
+@receiver(post_delete, sender='financials.PaymentOut')
+def invalidate_snapshots_for_transaction(sender, instance, **kwargs):
+    """Invalidate snapshots covering a sale, purchase, expense or payment"""
+    invalidate_report_snapshots(instance.store_id_id, instance.created_at)
+
+
+# Sale items are deleted in bulk when a sale is updated or deleted, so no
+# delete receiver is registered and those deletes stay a single statement;
+# code deleting sale items invalidates the sale's snapshots itself
+@receiver(post_save, sender='transactions.SaleItem')
+def invalidate_snapshots_for_sale_item(sender, instance, **kwargs):
+    """Invalidate snapshots covering the sale an item belongs to"""
+    sale = instance.sale
+    invalidate_report_snapshots(sale.store_id_id, sale.created_at)
+
+
+@receiver(post_save, sender='transactions.PurchaseItem')
+@receiver(post_delete, sender='transactions.PurchaseItem')
+def invalidate_snapshots_for_purchase_item(sender, instance, **kwargs):
+    """Invalidate snapshots covering the purchase an item belongs to"""
+    try:
+        purchase = instance.purchase
+    except ObjectDoesNotExist:
+        # The purchase itself is being deleted and has already invalidated them
+        return
+    invalidate_report_snapshots(purchase.store_id_id, purchase.created_at)
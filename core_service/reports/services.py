@@ -0,0 +1,411 @@
+from decimal import Decimal
+from collections import defaultdict
+from datetime import timedelta
+from django.db.models import (
+    Sum, Count, Max, F, Q, Value, Case, When, Exists, OuterRef, Subquery, DecimalField, IntegerField,
+    ExpressionWrapper
+)
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+from companies.models.store import Store
+from financials.models.expense import Expense
+from financials.models.payment_in import PaymentIn
+from financials.models.payment_out import PaymentOut
+from transactions.models.purchase import Purchase
+from transactions.models.sale import Sale
+from transactions.models.sale_item import SaleItem
+
+MONEY_FIELD = DecimalField(max_digits=19, decimal_places=4)
+ZERO = Value(Decimal('0'), output_field=MONEY_FIELD)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_COHORT_PERIODS = 12
+
+# Inventory rows at or below their own low stock threshold / with no stock left
+LOW_STOCK = Q(quantity__lte=F('low_stock_threshold'))
+OUT_OF_STOCK = Q(quantity__lte=0)
+
+
+def page_params(query_params):
+    """
+    Read `page` (1-based) and `page_size` from a request's query params.
+    Raises ValueError when either is not a positive integer.
+    """
+    page = int(query_params.get('page', 1))
+    page_size = min(int(query_params.get('page_size', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    if page < 1 or page_size < 1:
+        raise ValueError("page and page_size must be positive")
+    return page, page_size
+
+
+def paginate(queryset, page, page_size):
+    offset = (page - 1) * page_size
+    return queryset[offset:offset + page_size]
+
+
+def annotate_sale_expected_amounts(sales):
+    """
+    Annotate a Sale queryset with the amount each sale should have collected.
+
+    `items_amount` is the sum of quantity * unit price over the sale's items,
+    where the unit price is the item's own sale price when one was recorded,
+    and `expected_amount` adds the sale's tax (a percentage) on top of it.
+    Both are computed by a correlated subquery over sale_items joined to
+    products, so the whole queryset is still resolved in a single SQL
+    statement, and match the amount SaleSerializer validates against.
+    """
+    items_amount = SaleItem.objects.filter(
+        sale=OuterRef('pk')
+    ).order_by().values('sale').annotate(
+        total=Sum(
+            F('quantity') * Coalesce('item_sale_price', 'product__sale_price'),
+            output_field=MONEY_FIELD
+        )
+    ).values('total')
+
+    return sales.annotate(
+        items_amount=Coalesce(Subquery(items_amount, output_field=MONEY_FIELD), ZERO),
+    ).annotate(
+        expected_amount=ExpressionWrapper(
+            F('items_amount') + F('items_amount') * F('tax') * Value(Decimal('0.01')),
+            output_field=MONEY_FIELD
+        ),
+    )
+
+
+def summarize_sales_payments(sales):
+    """
+    Compute received/expected totals and the paid/partial/unpaid split of a
+    Sale queryset in one aggregate query.
+
+    A sale with nothing received is unpaid, one that received less than its
+    expected amount is partially paid, and anything else is fully paid.
+    """
+    sales = annotate_sale_expected_amounts(sales)
+
+    unpaid = Q(total_amount__lte=0)
+    partially_paid = Q(total_amount__gt=0, total_amount__lt=F('expected_amount'))
+    fully_paid = Q(total_amount__gt=0, total_amount__gte=F('expected_amount'))
+
+    totals = sales.aggregate(
+        transaction_count=Count('id'),
+        total_received=Coalesce(Sum('total_amount'), ZERO),
+        total_expected=Coalesce(Sum('expected_amount'), ZERO),
+        highest_sale=Coalesce(Max('total_amount'), ZERO),
+        cash_sales=Coalesce(Sum('total_amount', filter=Q(total_amount__gt=0)), ZERO),
+        unpaid_credit=Coalesce(Sum('expected_amount', filter=unpaid), ZERO),
+        partial_credit=Coalesce(
+            Sum(F('expected_amount') - F('total_amount'), filter=partially_paid, output_field=MONEY_FIELD),
+            ZERO
+        ),
+        partially_paid_amount=Coalesce(Sum('total_amount', filter=partially_paid), ZERO),
+        unpaid_count=Count('id', filter=unpaid),
+        partially_paid_count=Count('id', filter=partially_paid),
+        fully_paid_count=Count('id', filter=fully_paid),
+    )
+
+    totals['credit_sales'] = totals.pop('unpaid_credit') + totals.pop('partial_credit')
+    return totals
+
+
+def daily_sales_breakdown(sales):
+    """Group a Sale queryset by calendar day, newest day first."""
+    sales = annotate_sale_expected_amounts(sales)
+
+    rows = sales.annotate(day=TruncDate('created_at')).order_by().values('day').annotate(
+        amount_received=Coalesce(Sum('total_amount'), ZERO),
+        amount_expected=Coalesce(Sum('expected_amount'), ZERO),
+        transaction_count=Count('id'),
+    ).order_by('-day')
+
+    return [
+        {
+            'date': row['day'].strftime('%Y-%m-%d'),
+            'amount_received': float(row['amount_received']),
+            'amount_expected': float(row['amount_expected']),
+            'transaction_count': row['transaction_count'],
+        }
+        for row in rows
+    ]
+
+
+def payment_mode_breakdown(sales):
+    """Group a Sale queryset by payment mode name."""
+    rows = sales.order_by().values('payment_mode__name').annotate(
+        amount_received=Coalesce(Sum('total_amount'), ZERO),
+        transaction_count=Count('id'),
+    ).order_by('-amount_received')
+
+    return [
+        {
+            'payment_mode': row['payment_mode__name'] or "Unspecified",
+            'amount_received': float(row['amount_received']),
+            'transaction_count': row['transaction_count'],
+        }
+        for row in rows
+    ]
+
+
+def summarize_inventory(inventory, overstock_threshold):
+    """
+    Count an Inventory queryset's products, value its stock at sale price
+    and count the low, out of stock and overstocked rows, in one aggregate
+    query. Low stock is judged against each row's own threshold.
+    """
+    overstocked = Q(quantity__gt=overstock_threshold)
+    return inventory.aggregate(
+        total_products=Count('id'),
+        inventory_value=Coalesce(
+            Sum(F('quantity') * F('product__sale_price'), output_field=MONEY_FIELD), ZERO
+        ),
+        low_stock_count=Count('id', filter=LOW_STOCK),
+        out_of_stock_count=Count('id', filter=OUT_OF_STOCK),
+        overstocked_count=Count('id', filter=overstocked),
+    )
+
+
+def inventory_rows(inventory, condition, order_by):
+    """Rows of an Inventory queryset matching `condition`, with their product joined in."""
+    return inventory.filter(condition).order_by(*order_by, 'product__name').values(
+        'product_id', 'product__name', 'quantity', 'low_stock_threshold', 'updated_at'
+    )
+
+
+def cost_of_goods_sold(store_id, since):
+    """
+    Purchase cost of everything a store sold since `since`, at the cost
+    recorded on each item and the product's purchase price otherwise.
+    """
+    return SaleItem.objects.filter(
+        sale__store_id=store_id,
+        sale__created_at__gte=since
+    ).aggregate(
+        total=Coalesce(
+            Sum(F('quantity') * Coalesce('item_cost_price', 'product__purchase_price'), output_field=MONEY_FIELD),
+            ZERO
+        )
+    )['total']
+
+
+# Amount summed for each financial report total
+FINANCIAL_TOTALS = {
+    'total_sales': (Sale, 'total_amount'),
+    'total_expenses': (Expense, 'amount'),
+    'total_purchases': (Purchase, 'total_amount'),
+    'total_payment_ins': (PaymentIn, 'amount'),
+    'total_payment_outs': (PaymentOut, 'amount'),
+}
+
+
+def financial_totals(store_id, start, end):
+    """
+    Sum a store's sales, expenses, purchases and payments in and out between
+    `start` and `end` in a single SELECT, one scalar subquery per table.
+    Each subquery is served by its table's (store_id, created_at) index.
+    """
+    subqueries = {}
+    for name, (model, field) in FINANCIAL_TOTALS.items():
+        total = model.objects.filter(
+            store_id=OuterRef('pk'),
+            created_at__gte=start,
+            created_at__lte=end
+        ).order_by().values('store_id').annotate(total=Sum(field)).values('total')
+        subqueries[name] = Coalesce(Subquery(total, output_field=MONEY_FIELD), ZERO)
+
+    return Store.objects.filter(pk=store_id).annotate(**subqueries).values(*subqueries).get()
+
+
+def expense_breakdown(expenses):
+    """Total an Expense queryset per category name in one grouped query."""
+    rows = expenses.order_by().values('expense_category__name').annotate(
+        total=Coalesce(Sum('amount'), ZERO)
+    ).order_by('expense_category__name')
+
+    return {
+        row['expense_category__name'] or 'Other': float(row['total'])
+        for row in rows
+    }
+
+
+def window_sales(store_id, start, end):
+    return Sale.objects.filter(store_id=store_id, created_at__gte=start, created_at__lt=end)
+
+
+def summarize_customers(store_id, start, end, period):
+    """
+    Count the customers who bought between `start` and `end`, the ones of
+    them who also bought in the `period` before `start` (returning), and the
+    window's sales, in one aggregate query.
+    """
+    bought_before = window_sales(store_id, start - period, start).filter(customer=OuterRef('customer'))
+    return window_sales(store_id, start, end).aggregate(
+        total_customers=Count('customer', distinct=True),
+        returning_customers=Count('customer', distinct=True, filter=Q(Exists(bought_before))),
+        sales_count=Count('id'),
+        total_sales=Coalesce(Sum('total_amount'), ZERO),
+    )
+
+
+def top_customers(store_id, start, end, limit=10):
+    """The customers who spent the most between `start` and `end`, with their names joined in."""
+    rows = window_sales(store_id, start, end).order_by().values('customer', 'customer__name').annotate(
+        total_spent=Sum('total_amount'),
+        purchase_count=Count('id'),
+    ).order_by('-total_spent', 'customer')[:limit]
+
+    return [
+        {
+            'customer_id': str(row['customer']),
+            'customer_name': row['customer__name'],
+            'total_spent': float(row['total_spent']),
+            'purchase_count': row['purchase_count'],
+        }
+        for row in rows
+    ]
+
+
+def cohort_retention(store_id, start, end, period, num_periods):
+    """
+    For each of the `num_periods` periods of length `period` before `start`,
+    count the customers who bought in it and how many of them bought again
+    between `start` and `end`.
+
+    Sales are flagged per customer and period in one grouped pass and the
+    flags summed in the enclosing query, so the cost does not depend on the
+    number of customers or periods.
+    """
+    def active(since, until):
+        return Max(Case(
+            When(created_at__gte=since, created_at__lt=until, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField()
+        ))
+
+    periods = [(start - period * k, start - period * (k - 1)) for k in range(1, num_periods + 1)]
+    per_customer = window_sales(store_id, start - period * num_periods, end).order_by().values('customer').annotate(
+        current=active(start, end),
+        **{f'period_{k}': active(since, until) for k, (since, until) in enumerate(periods, 1)}
+    )
+
+    totals = per_customer.aggregate(**{
+        name: Coalesce(Sum(expression), Value(0))
+        for k in range(1, num_periods + 1)
+        for name, expression in (
+            (f'customers_{k}', F(f'period_{k}')),
+            (f'retained_{k}', F(f'period_{k}') * F('current')),
+        )
+    })
+
+    cohorts = []
+    for k, (since, until) in enumerate(periods, 1):
+        customers, retained = totals[f'customers_{k}'], totals[f'retained_{k}']
+        cohorts.append({
+            'period_start': since.strftime('%Y-%m-%d'),
+            'period_end': (until - timedelta(seconds=1)).strftime('%Y-%m-%d'),
+            'customers': customers,
+            'retained': retained,
+            'retention_rate': float(retained * 100 / customers) if customers else 0.0,
+        })
+    return cohorts
+
+
+def product_sales_by_month(store_id, start, end):
+    """
+    Quantity, revenue and cost of every product a store sold between
+    `start` and `end`, per calendar month, with the product's name and
+    category joined in. Revenue and cost use the prices recorded on the item
+    when there are any and the product's current prices otherwise.
+    """
+    return SaleItem.objects.filter(
+        sale__store_id=store_id,
+        sale__created_at__gte=start,
+        sale__created_at__lt=end
+    ).annotate(
+        month=TruncMonth('sale__created_at')
+    ).order_by().values(
+        'month', 'product', 'product__name', 'product__product_category__name'
+    ).annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum(
+            F('quantity') * Coalesce('item_sale_price', 'product__sale_price'), output_field=MONEY_FIELD
+        ),
+        total_cost=Sum(
+            F('quantity') * Coalesce('item_cost_price', 'product__purchase_price'), output_field=MONEY_FIELD
+        ),
+    )
+
+
+def product_performance(store_id, start, end, limit=10):
+    """
+    Top and worst products by revenue, the category breakdown and monthly
+    trends of a store's sales between `start` and `end`.
+
+    All four sections are folded from one grouped pass over the sale items
+    (one row per product and month); monthly sale totals come from one more
+    grouped query over the sales.
+    """
+    products = {}
+    categories = defaultdict(lambda: {'total_quantity': 0.0, 'total_revenue': 0.0})
+    months = defaultdict(dict)
+
+    for row in product_sales_by_month(store_id, start, end):
+        quantity, revenue = float(row['total_quantity']), float(row['total_revenue'] or 0)
+        product = products.setdefault(row['product'], {
+            'product_id': str(row['product']),
+            'product_name': row['product__name'],
+            'total_quantity': 0.0,
+            'total_revenue': 0.0,
+            'total_cost': 0.0,
+        })
+        product['total_quantity'] += quantity
+        product['total_revenue'] += revenue
+        product['total_cost'] += float(row['total_cost'] or 0)
+
+        category = categories[row['product__product_category__name'] or 'Uncategorized']
+        category['total_quantity'] += quantity
+        category['total_revenue'] += revenue
+
+        month = months[row['month'].strftime('%Y-%m')]
+        month[row['product__name']] = month.get(row['product__name'], 0.0) + quantity
+
+    sales_by_month = window_sales(store_id, start, end).annotate(
+        month=TruncMonth('created_at')
+    ).order_by().values('month').annotate(
+        total=Coalesce(Sum('total_amount'), ZERO)
+    )
+    month_totals = {row['month'].strftime('%Y-%m'): float(row['total']) for row in sales_by_month}
+
+    ranked = sorted(products.values(), key=lambda product: (-product['total_revenue'], product['product_name']))
+    top = [
+        {
+            'product_id': product['product_id'],
+            'product_name': product['product_name'],
+            'total_quantity': product['total_quantity'],
+            'total_revenue': product['total_revenue'],
+            'profit_margin': product['total_revenue'] - product['total_cost'],
+        }
+        for product in ranked[:limit]
+    ]
+    worst = [
+        {
+            'product_id': product['product_id'],
+            'product_name': product['product_name'],
+            'total_quantity': product['total_quantity'],
+            'total_revenue': product['total_revenue'],
+        }
+        for product in sorted(ranked, key=lambda product: (product['total_revenue'], product['product_name']))[:limit]
+    ]
+
+    return {
+        'top_performing_products': top,
+        'worst_performing_products': worst,
+        'product_category_breakdown': [{'category': name, **totals} for name, totals in categories.items()],
+        'seasonal_product_trends': [
+            {
+                'month': month,
+                'total_sales': month_totals.get(month, 0.0),
+                'product_breakdown': months.get(month, {}),
+            }
+            for month in sorted(set(month_totals) | set(months), reverse=True)
+        ],
+    }
@@ -0,0 +1,142 @@
+import json
+import logging
+from datetime import datetime, time
+from decimal import Decimal
+from functools import wraps
+from django.db import models, transaction, IntegrityError
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from reports.jobs import ASYNC_PARAM, params_key
+from reports.models import Report, REPORT_DETAIL_MODELS
+
+logger = logging.getLogger(__name__)
+
+# Query parameters a snapshot is already keyed on, or that do not change the report
+SNAPSHOT_KEY_EXCLUDED_PARAMS = ('start_date', 'end_date', ASYNC_PARAM)
+
+
+def closed_date_range(request):
+    """
+    Return the (start, end) datetimes of a report request whose range is
+    fully in the past, or None when the request can change over time.
+    """
+    start_date = request.query_params.get('start_date')
+    end_date = request.query_params.get('end_date')
+    if not start_date or not end_date:
+        return None
+
+    try:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+    if end_date >= timezone.localdate():
+        return None
+
+    return (
+        timezone.make_aware(datetime.combine(start_date, time.min)),
+        timezone.make_aware(datetime.combine(end_date, time(23, 59, 59))),
+    )
+
+
+def snapshot_params_key(request):
+    """
+    Key for the query parameters other than the dates, so reports requested
+    with different options (e.g. cohort_periods) get their own snapshots.
+    Empty when there are none.
+    """
+    params = {
+        key: value
+        for key, value in request.query_params.items()
+        if key not in SNAPSHOT_KEY_EXCLUDED_PARAMS
+    }
+    return params_key(params) if params else ''
+
+
+def get_report_snapshot(store_id, report_type, start, end, key=''):
+    return Report.objects.filter(
+        store_id=store_id,
+        report_type=report_type,
+        date_range_start=start,
+        date_range_end=end,
+        params_key=key
+    ).values_list('data', flat=True).first()
+
+
+def detail_values(detail_model, payload):
+    """Map report payload keys onto the typed columns of a detail model."""
+    aliases = getattr(detail_model, 'payload_fields', {})
+    values = {}
+    for field in detail_model._meta.concrete_fields:
+        if field.name == 'report':
+            continue
+        value = payload.get(aliases.get(field.name, field.name))
+        if value is None:
+            continue
+        if isinstance(field, models.DecimalField):
+            value = Decimal(str(value))
+        elif isinstance(field, models.IntegerField):
+            value = int(float(value))
+        values[field.name] = value
+    return values
+
+
+def save_report_snapshot(store_id, report_type, start, end, report_data, key=''):
+    """Persist a generated report so later requests can be served from storage."""
+    # Store exactly what the API renders (decimals as numbers, dates as ISO strings)
+    payload = json.loads(json.dumps(report_data, cls=JSONEncoder))
+
+    try:
+        with transaction.atomic():
+            report = Report.objects.create(
+                store_id=store_id,
+                report_type=report_type,
+                title=payload.get('title', '')[:255],
+                description=payload.get('description', ''),
+                date_range_start=start,
+                date_range_end=end,
+                params_key=key,
+                data=payload
+            )
+            detail_model = REPORT_DETAIL_MODELS.get(report_type)
+            if detail_model:
+                detail_model.objects.create(report=report, **detail_values(detail_model, payload))
+    except IntegrityError:
+        # A concurrent request stored the same snapshot first
+        logger.info(f"Report snapshot already stored for {report_type} {store_id} {start:%Y-%m-%d}-{end:%Y-%m-%d}")
+
+    return payload
+
+
+def snapshot_report(report_type):
+    """
+    Serve closed date range reports from stored snapshots.
+
+    Wraps a report view's `get`. When both dates are given and the end date
+    is in the past, a stored snapshot for the same dates and other query
+    parameters is returned if one exists; otherwise the report is generated
+    and stored. Open ranges are always generated
+    live. Snapshots are invalidated by the signal handlers in reports.models.
+    """
+    def decorator(get):
+        @wraps(get)
+        def wrapper(view, request, store_id, *args, **kwargs):
+            date_range = closed_date_range(request)
+            if date_range is None:
+                return get(view, request, store_id, *args, **kwargs)
+
+            start, end = date_range
+            key = snapshot_params_key(request)
+            snapshot = get_report_snapshot(store_id, report_type, start, end, key)
+            if snapshot is not None:
+                return Response(snapshot, status=status.HTTP_200_OK)
+
+            response = get(view, request, store_id, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                save_report_snapshot(store_id, report_type, start, end, response.data, key)
+            return response
+        return wrapper
+    return decorator
@@ -1,3 +1,575 @@
+import re
+from datetime import date, datetime, timedelta
+from io import StringIO
+from decimal import Decimal
+from django.db import connection
+from django.core.management import call_command
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from companies.models import Currency, Store
+from inventory.models import Product
+from inventory.models.inventory import Inventory
+from transactions.models import Customer, DailyStoreProductSales, PaymentMode, Purchase, PurchaseItem, Sale, SaleItem, Supplier
+from financials.models.expense import Expense
+from financials.models.expense_category import ExpenseCategory
+from financials.models.payable import Payable
+from financials.models.payment_in import PaymentIn
+from financials.models.payment_out import PaymentOut
+from financials.models.receivable import Receivable
+from inventory.models.stock_transfer import StockTransfer
+from core_auth.utils import StatelessUser
+from reports.models import Report, ReportJob, SalesReport
+from core_service.testing import StoreTestData
 
-# Create your tests here.
+
+class ReportTestData(StoreTestData):
+    """Store graph plus the sale helper shared by the report tests."""
+
+    @classmethod
+    def create_sale(cls, store, customer, items, total_amount, tax=Decimal('0')):
+        sale = Sale.objects.create(
+            store_id=store,
+            customer=customer,
+            total_amount=total_amount,
+            tax=tax,
+        )
+        sale_items = [SaleItem.objects.create(sale=sale, product=product, quantity=quantity) for product, quantity in items]
+        DailyStoreProductSales.record_sale(sale, sale_items)
+        return sale
+
+
+class GenerateSalesReportViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.store, self.products, self.customer = ReportTestData.create_store_with_products()
+        self.url = reverse('generate-sales-report', kwargs={'store_id': self.store.id})
+
+    def _add_sales(self, count):
+        for _ in range(count):
+            ReportTestData.create_sale(
+                self.store,
+                self.customer,
+                [(product, Decimal('2')) for product in self.products],
+                total_amount=Decimal('60'),
+            )
+
+    def _count_report_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_number_of_sales(self):
+        self._add_sales(1)
+        queries_for_one_sale = self._count_report_queries()
+
+        self._add_sales(25)
+        queries_for_many_sales = self._count_report_queries()
+
+        self.assertEqual(queries_for_one_sale, queries_for_many_sales)
+        self.assertLessEqual(queries_for_many_sales, 6)
+
+    def test_payment_status_breakdown(self):
+        # Each sale is expected to collect 2 * (10 + 20 + 30) = 120
+        items = [(product, Decimal('2')) for product in self.products]
+        ReportTestData.create_sale(self.store, self.customer, items, total_amount=Decimal('120'))
+        ReportTestData.create_sale(self.store, self.customer, items, total_amount=Decimal('50'))
+        ReportTestData.create_sale(self.store, self.customer, items, total_amount=Decimal('0'))
+
+        data = self.client.get(self.url).json()
+
+        self.assertEqual(data['total_transactions'], 3)
+        self.assertEqual(data['fully_paid_transactions'], 1)
+        self.assertEqual(data['partially_paid_transactions'], 1)
+        self.assertEqual(data['unpaid_transactions'], 1)
+        self.assertEqual(data['total_amount_received'], 170.0)
+        self.assertEqual(data['total_amount_expected'], 360.0)
+        self.assertEqual(data['cash_sales_amount'], 170.0)
+        self.assertEqual(data['credit_sales_amount'], 190.0)
+        self.assertEqual(data['partially_paid_amount'], 50.0)
+        self.assertEqual(data['highest_sale_value'], 120.0)
+        self.assertEqual(data['top_selling_products'][0]['total_quantity'], 6.0)
+        self.assertEqual(data['daily_sales_breakdown'][0]['transaction_count'], 3)
+        self.assertEqual(data['payment_mode_breakdown'][0]['payment_mode'], 'Unspecified')
+
+    def test_expected_amount_uses_item_prices_and_percentage_tax(self):
+        # 2 * 12 (item price over the product's 10) + 1 * 20 = 44, plus 15% tax = 50.6
+        for total_amount in (Decimal('50.6'), Decimal('44')):
+            sale = Sale.objects.create(
+                store_id=self.store, customer=self.customer, total_amount=total_amount, tax=Decimal('15')
+            )
+            SaleItem.objects.create(sale=sale, product=self.products[0], quantity=2, item_sale_price=Decimal('12'))
+            SaleItem.objects.create(sale=sale, product=self.products[1], quantity=1)
+
+        data = self.client.get(self.url).json()
+
+        self.assertEqual(data['total_amount_expected'], 101.2)
+        self.assertEqual(data['fully_paid_transactions'], 1)
+        self.assertEqual(data['partially_paid_transactions'], 1)
+        self.assertAlmostEqual(data['credit_sales_amount'], 6.6)
+
+
+class GenerateInventoryReportViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.store, self.products, self.customer = ReportTestData.create_store_with_products(num_products=5)
+        self.url = reverse('generate-inventory-report', kwargs={'store_id': self.store.id})
+        # (quantity, low stock threshold) per product
+        levels = [(0, 10), (5, 10), (15, 20), (150, 10), (50, 10)]
+        for product, (quantity, threshold) in zip(self.products, levels):
+            Inventory.objects.create(
+                product=product, store=self.store,
+                quantity=Decimal(quantity), low_stock_threshold=Decimal(threshold)
+            )
+
+    def test_lists_use_each_items_threshold(self):
+        data = self.client.get(self.url).json()
+
+        self.assertEqual(data['total_products'], 5)
+        self.assertEqual(data['low_stock_count'], 3)
+        self.assertEqual(
+            [(item['product_name'], item['threshold']) for item in data['low_stock_products']],
+            [('Product 0', 10.0), ('Product 1', 10.0), ('Product 2', 20.0)]
+        )
+        self.assertEqual([item['product_name'] for item in data['out_of_stock_products']], ['Product 0'])
+        self.assertEqual([item['product_name'] for item in data['overstocked_products']], ['Product 3'])
+        # 5*20 + 15*30 + 150*40 + 50*50
+        self.assertEqual(data['inventory_value'], 9050.0)
+
+    def test_turnover_uses_purchase_cost_of_recent_sales(self):
+        ReportTestData.create_sale(
+            self.store, self.customer, [(self.products[3], Decimal('181'))], total_amount=Decimal('0')
+        )
+        data = self.client.get(self.url).json()
+        self.assertAlmostEqual(data['inventory_turnover_rate'], 905 / 9050)
+
+    def test_turnover_keeps_the_cost_recorded_at_sale(self):
+        sale = ReportTestData.create_sale(
+            self.store, self.customer, [(self.products[3], Decimal('181'))], total_amount=Decimal('0')
+        )
+        sale.items.update(item_cost_price=Decimal('5'))
+        Product.objects.filter(pk=self.products[3].pk).update(purchase_price=Decimal('9'))
+
+        data = self.client.get(self.url).json()
+        self.assertAlmostEqual(data['inventory_turnover_rate'], 905 / 9050)
+
+    def test_lists_are_paged(self):
+        data = self.client.get(self.url, {'page': 2, 'page_size': 2}).json()
+
+        self.assertEqual(data['low_stock_count'], 3)
+        self.assertEqual([item['product_name'] for item in data['low_stock_products']], ['Product 2'])
+        self.assertEqual(data['out_of_stock_products'], [])
+        self.assertEqual(self.client.get(self.url, {'page': 0}).status_code, 400)
+
+    def test_query_count_does_not_grow_with_inventory(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertLessEqual(len(queries), 6)
+
+
+class GenerateFinancialReportViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.store, self.products, self.customer = ReportTestData.create_store_with_products()
+        self.url = reverse('generate-financial-report', kwargs={'store_id': self.store.id})
+        currency = Currency.objects.create(name='Birr', code='ETB')
+        payment_mode = PaymentMode.objects.create(store_id=self.store, name='Cash')
+        rent = ExpenseCategory.objects.create(store_id=self.store, name='Rent')
+        salaries = ExpenseCategory.objects.create(store_id=self.store, name='Salaries')
+        for category, amount in [(rent, '100'), (salaries, '40'), (salaries, '60')]:
+            Expense.objects.create(
+                store_id=self.store, expense_category=category, amount=Decimal(amount),
+                currency=currency, payment_mode=payment_mode
+            )
+        ReportTestData.create_sale(
+            self.store, self.customer, [(self.products[0], Decimal('50'))], total_amount=Decimal('500')
+        )
+
+    def test_totals_and_breakdown(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(self.url).json()
+
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(data['total_sales'], 500.0)
+        self.assertEqual(data['total_expenses'], 200.0)
+        self.assertEqual(data['total_purchases'], 0.0)
+        self.assertEqual(data['net_profit'], 300.0)
+        self.assertEqual(data['expense_breakdown'], {'Rent': 100.0, 'Salaries': 100.0})
+
+
+class GenerateCustomerReportViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.store, self.products, self.customer = ReportTestData.create_store_with_products()
+        self.url = reverse('generate-customer-report', kwargs={'store_id': self.store.id})
+        self.today = timezone.localdate()
+        self.params = {
+            'start_date': (self.today - timedelta(days=9)).strftime('%Y-%m-%d'),
+            'end_date': self.today.strftime('%Y-%m-%d'),
+        }
+        self.customers = [
+            Customer.objects.create(store_id=self.store, name=f'Customer {i}', email=f'customer{i}@example.com')
+            for i in range(4)
+        ]
+
+    def _sale(self, customer, days_ago, amount):
+        sale = ReportTestData.create_sale(self.store, customer, [(self.products[0], Decimal('1'))], total_amount=Decimal(amount))
+        sold_at = timezone.make_aware(datetime.combine(self.today - timedelta(days=days_ago), datetime.min.time()))
+        Sale.objects.filter(pk=sale.pk).update(created_at=sold_at)
+
+    def test_new_returning_and_cohorts(self):
+        # The report covers 10 days; earlier periods are 10-19 and 20-29 days ago
+        self._sale(self.customers[0], 1, '50')
+        self._sale(self.customers[0], 12, '10')
+        self._sale(self.customers[1], 2, '30')
+        self._sale(self.customers[1], 25, '10')
+        self._sale(self.customers[2], 3, '20')
+        self._sale(self.customers[2], 4, '20')
+        self._sale(self.customers[3], 15, '10')
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(self.url, {**self.params, 'cohort_periods': 2}).json()
+
+        self.assertLessEqual(len(queries), 4)
+        self.assertEqual(data['total_customers'], 3)
+        self.assertEqual(data['returning_customers'], 1)
+        self.assertEqual(data['new_customers'], 2)
+        self.assertEqual(data['average_purchase_value'], 30.0)
+        self.assertEqual(
+            [(row['customer_name'], row['total_spent'], row['purchase_count']) for row in data['top_customers']],
+            [('Customer 0', 50.0, 1), ('Customer 2', 40.0, 2), ('Customer 1', 30.0, 1)]
+        )
+        self.assertEqual(
+            [(row['customers'], row['retained']) for row in data['cohort_retention']],
+            [(2, 1), (1, 1)]
+        )
+        self.assertEqual(data['cohort_retention'][0]['retention_rate'], 50.0)
+
+    def test_query_count_does_not_grow_with_customers(self):
+        for i, customer in enumerate(self.customers):
+            self._sale(customer, i, '10')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, self.params)
+        expected = len(queries)
+
+        for i in range(20):
+            customer = Customer.objects.create(store_id=self.store, name=f'Extra {i}', email=f'extra{i}@example.com')
+            self._sale(customer, i % 10, '10')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, self.params)
+        self.assertEqual(len(queries), expected)
+
+
+class GenerateProductPerformanceReportViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.store, self.products, self.customer = ReportTestData.create_store_with_products()
+        self.url = reverse('generate-product-report', kwargs={'store_id': self.store.id})
+        first_of_month = timezone.localdate().replace(day=1)
+        self.last_month = first_of_month - timedelta(days=1)
+        self.params = {
+            'start_date': (self.last_month.replace(day=1)).strftime('%Y-%m-%d'),
+            'end_date': timezone.localdate().strftime('%Y-%m-%d'),
+        }
+
+    def _sale(self, items, total_amount, sold_on=None):
+        sale = ReportTestData.create_sale(self.store, self.customer, [], total_amount=Decimal(total_amount))
+        for product, quantity, price in items:
+            SaleItem.objects.create(sale=sale, product=product, quantity=Decimal(quantity), item_sale_price=price)
+        if sold_on:
+            sold_at = timezone.make_aware(datetime.combine(sold_on, datetime.min.time()))
+            Sale.objects.filter(pk=sale.pk).update(created_at=sold_at)
+
+    def test_sections(self):
+        # Product prices are 10, 20 and 30 and cost 5; Product 0 sold once at 12
+        self._sale([(self.products[0], '3', Decimal('12')), (self.products[1], '1', None)], '56', self.last_month)
+        self._sale([(self.products[0], '1', None), (self.products[2], '2', None)], '70')
+
+        data = self.client.get(self.url, self.params).json()
+
+        self.assertEqual(
+            [(row['product_name'], row['total_quantity'], row['total_revenue'], row['profit_margin'])
+             for row in data['top_performing_products']],
+            [('Product 2', 2.0, 60.0, 50.0), ('Product 0', 4.0, 46.0, 26.0), ('Product 1', 1.0, 20.0, 15.0)]
+        )
+        self.assertEqual(data['worst_performing_products'][0]['product_name'], 'Product 1')
+        self.assertEqual(
+            data['product_category_breakdown'],
+            [{'category': 'Shirts', 'total_quantity': 7.0, 'total_revenue': 126.0}]
+        )
+        trends = data['seasonal_product_trends']
+        self.assertEqual([trend['total_sales'] for trend in trends], [70.0, 56.0])
+        self.assertEqual(trends[1]['product_breakdown'], {'Product 0': 3.0, 'Product 1': 1.0})
+
+    def test_margins_keep_the_cost_recorded_at_sale(self):
+        self._sale([(self.products[2], '2', Decimal('30'))], '60')
+        SaleItem.objects.update(item_cost_price=Decimal('5'))
+        Product.objects.filter(pk=self.products[2].pk).update(sale_price=Decimal('90'), purchase_price=Decimal('80'))
+
+        row = self.client.get(self.url, self.params).json()['top_performing_products'][0]
+        self.assertEqual((row['total_revenue'], row['profit_margin']), (60.0, 50.0))
+
+    def test_query_count_does_not_grow_with_sales(self):
+        self._sale([(self.products[0], '1', None)], '10')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, self.params)
+        expected = len(queries)
+
+        for product in self.products * 10:
+            self._sale([(product, '1', None)], '10', self.last_month)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, self.params)
+        self.assertEqual(len(queries), expected)
+        self.assertLessEqual(expected, 3)
+
+
+class ReportSnapshotTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.store, self.products, self.customer = ReportTestData.create_store_with_products()
+        self.url = reverse('generate-sales-report', kwargs={'store_id': self.store.id})
+
+        last_month = timezone.localdate().replace(day=1) - timedelta(days=1)
+        self.params = {
+            'start_date': last_month.replace(day=1).strftime('%Y-%m-%d'),
+            'end_date': last_month.strftime('%Y-%m-%d'),
+        }
+        self.sale = ReportTestData.create_sale(
+            self.store, self.customer, [(self.products[0], Decimal('1'))], total_amount=Decimal('10')
+        )
+        sold_at = timezone.make_aware(datetime.combine(last_month, datetime.min.time()))
+        Sale.objects.filter(pk=self.sale.pk).update(created_at=sold_at)
+        self.sale.refresh_from_db()
+
+    def test_closed_range_is_served_from_snapshot(self):
+        first = self.client.get(self.url, self.params).json()
+        self.assertEqual(Report.objects.count(), 1)
+        self.assertEqual(SalesReport.objects.get().total_sales, Decimal('10'))
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url, self.params).json()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(first, second)
+
+    def test_write_inside_range_invalidates_snapshot(self):
+        self.client.get(self.url, self.params)
+        self.assertEqual(Report.objects.count(), 1)
+
+        self.sale.total_amount = Decimal('5')
+        self.sale.save()
+        self.assertEqual(Report.objects.count(), 0)
+
+        data = self.client.get(self.url, self.params).json()
+        self.assertEqual(data['total_amount_received'], 5.0)
+
+    def test_write_before_range_invalidates_look_back_reports(self):
+        customer_url = reverse('generate-customer-report', kwargs={'store_id': self.store.id})
+        self.client.get(self.url, self.params)
+        self.client.get(customer_url, self.params)
+        self.assertEqual(Report.objects.count(), 2)
+
+        # A back-dated sale in an earlier cohort period
+        earlier = ReportTestData.create_sale(
+            self.store, self.customer, [(self.products[0], Decimal('1'))], total_amount=Decimal('10')
+        )
+        sold_at = self.sale.created_at - timedelta(days=40)
+        Sale.objects.filter(pk=earlier.pk).update(created_at=sold_at)
+        Sale.objects.get(pk=earlier.pk).save()
+
+        self.assertEqual(list(Report.objects.values_list('report_type', flat=True)), [Report.ReportType.SALES])
+        data = self.client.get(customer_url, self.params).json()
+        self.assertEqual(sum(row['customers'] for row in data['cohort_retention']), 1)
+
+    def test_open_range_is_not_stored(self):
+        self.client.get(self.url, {'start_date': self.params['start_date']})
+        self.assertEqual(Report.objects.count(), 0)
+
+    def test_other_parameters_get_their_own_snapshot(self):
+        url = reverse('generate-customer-report', kwargs={'store_id': self.store.id})
+        default = self.client.get(url, self.params).json()
+        five = self.client.get(url, {**self.params, 'cohort_periods': 5}).json()
+
+        self.assertEqual((len(default['cohort_retention']), len(five['cohort_retention'])), (3, 5))
+        self.assertEqual(Report.objects.filter(report_type=Report.ReportType.CUSTOMER).count(), 2)
+        self.assertEqual(len(self.client.get(url, self.params).json()['cohort_retention']), 3)
+        self.assertEqual(len(self.client.get(url, {**self.params, 'cohort_periods': 5}).json()['cohort_retention']), 5)
+
+
+class AsyncReportJobTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.store, self.products, self.customer = ReportTestData.create_store_with_products()
+        self.url = reverse('generate-sales-report', kwargs={'store_id': self.store.id})
+        ReportTestData.create_sale(
+            self.store, self.customer, [(self.products[0], Decimal('2'))], total_amount=Decimal('20')
+        )
+
+    def test_identical_requests_share_one_job(self):
+        first = self.client.get(self.url, {'async': '1'})
+        second = self.client.get(self.url, {'async': '1'})
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.json()['job_id'], second.json()['job_id'])
+        self.assertEqual(ReportJob.objects.count(), 1)
+
+        self.client.get(self.url, {'async': '1', 'start_date': '2025-01-01'})
+        self.assertEqual(ReportJob.objects.count(), 2)
+
+    def test_worker_stores_the_report_result(self):
+        job_url = self.client.get(self.url, {'async': '1'})['Location']
+        self.assertEqual(self.client.get(job_url).json()['status'], 'PENDING')
+
+        call_command('run_report_jobs', workers=1, once=True, stdout=StringIO())
+
+        job = self.client.get(job_url).json()
+        self.assertEqual(job['status'], 'COMPLETED')
+        self.assertEqual(job['result'], self.client.get(self.url).json())
+
+        # A finished job no longer absorbs new requests
+        self.assertNotEqual(self.client.get(self.url, {'async': '1'}).json()['job_id'], job['job_id'])
+
+    def test_failed_report_is_recorded_on_the_job(self):
+        job_url = self.client.get(self.url, {'async': '1', 'start_date': 'not-a-date'})['Location']
+
+        call_command('run_report_jobs', workers=1, once=True, stdout=StringIO())
+
+        job = self.client.get(job_url).json()
+        self.assertEqual(job['status'], 'FAILED')
+        self.assertIn('Invalid date format', job['error'])
+
+    def test_worker_prunes_old_finished_jobs(self):
+        old = timezone.now() - timedelta(days=10)
+        for status in (ReportJob.Status.COMPLETED, ReportJob.Status.FAILED):
+            ReportJob.objects.create(
+                store=self.store, report_type=Report.ReportType.SALES, params_key=status,
+                status=status, result={}, finished_at=old
+            )
+        recent = ReportJob.objects.create(
+            store=self.store, report_type=Report.ReportType.SALES, params_key='recent',
+            status=ReportJob.Status.COMPLETED, result={}, finished_at=timezone.now() - timedelta(days=1)
+        )
+        pending = ReportJob.objects.create(store=self.store, report_type=Report.ReportType.SALES, params_key='pending')
+        ReportJob.objects.filter(pk=pending.pk).update(created_at=old)
+
+        call_command('run_report_jobs', workers=1, once=True, retention_days=7, stdout=StringIO())
+
+        self.assertEqual(
+            set(ReportJob.objects.values_list('pk', flat=True)), {recent.pk, pending.pk}
+        )
+
+
+# Tables that grow with store activity; reading one without an index is a
+# regression
+LARGE_TABLES = {
+    'sales', 'purchases', 'expenses', 'payment_ins', 'payment_outs',
+    'receivables', 'payables', 'stock_transfers', 'customers',
+}
+
+SQLITE_TABLE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+POSTGRES_SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+# Django aliases tables in subqueries and self joins ("sales" U0); SQLite
+# reports the alias
+TABLE_ALIAS = re.compile(r'"(\w+)" (?:AS )?"?([A-Z]\d+)\b')
+
+
+def sequential_scans(sql):
+    """
+    EXPLAIN a query and return the large tables it reads sequentially.
+    PostgreSQL is told to avoid sequential scans, so one that remains means
+    no index can serve the query rather than that the table is small.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            tables = [match.group(1) for (line,) in cursor.fetchall() for match in POSTGRES_SEQ_SCAN.finditer(line)]
+        else:
+            aliases = dict((alias, table) for table, alias in TABLE_ALIAS.findall(sql))
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            tables = [
+                aliases.get(match.group(1), match.group(1))
+                for *_, detail in cursor.fetchall()
+                if (match := SQLITE_TABLE_SCAN.match(detail))
+            ]
+    return sorted(set(tables) & LARGE_TABLES)
+
+
+class QueryPlanTests(TestCase):
+    """
+    Runs every report and store list endpoint against a seeded dataset and
+    EXPLAINs each SELECT it issues, failing on sequential scans of the large
+    transactional tables.
+    """
+    REPORTS = [
+        'generate-sales-report', 'generate-inventory-report', 'generate-financial-report',
+        'generate-customer-report', 'generate-product-report', 'generate-profit-report',
+        'generate-revenue-report', 'generate-purchase-report',
+    ]
+    LISTS = [
+        'transactions:customer-list', 'transactions:sale-list', 'transactions:purchase-list',
+        'financials:expense-list', 'financials:payable-list', 'financials:receivable-list',
+        'financials:payment-in-list', 'financials:payment-out-list', 'stock-transfer-list',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store, cls.products, cls.customer = ReportTestData.create_store_with_products()
+        other_store = Store.objects.create(company_id=cls.store.company_id, name='Other Store', location='Adama')
+        currency = Currency.objects.create(name='Birr', code='ETB')
+        payment_mode = PaymentMode.objects.create(store_id=cls.store, name='Cash')
+        category = ExpenseCategory.objects.create(store_id=cls.store, name='Rent')
+        supplier = Supplier.objects.create(store_id=cls.store, name='Supplier')
+
+        for i in range(20):
+            customer = Customer.objects.create(store_id=cls.store, name=f'Customer {i}', email=f'c{i}@example.com')
+            sale = ReportTestData.create_sale(
+                cls.store, customer, [(cls.products[i % 3], Decimal('2'))], total_amount=Decimal('10')
+            )
+            receivable = Receivable.objects.create(store_id=cls.store, sale=sale, amount=Decimal('10'), currency=currency)
+            PaymentIn.objects.create(
+                store_id=cls.store, receivable=receivable, sale=sale, amount=Decimal('5'),
+                currency=currency, payment_mode=payment_mode
+            )
+            purchase = Purchase.objects.create(store_id=cls.store, supplier=supplier, total_amount=Decimal('8'))
+            PurchaseItem.objects.create(purchase=purchase, product=cls.products[i % 3], quantity=Decimal('1'))
+            payable = Payable.objects.create(store_id=cls.store, purchase=purchase, amount=Decimal('8'), currency=currency)
+            PaymentOut.objects.create(
+                store_id=cls.store, payable=payable, purchase=purchase, amount=Decimal('4'),
+                currency=currency, payment_mode=payment_mode
+            )
+            Expense.objects.create(
+                store_id=cls.store, expense_category=category, amount=Decimal('3'),
+                currency=currency, payment_mode=payment_mode
+            )
+            StockTransfer.objects.create(
+                source_store=cls.store, destination_store=other_store,
+                product=cls.products[0], quantity=Decimal('1')
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(StatelessUser({'id': 'report-tests', 'role': 'admin'}))
+
+    def assertNoSequentialScans(self, url_name):
+        url = reverse(url_name, kwargs={'store_id': self.store.id})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            with self.subTest(url=url_name, sql=sql):
+                self.assertEqual(sequential_scans(sql), [])
+
+    def test_reports(self):
+        for url_name in self.REPORTS:
+            self.assertNoSequentialScans(url_name)
+
+    def test_list_views(self):
+        for url_name in self.LISTS:
+            self.assertNoSequentialScans(url_name)
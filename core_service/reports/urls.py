@@ -8,7 +8,8 @@ from reports.views import (
     GenerateProductPerformanceReportView,
     GenerateProfitReportView,
     GenerateRevenueReportView,
-    GeneratePurchaseReportView
+    GeneratePurchaseReportView,
+    ReportJobDetailView
 )
 
 urlpatterns = [
@@ -23,4 +24,6 @@ urlpatterns = [
     path('stores/<uuid:store_id>/reports/profit/', GenerateProfitReportView.as_view(), name='generate-profit-report'),
     path('stores/<uuid:store_id>/reports/revenue/', GenerateRevenueReportView.as_view(), name='generate-revenue-report'),
     path('stores/<uuid:store_id>/reports/purchases/', GeneratePurchaseReportView.as_view(), name='generate-purchase-report'),
+    # Poll a report queued with ?async=1
+    path('jobs/<uuid:job_id>/', ReportJobDetailView.as_view(), name='report-job-detail'),
 ] 
\ No newline at end of file
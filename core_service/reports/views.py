@@ -1,6 +1,7 @@
 from django.shortcuts import render
 from datetime import datetime, timedelta
 from django.db.models import Sum, Avg, Count, F, Q, Max
+from django.db.models.functions import TruncDate
 from django.db import models
 from django.utils import timezone
 from decimal import Decimal
@@ -10,9 +11,9 @@ from rest_framework.response import Response
 from rest_framework.request import Request
 from rest_framework.permissions import AllowAny
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
-from transactions.models.customer import Customer
 from transactions.models.sale import Sale
 from transactions.models.sale_item import SaleItem
+from transactions.models.daily_store_product_sales import DailyStoreProductSales
 from transactions.models.purchase import Purchase
 from transactions.models.purchase_item import PurchaseItem
 from companies.models.store import Store
@@ -22,26 +23,30 @@ from financials.models.expense import Expense
 from financials.models.payment_in import PaymentIn
 from financials.models.payment_out import PaymentOut
 from transactions.models.supplier import Supplier
-# from reports.models import (
-#     Report, 
-#     SalesReport, 
-#     InventoryReport, 
-#     FinancialReport, 
-#     CustomerReport, 
-#     ProductPerformanceReport,
-#     ProfitReport,
-#     RevenueReport
-# )
-# from reports.serializers import (
-#     ReportSerializer,
-#     SalesReportSerializer,
-#     InventoryReportSerializer,
-#     FinancialReportSerializer,
-#     CustomerReportSerializer,
-#     ProductPerformanceReportSerializer,
-#     ProfitReportSerializer,
-#     RevenueReportSerializer
-# )
+from reports.services import (
+    DEFAULT_PAGE_SIZE,
+    LOW_STOCK,
+    MAX_COHORT_PERIODS,
+    MAX_PAGE_SIZE,
+    OUT_OF_STOCK,
+    summarize_sales_payments,
+    daily_sales_breakdown,
+    payment_mode_breakdown,
+    page_params,
+    paginate,
+    summarize_inventory,
+    inventory_rows,
+    cost_of_goods_sold,
+    financial_totals,
+    expense_breakdown,
+    summarize_customers,
+    top_customers,
+    cohort_retention,
+    product_performance
+)
+from reports.models import Report, ReportJob
+from reports.snapshots import snapshot_report
+from reports.jobs import async_report, job_status_data
 
 
 class ReportListView(APIView):
@@ -129,10 +134,13 @@ class GenerateSalesReportView(APIView):
         description="Generate a sales report for a store",
         parameters=[
             OpenApiParameter(name='store_id', type=str, location=OpenApiParameter.PATH),
+            OpenApiParameter(name='async', type=bool, location=OpenApiParameter.QUERY, description='Queue the report as a background job and return 202 with its status URL'),
             OpenApiParameter(name='start_date', type=str, location=OpenApiParameter.QUERY),
             OpenApiParameter(name='end_date', type=str, location=OpenApiParameter.QUERY)
         ]
     )
+    @async_report(Report.ReportType.SALES)
+    @snapshot_report(Report.ReportType.SALES)
     def get(self, request: Request, store_id):
         try:
             store = Store.objects.get(pk=store_id)
@@ -156,118 +164,58 @@ class GenerateSalesReportView(APIView):
             created_at__lte=end_date
         )
         
-        # Calculate comprehensive sales metrics
-        total_sales_amount_received = sales.aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-        
-        # Calculate actual expected amounts and payment status
-        cash_sales = Decimal('0')  # Fully paid sales
-        credit_sales = Decimal('0')  # Outstanding amount from unpaid/partially paid sales
-        total_expected_amount = Decimal('0')  # Total amount that should have been received
-        partially_paid_amount = Decimal('0')  # Amount received for partially paid sales
-        unpaid_count = 0
-        partially_paid_count = 0
-        fully_paid_count = 0
-        
-        for sale in sales:
-            # Calculate the actual expected amount for this sale (including tax)
-            sale_items = SaleItem.objects.filter(sale=sale)
-            actual_amount = Decimal('0')
-            
-            for item in sale_items:
-                actual_amount += item.quantity * item.product.sale_price
-            
-            # Apply tax to get the total expected amount
-            expected_amount_with_tax = actual_amount + (actual_amount * sale.tax)
-            total_expected_amount += expected_amount_with_tax
-            
-            # Determine payment status based on amount received vs expected
-            if sale.total_amount <= 0:
-                # Unpaid sale
-                credit_sales += expected_amount_with_tax
-                unpaid_count += 1
-            elif sale.total_amount < expected_amount_with_tax:
-                # Partially paid sale
-                cash_sales += sale.total_amount  # What was actually received
-                credit_sales += (expected_amount_with_tax - sale.total_amount)  # Outstanding amount
-                partially_paid_amount += sale.total_amount
-                partially_paid_count += 1
-            else:
-                # Fully paid sale
-                cash_sales += sale.total_amount
-                fully_paid_count += 1
+        # Calculate comprehensive sales metrics (expected amounts and payment
+        # status are aggregated in SQL instead of per sale)
+        totals = summarize_sales_payments(sales)
+        total_sales_amount_received = totals['total_received']
+        total_expected_amount = totals['total_expected']
+        cash_sales = totals['cash_sales']  # Amount actually received
+        credit_sales = totals['credit_sales']  # Outstanding amount from unpaid/partially paid sales
+        partially_paid_amount = totals['partially_paid_amount']  # Amount received for partially paid sales
+        unpaid_count = totals['unpaid_count']
+        partially_paid_count = totals['partially_paid_count']
+        fully_paid_count = totals['fully_paid_count']
+        transaction_count = totals['transaction_count']
         
         # Get highest sale
-        highest_sale = sales.aggregate(max_sale=Max('total_amount'))['max_sale'] or Decimal('0')
+        highest_sale = totals['highest_sale']
         
-        # Get sale items
-        sale_items = SaleItem.objects.filter(sale__in=sales)
-        total_items = sale_items.aggregate(total=Sum('quantity'))['total'] or 0
+        # Item totals come from the daily rollup rather than raw sale items
+        rollups = DailyStoreProductSales.objects.filter(
+            store_id=store_id,
+            day__gte=start_date.date(),
+            day__lte=end_date.date()
+        )
+        total_items = rollups.aggregate(total=Sum('quantity'))['total'] or 0
         
         # Calculate average sale value
         avg_sale_received = Decimal('0')
         avg_sale_expected = Decimal('0')
-        if sales.count() > 0:
-            avg_sale_received = total_sales_amount_received / sales.count()
-            avg_sale_expected = total_expected_amount / sales.count()
+        if transaction_count > 0:
+            avg_sale_received = total_sales_amount_received / transaction_count
+            avg_sale_expected = total_expected_amount / transaction_count
             
         # Get top selling products
-        top_products = sale_items.values('product').annotate(
+        top_products = rollups.values('product', 'product__name').annotate(
             total_quantity=Sum('quantity'),
-            total_sales=Sum(F('quantity') * F('product__sale_price'))
+            total_sales=Sum('revenue')
         ).order_by('-total_quantity')[:10]
         
-        top_products_data = []
-        for item in top_products:
-            try:
-                product = Product.objects.get(pk=item['product'])
-                top_products_data.append({
-                    'product_id': str(product.id),
-                    'product_name': product.name,
-                    'total_quantity': float(item['total_quantity']),
-                    'total_sales': float(item.get('total_sales', 0))
-                })
-            except Product.DoesNotExist:
-                continue
+        top_products_data = [
+            {
+                'product_id': str(item['product']),
+                'product_name': item['product__name'],
+                'total_quantity': float(item['total_quantity']),
+                'total_sales': float(item['total_sales'] or 0)
+            }
+            for item in top_products
+        ]
         
         # Calculate daily sales breakdown
-        daily_sales = {}
-        for sale in sales:
-            day = sale.created_at.strftime('%Y-%m-%d')
-            if day not in daily_sales:
-                daily_sales[day] = {
-                    'date': day,
-                    'amount_received': 0,
-                    'amount_expected': 0,
-                    'transaction_count': 0
-                }
-            
-            # Calculate expected amount for this sale
-            sale_items = SaleItem.objects.filter(sale=sale)
-            actual_amount = Decimal('0')
-            for item in sale_items:
-                actual_amount += item.quantity * item.product.sale_price
-            expected_amount_with_tax = actual_amount + (actual_amount * sale.tax)
-            
-            daily_sales[day]['amount_received'] += float(sale.total_amount)
-            daily_sales[day]['amount_expected'] += float(expected_amount_with_tax)
-            daily_sales[day]['transaction_count'] += 1
-        
-        daily_sales_list = list(daily_sales.values())
+        daily_sales_list = daily_sales_breakdown(sales)
         
         # Calculate payment mode breakdown
-        payment_mode_breakdown = {}
-        for sale in sales:
-            payment_mode_name = sale.payment_mode.name if sale.payment_mode else "Unspecified"
-            if payment_mode_name not in payment_mode_breakdown:
-                payment_mode_breakdown[payment_mode_name] = {
-                    'amount_received': 0,
-                    'transaction_count': 0
-                }
-            
-            payment_mode_breakdown[payment_mode_name]['amount_received'] += float(sale.total_amount)
-            payment_mode_breakdown[payment_mode_name]['transaction_count'] += 1
-        
-        payment_mode_list = [{"payment_mode": k, **v} for k, v in payment_mode_breakdown.items()]
+        payment_mode_list = payment_mode_breakdown(sales)
         
         # Calculate collection efficiency
         collection_efficiency = Decimal('0')
@@ -296,7 +244,7 @@ class GenerateSalesReportView(APIView):
             "partially_paid_amount": float(partially_paid_amount),  # Amount received for partial payments
             
             # Transaction Count Breakdown
-            "total_transactions": sales.count(),
+            "total_transactions": transaction_count,
             "fully_paid_transactions": fully_paid_count,
             "partially_paid_transactions": partially_paid_count,
             "unpaid_transactions": unpaid_count,
@@ -318,92 +266,69 @@ class GenerateInventoryReportView(APIView):
     @extend_schema(
         description="Generate an inventory report for a store",
         parameters=[
-            OpenApiParameter(name='store_id', type=str, location=OpenApiParameter.PATH)
+            OpenApiParameter(name='store_id', type=str, location=OpenApiParameter.PATH),
+            OpenApiParameter(name='async', type=bool, location=OpenApiParameter.QUERY, description='Queue the report as a background job and return 202 with its status URL'),
+            OpenApiParameter(name='page', type=int, location=OpenApiParameter.QUERY, description='Page of the low stock, out of stock and overstocked lists (default 1)'),
+            OpenApiParameter(name='page_size', type=int, location=OpenApiParameter.QUERY, description=f'Items per list page (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE})'),
+            OpenApiParameter(name='overstock_threshold', type=float, location=OpenApiParameter.QUERY, description='Quantity above which an item counts as overstocked (default 100)')
         ]
     )
+    @async_report(Report.ReportType.INVENTORY)
     def get(self, request: Request, store_id):
         try:
             store = Store.objects.get(pk=store_id)
         except Store.DoesNotExist:
             return Response({"error": "Store not found"}, status=status.HTTP_404_NOT_FOUND)
         
-        # Get inventory data
-        inventory_items = Inventory.objects.filter(store=store)
-        total_products = inventory_items.count()
-        
-        # Calculate inventory value
-        inventory_value = Decimal('0')
-        for item in inventory_items:
-            try:
-                # Based on the actual Product model, it uses sale_price field
-                item_value = item.quantity * item.product.sale_price
-                inventory_value += item_value
-            except:
-                pass
+        try:
+            page, page_size = page_params(request.query_params)
+            high_stock_threshold = Decimal(request.query_params.get('overstock_threshold', '100'))
+        except (ValueError, ArithmeticError):
+            return Response({"error": "page and page_size must be positive integers and overstock_threshold a number"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Identify low stock items (less than 10 units as default threshold)
-        low_stock_threshold = 10  # Default threshold
-        low_stock_items = []
-        for item in inventory_items:
-            print('item',item.quantity, low_stock_threshold)
-            if item.quantity <= low_stock_threshold:
-                low_stock_items.append({
-                    'product_id': str(item.product.id),
-                    'product_name': item.product.name,
-                    'current_quantity': float(item.quantity),
-                    'threshold': low_stock_threshold
-                })
+        # Totals and counts in one aggregate; low stock uses each item's own threshold
+        inventory_items = Inventory.objects.filter(store=store)
+        summary = summarize_inventory(inventory_items, high_stock_threshold)
+        total_products = summary['total_products']
+        inventory_value = summary['inventory_value']
         
-        # Identify out of stock items
-        out_of_stock_items = []
-        for item in inventory_items:
-            if item.quantity <= 0:
-                out_of_stock_items.append({
-                    'product_id': str(item.product.id),
-                    'product_name': item.product.name,
-                    'last_stocked': item.updated_at.strftime('%Y-%m-%d') if item.updated_at else None
-                })
+        # One page of each list, lowest stock first
+        low_stock_items = [
+            {
+                'product_id': str(item['product_id']),
+                'product_name': item['product__name'],
+                'current_quantity': float(item['quantity']),
+                'threshold': float(item['low_stock_threshold'])
+            }
+            for item in paginate(inventory_rows(inventory_items, LOW_STOCK, ['quantity']), page, page_size)
+        ]
         
-        # Identify overstocked items (more than 100 units as default)
-        high_stock_threshold = 100  # Default threshold
-        overstocked_items = []
-        for item in inventory_items:
-            if item.quantity > high_stock_threshold:
-                overstocked_items.append({
-                    'product_id': str(item.product.id),
-                    'product_name': item.product.name,
-                    'current_quantity': float(item.quantity),
-                    'threshold': high_stock_threshold
-                })
+        out_of_stock_items = [
+            {
+                'product_id': str(item['product_id']),
+                'product_name': item['product__name'],
+                'last_stocked': item['updated_at'].strftime('%Y-%m-%d') if item['updated_at'] else None
+            }
+            for item in paginate(inventory_rows(inventory_items, OUT_OF_STOCK, ['updated_at']), page, page_size)
+        ]
         
-        # Calculate inventory turnover rate (if sales data is available)
-        inventory_turnover = Decimal('0')
-        try:
-            # Get sales from the past 30 days
-            thirty_days_ago = timezone.now() - timedelta(days=30)
-            
-            # Calculate COGS (cost of goods sold) from sold items
-            sold_items = SaleItem.objects.filter(
-                sale__store_id=store,
-                sale__created_at__gte=thirty_days_ago
+        overstocked_items = [
+            {
+                'product_id': str(item['product_id']),
+                'product_name': item['product__name'],
+                'current_quantity': float(item['quantity']),
+                'threshold': float(high_stock_threshold)
+            }
+            for item in paginate(
+                inventory_rows(inventory_items, Q(quantity__gt=high_stock_threshold), ['-quantity']), page, page_size
             )
-            
-            cogs = Decimal('0')
-            for item in sold_items:
-                try:
-                    # Based on the actual Product model, it uses purchase_price field for cost
-                    cost = item.product.purchase_price
-                    cogs += cost * item.quantity
-                except:
-                    pass
-            
-            if inventory_value > 0:
-                inventory_turnover = cogs / inventory_value
-            
-        except Exception as e:
-            print(f"Error calculating inventory turnover: {e}")
-            inventory_turnover = Decimal('0')
+        ]
         
+        # Inventory turnover over the past 30 days: COGS at purchase price / stock value
+        inventory_turnover = Decimal('0')
+        if inventory_value > 0:
+            cogs = cost_of_goods_sold(store.id, timezone.now() - timedelta(days=30))
+            inventory_turnover = cogs / inventory_value
         
         # Prepare report data
         report_data = {
@@ -416,6 +341,11 @@ class GenerateInventoryReportView(APIView):
             "low_stock_products": low_stock_items,
             "out_of_stock_products": out_of_stock_items,
             "overstocked_products": overstocked_items,
+            "low_stock_count": summary['low_stock_count'],
+            "out_of_stock_count": summary['out_of_stock_count'],
+            "overstocked_count": summary['overstocked_count'],
+            "page": page,
+            "page_size": page_size,
             "inventory_value": float(inventory_value),
             "inventory_turnover_rate": float(inventory_turnover)
         }
@@ -430,10 +360,13 @@ class GenerateFinancialReportView(APIView):
         description="Generate a financial report for a store",
         parameters=[
             OpenApiParameter(name='store_id', type=str, location=OpenApiParameter.PATH),
+            OpenApiParameter(name='async', type=bool, location=OpenApiParameter.QUERY, description='Queue the report as a background job and return 202 with its status URL'),
             OpenApiParameter(name='start_date', type=str, location=OpenApiParameter.QUERY),
             OpenApiParameter(name='end_date', type=str, location=OpenApiParameter.QUERY)
         ]
     )
+    @async_report(Report.ReportType.FINANCIAL)
+    @snapshot_report(Report.ReportType.FINANCIAL)
     def get(self, request: Request, store_id):
         try:
             store = Store.objects.get(pk=store_id)
@@ -450,48 +383,13 @@ class GenerateFinancialReportView(APIView):
         except ValueError:
             return Response({"error": "Invalid date format. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get sales data
-        sales = Sale.objects.filter(
-            store_id=store_id,
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        )
-        
-        total_sales = sales.aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-        
-        # Get real data for financials
-        # Get expenses
-        expenses = Expense.objects.filter(
-            store_id=store_id,
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        )
-        total_expenses = expenses.aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        # Get purchases
-        purchases = Purchase.objects.filter(
-            store_id=store_id,
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        )
-        print('purchases',purchases, purchases.aggregate(total=Sum('total_amount')))
-        total_purchases = purchases.aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-        
-        # Get payment ins
-        payment_ins = PaymentIn.objects.filter(
-            store_id=store_id,
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        )
-        total_payment_ins = payment_ins.aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        # Get payment outs
-        payment_outs = PaymentOut.objects.filter(
-            store_id=store_id,
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        )
-        total_payment_outs = payment_outs.aggregate(total=Sum('amount'))['total'] or Decimal('0')
+        # All five totals in one query
+        totals = financial_totals(store_id, start_date, end_date)
+        total_sales = totals['total_sales']
+        total_expenses = totals['total_expenses']
+        total_purchases = totals['total_purchases']
+        total_payment_ins = totals['total_payment_ins']
+        total_payment_outs = totals['total_payment_outs']
         
         # Calculate profits
         gross_profit = (total_sales + total_payment_ins) - (total_purchases + total_payment_outs)
@@ -503,17 +401,11 @@ class GenerateFinancialReportView(APIView):
             profit_margin = (net_profit / total_sales) * 100
         
         # Get expense breakdown by category
-        expense_breakdown = {}
-        for expense in expenses:
-            try:
-                category_name = expense.expense_category.name
-                if category_name not in expense_breakdown:
-                    expense_breakdown[category_name] = 0
-                expense_breakdown[category_name] += float(expense.amount)
-            except:
-                if 'Other' not in expense_breakdown:
-                    expense_breakdown['Other'] = 0
-                expense_breakdown['Other'] += float(expense.amount)
+        expenses_by_category = expense_breakdown(Expense.objects.filter(
+            store_id=store_id,
+            created_at__gte=start_date,
+            created_at__lte=end_date
+        ))
         
         # Prepare report data
         report_data = {
@@ -530,7 +422,7 @@ class GenerateFinancialReportView(APIView):
             "gross_profit": float(gross_profit),
             "net_profit": float(net_profit),
             "profit_margin_percentage": float(profit_margin),
-            "expense_breakdown": expense_breakdown
+            "expense_breakdown": expenses_by_category
         }
         
         return Response(report_data, status=status.HTTP_200_OK)
@@ -543,10 +435,14 @@ class GenerateCustomerReportView(APIView):
         description="Generate a customer report for a store",
         parameters=[
             OpenApiParameter(name='store_id', type=str, location=OpenApiParameter.PATH),
+            OpenApiParameter(name='async', type=bool, location=OpenApiParameter.QUERY, description='Queue the report as a background job and return 202 with its status URL'),
             OpenApiParameter(name='start_date', type=str, location=OpenApiParameter.QUERY),
-            OpenApiParameter(name='end_date', type=str, location=OpenApiParameter.QUERY)
+            OpenApiParameter(name='end_date', type=str, location=OpenApiParameter.QUERY),
+            OpenApiParameter(name='cohort_periods', type=int, location=OpenApiParameter.QUERY, description=f'Earlier periods to report cohort retention for (default 3, max {MAX_COHORT_PERIODS})')
         ]
     )
+    @async_report(Report.ReportType.CUSTOMER)
+    @snapshot_report(Report.ReportType.CUSTOMER)
     def get(self, request: Request, store_id):
         try:
             store = Store.objects.get(pk=store_id)
@@ -563,68 +459,39 @@ class GenerateCustomerReportView(APIView):
         except ValueError:
             return Response({"error": "Invalid date format. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get sales for the period
-        sales = Sale.objects.filter(
-            store_id=store_id,
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        )
-        
-        # Get unique customers from the sales
-        customers = sales.values('customer').distinct()
-        print(customers)
-        total_customers = customers.count()
-        
-        # Previous period for comparison (same length)
-        period_length = (end_date - start_date).days
-        prev_start = start_date - timedelta(days=period_length)
-        prev_end = start_date - timedelta(days=1)
-        
-        # Get customers who made purchases in previous period
-        prev_customers = Sale.objects.filter(
-            store_id=store_id,
-            created_at__gte=prev_start,
-            created_at__lte=prev_end
-        ).values('customer').distinct()
+        try:
+            cohort_periods = int(request.query_params.get('cohort_periods', 3))
+        except ValueError:
+            cohort_periods = 0
+        if not 0 <= cohort_periods <= MAX_COHORT_PERIODS:
+            return Response({"error": f"cohort_periods must be between 0 and {MAX_COHORT_PERIODS}"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # New customers are those who didn't make purchases in the previous period
-        prev_customer_ids = set(item['customer'] for item in prev_customers)
-        new_customer_count = 0
-        for customer in customers:
-            if customer['customer'] not in prev_customer_ids:
-                new_customer_count += 1
+        # The window runs to the end of end_date; earlier periods have the same length
+        window_end = end_date + timedelta(seconds=1)
+        period = window_end - start_date
         
-        # Returning customers are those who did make purchases in both periods
-        returning_customer_count = total_customers - new_customer_count
+        # Customer counts, returning customers (bought in the previous period too) and sale totals
+        summary = summarize_customers(store_id, start_date, window_end, period)
+        total_customers = summary['total_customers']
+        returning_customer_count = summary['returning_customers']
+        new_customer_count = total_customers - returning_customer_count
         
         # Calculate average purchase value
         avg_purchase = Decimal('0')
-        if sales.count() > 0:
-            total_sales = sales.aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-            avg_purchase = total_sales / sales.count()
+        if summary['sales_count'] > 0:
+            avg_purchase = summary['total_sales'] / summary['sales_count']
         
         # Get top customers
-        top_customers_data = []
-        top_customers = sales.values('customer').annotate(
-            total_spent=Sum('total_amount'), 
-            purchase_count=Count('id')
-        ).order_by('-total_spent')[:10]
-        
-        for item in top_customers:
-            top_customers_data.append({
-                'customer_id': str(item['customer']),
-                'customer_name': Customer.objects.get(id=item['customer']).name,
-                'total_spent': float(item['total_spent']),
-                'purchase_count': item['purchase_count'],
-            })
+        top_customers_data = top_customers(store_id, start_date, window_end)
         
         # Calculate retention rate
         retention_rate = Decimal('0')
         if total_customers > 0:
             retention_rate = (Decimal(returning_customer_count) / Decimal(total_customers)) * 100
         
-        print('total_customers',total_customers)
-        print('top_customers',top_customers)
+        # Share of each earlier period's customers who bought again in this one
+        cohorts = cohort_retention(store_id, start_date, window_end, period, cohort_periods) if cohort_periods else []
+        
         # Prepare report data
         report_data = {
             "title": f"Customer Report {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
@@ -637,7 +504,8 @@ class GenerateCustomerReportView(APIView):
             "returning_customers": returning_customer_count,
             "top_customers": top_customers_data,
             "average_purchase_value": float(avg_purchase),
-            "customer_retention_rate": float(retention_rate)
+            "customer_retention_rate": float(retention_rate),
+            "cohort_retention": cohorts
         }
         
         return Response(report_data, status=status.HTTP_200_OK)
@@ -650,10 +518,13 @@ class GenerateProductPerformanceReportView(APIView):
         description="Generate a product performance report for a store",
         parameters=[
             OpenApiParameter(name='store_id', type=str, location=OpenApiParameter.PATH),
+            OpenApiParameter(name='async', type=bool, location=OpenApiParameter.QUERY, description='Queue the report as a background job and return 202 with its status URL'),
             OpenApiParameter(name='start_date', type=str, location=OpenApiParameter.QUERY),
             OpenApiParameter(name='end_date', type=str, location=OpenApiParameter.QUERY)
         ]
     )
+    @async_report(Report.ReportType.PRODUCT)
+    @snapshot_report(Report.ReportType.PRODUCT)
     def get(self, request: Request, store_id):
         try:
             store = Store.objects.get(pk=store_id)
@@ -670,101 +541,8 @@ class GenerateProductPerformanceReportView(APIView):
         except ValueError:
             return Response({"error": "Invalid date format. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get sales for the period
-        sales = Sale.objects.filter(
-            store_id=store_id,
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        )
-        
-        # Get sale items
-        sale_items = SaleItem.objects.filter(sale__in=sales)
-        
-        # Analyze product performance - top sellers
-        top_products = sale_items.values('product').annotate(
-            total_quantity=Sum('quantity'),
-            total_revenue=Sum(F('quantity') * F('product__sale_price'))
-        ).order_by('-total_revenue')[:10]
-        
-        top_products_data = []
-        for item in top_products:
-            try:
-                product = Product.objects.get(pk=item['product'])
-                top_products_data.append({
-                    'product_id': str(product.id),
-                    'product_name': product.name,
-                    'total_quantity': float(item['total_quantity']),
-                    'total_revenue': float(item.get('total_revenue', 0)),
-                    'profit_margin': float(item.get('total_revenue', 0)) - (float(item['total_quantity']) * float(product.purchase_price if hasattr(product, 'cost_price') else 0))
-                })
-            except Product.DoesNotExist:
-                continue
-        
-        # Worst performing products (lowest revenue)
-        worst_products = sale_items.values('product').annotate(
-            total_quantity=Sum('quantity'),
-            total_revenue=Sum(F('quantity') * F('product__sale_price'))
-        ).order_by('total_revenue')[:10]
-        
-        worst_products_data = []
-        for item in worst_products:
-            try:
-                product = Product.objects.get(pk=item['product'])
-                worst_products_data.append({
-                    'product_id': str(product.id),
-                    'product_name': product.name,
-                    'total_quantity': float(item['total_quantity']),
-                    'total_revenue': float(item.get('total_revenue', 0))
-                })
-            except Product.DoesNotExist:
-                continue
-        
-        # Analyze by category
-        category_breakdown = {}
-        for item in sale_items:
-            try:
-                category = item.product.product_category.name if hasattr(item.product, 'product_category') else "Uncategorized"
-                if category not in category_breakdown:
-                    category_breakdown[category] = {
-                        'total_quantity': 0,
-                        'total_revenue': 0
-                    }
-                
-                category_breakdown[category]['total_quantity'] += float(item.quantity)
-                category_breakdown[category]['total_revenue'] += float(item.quantity * item.product.sale_price)
-            except:
-                pass
-        
-        # Convert to list for JSON storage
-        category_data = [{"category": k, **v} for k, v in category_breakdown.items()]
-        
-        # Analyze seasonal trends (by month)
-        seasonal_trends = {}
-        for sale in sales:
-            month = sale.created_at.strftime('%Y-%m')
-            if month not in seasonal_trends:
-                seasonal_trends[month] = {
-                    'month': month,
-                    'total_sales': 0,
-                    'product_breakdown': {}
-                }
-            
-            seasonal_trends[month]['total_sales'] += float(sale.total_amount)
-            
-            # Add product breakdown for this month
-            sale_items_for_sale = SaleItem.objects.filter(sale=sale)
-            for item in sale_items_for_sale:
-                try:
-                    product_name = item.product.name
-                    if product_name not in seasonal_trends[month]['product_breakdown']:
-                        seasonal_trends[month]['product_breakdown'][product_name] = 0
-                    
-                    seasonal_trends[month]['product_breakdown'][product_name] += float(item.quantity)
-                except:
-                    pass
-        
-        # Convert to list for JSON storage
-        seasonal_data = list(seasonal_trends.values())
+        # Top/worst products, categories and monthly trends from one grouped pass
+        performance = product_performance(store_id, start_date, end_date + timedelta(seconds=1))
         
         # Prepare report data
         report_data = {
@@ -773,10 +551,10 @@ class GenerateProductPerformanceReportView(APIView):
             "store": store_id,
             "date_range_start": start_date,
             "date_range_end": end_date,
-            "top_performing_products": top_products_data,
-            "worst_performing_products": worst_products_data,
-            "product_category_breakdown": category_data,
-            "seasonal_product_trends": seasonal_data
+            "top_performing_products": performance['top_performing_products'],
+            "worst_performing_products": performance['worst_performing_products'],
+            "product_category_breakdown": performance['product_category_breakdown'],
+            "seasonal_product_trends": performance['seasonal_product_trends']
         }
         
         return Response(report_data, status=status.HTTP_200_OK)
@@ -789,10 +567,13 @@ class GenerateProfitReportView(APIView):
         description="Generate a profit report for a store",
         parameters=[
             OpenApiParameter(name='store_id', type=str, location=OpenApiParameter.PATH),
+            OpenApiParameter(name='async', type=bool, location=OpenApiParameter.QUERY, description='Queue the report as a background job and return 202 with its status URL'),
             OpenApiParameter(name='start_date', type=str, location=OpenApiParameter.QUERY),
             OpenApiParameter(name='end_date', type=str, location=OpenApiParameter.QUERY)
         ]
     )
+    @async_report(Report.ReportType.PROFIT)
+    @snapshot_report(Report.ReportType.PROFIT)
     def get(self, request: Request, store_id):
         try:
             store = Store.objects.get(pk=store_id)
@@ -861,8 +642,8 @@ class GenerateProfitReportView(APIView):
         
         for item in sale_items:
             try:
-                # Use product's purchase price as the cost
-                cost_of_goods_sold += item.quantity * item.product.purchase_price
+                # Use the purchase price recorded when the item was sold
+                cost_of_goods_sold += item.quantity * item.unit_cost
             except:
                 pass
         
@@ -906,8 +687,8 @@ class GenerateProfitReportView(APIView):
                     }
                 
                 # Calculate revenue and cost for this item
-                item_revenue = float(item.quantity * item.product.sale_price)
-                item_cost = float(item.quantity * item.product.purchase_price)
+                item_revenue = float(item.quantity * item.unit_price)
+                item_cost = float(item.quantity * item.unit_cost)
                 
                 profit_by_category[category_name]['revenue'] += item_revenue
                 profit_by_category[category_name]['cost'] += item_cost
@@ -922,7 +703,7 @@ class GenerateProfitReportView(APIView):
         profit_trend = {}
         
         # Daily revenue from payment ins
-        daily_payment_ins = payment_ins.extra(select={'day': "date(created_at)"}).values('day').annotate(total=Sum('amount'))
+        daily_payment_ins = payment_ins.annotate(day=TruncDate('created_at')).values('day').annotate(total=Sum('amount'))
         for entry in daily_payment_ins:
             day = entry['day'].strftime('%Y-%m-%d')
             if day not in profit_trend:
@@ -935,7 +716,7 @@ class GenerateProfitReportView(APIView):
             profit_trend[day]['revenue'] += float(entry['total'])
         
         # Daily costs from payment outs
-        daily_payment_outs = payment_outs.extra(select={'day': "date(created_at)"}).values('day').annotate(total=Sum('amount'))
+        daily_payment_outs = payment_outs.annotate(day=TruncDate('created_at')).values('day').annotate(total=Sum('amount'))
         for entry in daily_payment_outs:
             day = entry['day'].strftime('%Y-%m-%d')
             if day not in profit_trend:
@@ -948,7 +729,7 @@ class GenerateProfitReportView(APIView):
             profit_trend[day]['costs'] += float(entry['total'])
         
         # Daily expenses
-        daily_expenses = expenses.extra(select={'day': "date(created_at)"}).values('day').annotate(total=Sum('amount'))
+        daily_expenses = expenses.annotate(day=TruncDate('created_at')).values('day').annotate(total=Sum('amount'))
         for entry in daily_expenses:
             day = entry['day'].strftime('%Y-%m-%d')
             if day not in profit_trend:
@@ -1019,10 +800,13 @@ class GenerateRevenueReportView(APIView):
         description="Generate a revenue report for a store",
         parameters=[
             OpenApiParameter(name='store_id', type=str, location=OpenApiParameter.PATH),
+            OpenApiParameter(name='async', type=bool, location=OpenApiParameter.QUERY, description='Queue the report as a background job and return 202 with its status URL'),
             OpenApiParameter(name='start_date', type=str, location=OpenApiParameter.QUERY),
             OpenApiParameter(name='end_date', type=str, location=OpenApiParameter.QUERY)
         ]
     )
+    @async_report(Report.ReportType.REVENUE)
+    @snapshot_report(Report.ReportType.REVENUE)
     def get(self, request: Request, store_id):
         try:
             store = Store.objects.get(pk=store_id)
@@ -1156,10 +940,13 @@ class GeneratePurchaseReportView(APIView):
         description="Generate a purchase report for a store",
         parameters=[
             OpenApiParameter(name='store_id', type=str, location=OpenApiParameter.PATH),
+            OpenApiParameter(name='async', type=bool, location=OpenApiParameter.QUERY, description='Queue the report as a background job and return 202 with its status URL'),
             OpenApiParameter(name='start_date', type=str, location=OpenApiParameter.QUERY),
             OpenApiParameter(name='end_date', type=str, location=OpenApiParameter.QUERY)
         ]
     )
+    @async_report(Report.ReportType.PURCHASE)
+    @snapshot_report(Report.ReportType.PURCHASE)
     def get(self, request: Request, store_id):
         try:
             store = Store.objects.get(pk=store_id)
@@ -1376,4 +1163,21 @@ class GeneratePurchaseReportView(APIView):
         }
         
         return Response(report_data, status=status.HTTP_200_OK)
-    
\ No newline at end of file
+    
+
+class ReportJobDetailView(APIView):
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        description="Get the status of a queued report job, and its report once completed",
+        parameters=[
+            OpenApiParameter(name='job_id', type=str, location=OpenApiParameter.PATH)
+        ]
+    )
+    def get(self, request: Request, job_id):
+        try:
+            job = ReportJob.objects.get(pk=job_id)
+        except ReportJob.DoesNotExist:
+            return Response({"error": "Report job not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(job_status_data(job), status=status.HTTP_200_OK)
@@ -0,0 +1,48 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from transactions.models import SaleItem, DailyStoreProductSales
+from transactions.models.daily_store_product_sales import grouped_sale_items, upsert_rollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily store/product sales rollup from raw sale items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=str, help='Only rebuild rollups for this store UUID')
+        parser.add_argument('--start-date', type=str, help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end-date', type=str, help='Last day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows inserted per batch')
+
+    def parse_date(self, value, option):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid {option}. Use YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        start_date = self.parse_date(options['start_date'], '--start-date')
+        end_date = self.parse_date(options['end_date'], '--end-date')
+
+        items = SaleItem.objects.all()
+        rollups = DailyStoreProductSales.objects.all()
+
+        if options['store']:
+            items = items.filter(sale__store_id=options['store'])
+            rollups = rollups.filter(store_id=options['store'])
+        if start_date:
+            items = items.filter(sale__created_at__date__gte=start_date)
+            rollups = rollups.filter(day__gte=start_date)
+        if end_date:
+            items = items.filter(sale__created_at__date__lte=end_date)
+            rollups = rollups.filter(day__lte=end_date)
+
+        with transaction.atomic():
+            deleted, _ = rollups.delete()
+            created = upsert_rollup(DailyStoreProductSales, grouped_sale_items(items), options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt daily sales rollups: removed {deleted} rows, created {created} rows')
+        )
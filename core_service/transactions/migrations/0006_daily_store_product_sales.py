@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 05:57
+
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0004_remove_subscriptionplan_features_and_more'),
+        ('inventory', '0004_stocktransfer'),
+        ('transactions', '0005_remove_customer_credit_limit_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStoreProductSales',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('quantity', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=19)),
+                ('revenue', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=19)),
+                ('cost', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=19)),
+                ('sale_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_product_sales', to='companies.store')),
+            ],
+            options={
+                'db_table': 'daily_store_product_sales',
+                'ordering': ['-day'],
+                'unique_together': {('store', 'product', 'day')},
+            },
+        ),
+    ]
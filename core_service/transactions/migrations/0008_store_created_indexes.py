@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0004_remove_subscriptionplan_features_and_more'),
+        ('transactions', '0007_sale_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['store_id', 'created_at'], name='purchases_store_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['store_id', 'created_at'], name='sales_store_created_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0004_remove_subscriptionplan_features_and_more'),
+        ('transactions', '0008_store_created_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['store_id', 'created_at'], name='customers_store_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(condition=models.Q(('status__in', ['UNPAID', 'PARTIALLY_PAID'])), fields=['store_id', 'created_at'], name='purchases_store_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(condition=models.Q(('status__in', ['UNPAID', 'PARTIALLY_PAID'])), fields=['store_id', 'created_at'], name='sales_store_open_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0009_customer_and_open_balance_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saleitem',
+            name='item_cost_price',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=19, null=True),
+        ),
+    ]
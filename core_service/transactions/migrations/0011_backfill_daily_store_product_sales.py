@@ -0,0 +1,21 @@
+from django.db import migrations
+from transactions.models.daily_store_product_sales import grouped_sale_items, upsert_rollup
+
+
+def backfill_daily_store_product_sales(apps, schema_editor):
+    """Build the rollup from existing sale items, as rebuild_rollups does."""
+    SaleItem = apps.get_model('transactions', 'SaleItem')
+    DailyStoreProductSales = apps.get_model('transactions', 'DailyStoreProductSales')
+    DailyStoreProductSales.objects.all().delete()
+    upsert_rollup(DailyStoreProductSales, grouped_sale_items(SaleItem.objects.all()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0010_sale_item_cost_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_store_product_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0011_backfill_daily_store_product_sales'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='purchase',
+            name='purchases_store_open_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='sale',
+            name='sales_store_open_idx',
+        ),
+    ]
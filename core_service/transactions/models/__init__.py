@@ -5,6 +5,7 @@ from .sale import Sale
 from .purchase_item import PurchaseItem
 from .purchase import Purchase
 from .payment_mode import PaymentMode
+from .daily_store_product_sales import DailyStoreProductSales
 
 __all__ = [
     'Customer',
@@ -14,4 +15,5 @@ __all__ = [
     'PurchaseItem',
     'Purchase',
      'PaymentMode',
+    'DailyStoreProductSales',
 ] 
\ No newline at end of file
@@ -16,5 +16,8 @@ class Customer(models.Model):
     class Meta:
         db_table = 'customers'
         unique_together = ['store_id', 'email']
+        indexes = [
+            models.Index(fields=['store_id', 'created_at'], name='customers_store_created_idx'),
+        ]
     def __str__(self):
         return f"{self.name} ({self.email})" 
\ No newline at end of file
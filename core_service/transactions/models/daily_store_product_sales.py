@@ -0,0 +1,183 @@
+from django.db import models, connection
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+import uuid
+from decimal import Decimal
+
+MONEY_FIELD = DecimalField(max_digits=19, decimal_places=4)
+UPSERT_BATCH_SIZE = 500
+
+
+def grouped_sale_items(items):
+  """
+  Group a SaleItem queryset by (store, product, local day), valuing items at
+  their recorded prices. Yields ((store_id, product_id, day), [quantity,
+  revenue, cost, sale_count]) in the shape summarize_changes returns. Also
+  used by migrations, so it only relies on model fields.
+  """
+  grouped = items.annotate(day=TruncDate('sale__created_at')).order_by().values(
+    'sale__store_id', 'product_id', 'day'
+  ).annotate(
+    total_quantity=Sum('quantity'),
+    total_revenue=Sum(F('quantity') * Coalesce('item_sale_price', 'product__sale_price'), output_field=MONEY_FIELD),
+    total_cost=Sum(F('quantity') * Coalesce('item_cost_price', 'product__purchase_price'), output_field=MONEY_FIELD),
+    total_sales=Count('sale', distinct=True),
+  )
+  for row in grouped.iterator():
+    yield (row['sale__store_id'], row['product_id'], row['day']), [
+      row['total_quantity'], row['total_revenue'], row['total_cost'], row['total_sales']
+    ]
+
+
+def upsert_rollup(model, rows, batch_size=UPSERT_BATCH_SIZE):
+  """
+  Add signed ((store_id, product_id, day), [quantity, revenue, cost,
+  sale_count]) rows to `model`'s table with batched INSERT ... ON CONFLICT
+  DO UPDATE statements. `model` may be a migration's historical model.
+  """
+  opts = model._meta
+  fields = [opts.get_field(name) for name in (
+    'id', 'store', 'product', 'day', 'quantity', 'revenue', 'cost', 'sale_count', 'created_at', 'updated_at'
+  )]
+  qn = connection.ops.quote_name
+  table = qn(opts.db_table)
+  columns = [qn(field.column) for field in fields]
+  placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+  increments = ', '.join(
+    f"{qn(name)} = {table}.{qn(name)} + excluded.{qn(name)}"
+    for name in ('quantity', 'revenue', 'cost', 'sale_count')
+  )
+
+  def execute(cursor, batch):
+    params = []
+    for (store_id, product_id, day), (quantity, revenue, cost, sale_count) in batch:
+      values = (uuid.uuid4(), store_id, product_id, day, quantity, revenue, cost, sale_count, now, now)
+      params.extend(field.get_db_prep_save(value, connection) for field, value in zip(fields, values))
+    cursor.execute(
+      f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(batch))} "
+      f"ON CONFLICT ({qn('store_id')}, {qn('product_id')}, {qn('day')}) "
+      f"DO UPDATE SET {increments}, {qn('updated_at')} = excluded.{qn('updated_at')}",
+      params
+    )
+
+  now = timezone.now()
+  upserted = 0
+  with connection.cursor() as cursor:
+    # Batched to stay under the database's bound parameter limit
+    batch = []
+    for row in rows:
+      batch.append(row)
+      if len(batch) >= batch_size:
+        execute(cursor, batch)
+        upserted += len(batch)
+        batch = []
+    if batch:
+      execute(cursor, batch)
+      upserted += len(batch)
+  return upserted
+
+
+class DailyStoreProductSales(models.Model):
+  """
+  Daily rollup of sale items per (store, product, day).
+
+  Rows are maintained in the transaction that creates, updates or deletes
+  a sale, and can be rebuilt from raw sale items with the
+  `rebuild_rollups` management command. Revenue and cost use the prices
+  recorded on each sale item.
+  """
+  id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+  store = models.ForeignKey(
+    'companies.Store',
+    on_delete=models.CASCADE,
+    related_name='daily_product_sales'
+  )
+  product = models.ForeignKey(
+    'inventory.Product',
+    on_delete=models.CASCADE,
+    related_name='daily_sales'
+  )
+  day = models.DateField()
+  quantity = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+  revenue = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+  cost = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0'))
+  sale_count = models.IntegerField(default=0)
+  created_at = models.DateTimeField(auto_now_add=True)
+  updated_at = models.DateTimeField(auto_now=True)
+
+  class Meta:
+    db_table = 'daily_store_product_sales'
+    ordering = ['-day']
+    unique_together = ['store', 'product', 'day']
+
+  def __str__(self):
+    return f"{self.product_id} @ {self.store_id} on {self.day}"
+
+  @staticmethod
+  def sale_day(sale):
+    return timezone.localtime(sale.created_at).date()
+
+  @classmethod
+  def summarize_changes(cls, changes):
+    """
+    Group the items of (sale, sale_items, sign) changes by (store, product,
+    day) into signed quantity, revenue, cost and number of sales.
+    """
+    totals = {}
+    for sale, sale_items, sign in changes:
+      day = cls.sale_day(sale)
+      products = set()
+      for item in sale_items:
+        key = (sale.store_id_id, item.product_id, day)
+        entry = totals.setdefault(key, [Decimal('0'), Decimal('0'), Decimal('0'), 0])
+        quantity = Decimal(item.quantity)
+        entry[0] += sign * quantity
+        entry[1] += sign * quantity * item.unit_price
+        entry[2] += sign * quantity * item.unit_cost
+        if item.product_id not in products:
+          products.add(item.product_id)
+          entry[3] += sign
+    return totals
+
+  @classmethod
+  def apply(cls, totals):
+    """
+    Add signed totals ({(store_id, product_id, day): [quantity, revenue,
+    cost, sale_count]}) to the rollup with a single INSERT ... ON CONFLICT
+    DO UPDATE, then drop rows no sale contributes to any more. Runs in the
+    caller's transaction.
+    """
+    if not totals:
+      return
+
+    upsert_rollup(cls, totals.items())
+
+    if any(entry[3] < 0 for entry in totals.values()):
+      cls.objects.filter(
+        store_id__in={store_id for store_id, _, _ in totals},
+        day__in={day for _, _, day in totals},
+        sale_count__lte=0
+      ).delete()
+
+  @classmethod
+  def record_changes(cls, changes):
+    """
+    Apply (sale, sale_items, sign) changes with one upsert; replacing a
+    sale's items is its old items with sign -1 plus its new ones.
+    """
+    cls.apply(cls.summarize_changes(changes))
+
+  @classmethod
+  def record_sales(cls, sales_with_items, sign=1):
+    """Add (sign=1) or remove (sign=-1) several sales' items in one statement."""
+    cls.record_changes((sale, sale_items, sign) for sale, sale_items in sales_with_items)
+
+  @classmethod
+  def record_sale(cls, sale, sale_items, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) one sale's items. Must run in the
+    transaction that writes the sale, so the rollup commits or rolls back
+    with it.
+    """
+    cls.record_sales([(sale, sale_items)], sign)
@@ -31,6 +31,9 @@ class Purchase(models.Model):
   class Meta:
     db_table = 'purchases'
     ordering = ['-created_at']
+    indexes = [
+      models.Index(fields=['store_id', 'created_at'], name='purchases_store_created_idx'),
+    ]
 
   def update_inventory(self, purchase_items):
     """
@@ -29,12 +29,24 @@ class Sale(models.Model):
     choices=SaleStatus.choices,
     default=SaleStatus.UNPAID
   )
+  # Client-generated key for sales uploaded through the bulk endpoint, so
+  # a POS terminal can safely retry an upload
+  idempotency_key = models.CharField(max_length=100, null=True, blank=True)
   created_at = models.DateTimeField(auto_now_add=True)
   updated_at = models.DateTimeField(auto_now=True)
 
   class Meta:
     db_table = 'sales'
     ordering = ['-created_at']
+    indexes = [
+      models.Index(fields=['store_id', 'created_at'], name='sales_store_created_idx'),
+    ]
+    constraints = [
+      models.UniqueConstraint(
+        fields=['store_id', 'idempotency_key'],
+        name='sales_store_idempotency_key_unique'
+      ),
+    ]
 
   def update_inventory(self, sale_items):
     """
@@ -66,10 +78,14 @@ class Sale(models.Model):
     from financials.models.receivable import Receivable
     from financials.models.payment_in import PaymentIn
     from transactions.models.sale_item import SaleItem
+    from transactions.models.daily_store_product_sales import DailyStoreProductSales
 
     with transaction.atomic():
       # Get all associated records before deletion
-      sale_items = SaleItem.objects.filter(sale=self)
+      sale_items = SaleItem.objects.filter(sale=self).select_related('product')
+
+      # Remove the sale from the daily rollup in the same transaction
+      DailyStoreProductSales.record_sale(self, sale_items, sign=-1)
       receivables = Receivable.objects.filter(sale=self)
       payments = PaymentIn.objects.filter(sale=self)
 
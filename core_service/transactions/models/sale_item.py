@@ -15,10 +15,21 @@ class SaleItem(models.Model):
     related_name='sale_items'
   )
   item_sale_price = models.DecimalField(max_digits=19, decimal_places=4, null=True, blank=True) 
+  # Product purchase price when the item was sold, so the daily rollup can
+  # remove exactly what it added after the product's price changes
+  item_cost_price = models.DecimalField(max_digits=19, decimal_places=4, null=True, blank=True)
   quantity = models.DecimalField(max_digits=19, decimal_places=4)
   created_at = models.DateTimeField(auto_now_add=True)
   updated_at = models.DateTimeField(auto_now=True)
 
   class Meta:
     db_table = 'sale_items'
-    ordering = ['-created_at']
\ No newline at end of file
+    ordering = ['-created_at']
+
+  @property
+  def unit_price(self):
+    return self.item_sale_price if self.item_sale_price is not None else self.product.sale_price
+
+  @property
+  def unit_cost(self):
+    return self.item_cost_price if self.item_cost_price is not None else self.product.purchase_price
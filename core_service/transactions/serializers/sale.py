@@ -12,8 +12,12 @@ from transactions.models.customer import Customer
 from companies.models.currency import Currency
 from transactions.models.payment_mode import PaymentMode
 from transactions.models.sale_item import SaleItem
+from transactions.models.daily_store_product_sales import DailyStoreProductSales
 from financials.models.receivable import Receivable
 from decimal import Decimal
+from collections import defaultdict
+from django.db import transaction
+import uuid
 
 class SaleSerializer(serializers.ModelSerializer):
     store_id = serializers.UUIDField(write_only=True)
@@ -51,7 +55,8 @@ class SaleSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         """
         Validate the input data for creating a Sale.
-        Ensure that the store and customer exist.
+        Ensure that the store, customer and products exist, and resolve them
+        so create/update do not have to fetch them again.
         """
         store_id = attrs.get('store_id')
         customer_id = attrs.get('customer_id')
@@ -73,7 +78,7 @@ class SaleSerializer(serializers.ModelSerializer):
         if len(attrs['items']) == 0:
             raise serializers.ValidationError("Items cannot be an empty list.")
         
-        
+        items = []
         for item in attrs.get('items', []):
             product_id = item.get('product_id')
             try:
@@ -90,8 +95,17 @@ class SaleSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Quantity must be a positive integer.")
             if not isinstance(product_id, str):
                 raise serializers.ValidationError("Product ID must be a string.")
-            
-            product = Product.objects.filter(id=product_id).first()
+            try:
+                product_id = str(uuid.UUID(product_id))
+            except ValueError:
+                raise serializers.ValidationError(f"Product with id {product_id} does not exist.")
+
+            items.append((product_id, quantity, item_sale_price))
+
+        products = self.get_products({product_id for product_id, _, _ in items})
+
+        for product_id, quantity, item_sale_price in items:
+            product = products.get(product_id)
             if not product:
                 raise serializers.ValidationError(f"Product with id {product_id} does not exist.")
 
@@ -99,212 +113,201 @@ class SaleSerializer(serializers.ModelSerializer):
             if item_sale_price is not None and item_sale_price < product.sale_price:
                 raise serializers.ValidationError(f"Item sale price ({item_sale_price}) cannot be less than product sale price ({product.sale_price})")
 
-            if product and quantity:
-                # Use item_sale_price if provided, otherwise use product's sale_price
-                print('item_sale_price', item_sale_price)
-                print('product.sale_price', product.sale_price)
-                price_to_use = item_sale_price if item_sale_price is not None else product.sale_price
-                actual_amount += price_to_use * quantity
+            # Use item_sale_price if provided, otherwise use product's sale_price
+            price_to_use = item_sale_price if item_sale_price is not None else product.sale_price
+            actual_amount += price_to_use * quantity
         
         # Apply tax to the actual amount
         actual_amount_with_tax = actual_amount + (actual_amount * (tax_rate / Decimal('100.0')))
         
-        print("Actual Amount:", actual_amount)
-        print("Actual Amount with Tax:", actual_amount_with_tax)
-        print("Given Amount:", given_amount)
         if given_amount > actual_amount_with_tax:
             raise serializers.ValidationError("Given amount exceeds the actual amount.")
         
         if given_amount < 0:
             raise serializers.ValidationError("Given amount cannot be negative.")
+
+        # Receivables need a currency
+        currency_id = attrs.get('currency_id') or getattr(self.instance, 'currency_id', None)
+        if self.sale_status(given_amount, actual_amount_with_tax) != Sale.SaleStatus.PAID and not currency_id:
+            raise serializers.ValidationError({'currency_id': ["Currency is required for sales that are not fully paid."]})
+
         try:
-            Store.objects.get(id=store_id)
-            Customer.objects.get(id=customer_id)
+            attrs['store'] = self.context.get('store') or Store.objects.get(id=store_id)
+            attrs['customer'] = self.get_customer(customer_id)
         except (Store.DoesNotExist, Customer.DoesNotExist) as e:
             raise serializers.ValidationError(str(e))
 
+        attrs['items'] = items
+        attrs['products'] = products
+        attrs['actual_amount'] = actual_amount_with_tax
         return super().validate(attrs)
-    
+
+    def get_products(self, product_ids):
+        """
+        Fetch every product on the sale in one query, or take them from the
+        `products` snapshot in the context when validating many sales at once.
+        """
+        snapshot = self.context.get('products')
+        if snapshot is not None:
+            return {product_id: snapshot[product_id] for product_id in product_ids if product_id in snapshot}
+        return {str(product.id): product for product in Product.objects.filter(id__in=product_ids)}
+
+    def get_customer(self, customer_id):
+        snapshot = self.context.get('customers')
+        if snapshot is None:
+            return Customer.objects.get(id=customer_id)
+        customer = snapshot.get(str(customer_id))
+        if customer is None:
+            raise Customer.DoesNotExist("Customer matching query does not exist.")
+        return customer
+
+    @staticmethod
+    def sale_status(total_amount, actual_amount_with_tax):
+        """Determine sale status based on amount received"""
+        if total_amount <= 0:
+            return Sale.SaleStatus.UNPAID
+        elif total_amount < actual_amount_with_tax:
+            return Sale.SaleStatus.PARTIALLY_PAID
+        return Sale.SaleStatus.PAID
+
+    @staticmethod
+    def build_sale_items(sale, items, products):
+        # Record the prices the items were sold at, so later price changes
+        # do not change what the sale counted for
+        return [
+            SaleItem(
+                sale=sale,
+                product=products[product_id],
+                quantity=quantity,
+                item_sale_price=item_sale_price if item_sale_price is not None else products[product_id].sale_price,
+                item_cost_price=products[product_id].purchase_price
+            )
+            for product_id, quantity, item_sale_price in items
+        ]
+
     def create(self, validated_data):
-        # Extract items and related IDs from validated data
-        items_data = validated_data.pop('items')
-        store_id = validated_data.pop('store_id')
-        customer_id = validated_data.pop('customer_id')
+        # Extract items and the objects resolved during validation
+        items = validated_data.pop('items')
+        products = validated_data.pop('products')
+        actual_amount_with_tax = validated_data.pop('actual_amount')
+        store = validated_data.pop('store')
+        customer = validated_data.pop('customer')
+        validated_data.pop('store_id')
+        validated_data.pop('customer_id')
         currency_id = validated_data.pop('currency_id', None)
         payment_mode_id = validated_data.pop('payment_mode_id', None)
         total_amount = validated_data.get('total_amount')
-        tax_rate = validated_data.get('tax', 0)
-        
-        actual_amount = 0
-        print('items_data', items_data)
-        for item in items_data:
-            product_id = item.get('product_id')
-            quantity = int(item.get('quantity', 0))
-            print('product_id', product_id)
-            print('quantity', quantity)
-            product = Product.objects.filter(id=product_id).first()
 
-            if product and quantity:
-                actual_amount += product.sale_price * quantity
-        
-        # Apply tax to the actual amount
-        actual_amount_with_tax = actual_amount + (actual_amount * (tax_rate / Decimal('100.0')))
+        status = self.sale_status(total_amount, actual_amount_with_tax)
 
         try:
-            # Fetch related objects
-            store = Store.objects.get(id=store_id)
-            customer = Customer.objects.get(id=customer_id)
-            
-            # Determine sale status based on amount received
-            if total_amount <= 0:
-                status = Sale.SaleStatus.UNPAID
-            elif total_amount < actual_amount_with_tax:
-                status = Sale.SaleStatus.PARTIALLY_PAID
-            else:
-                status = Sale.SaleStatus.PAID
-            
-            # Create the Sale instance
-            sale = Sale.objects.create(
-                store_id=store,
-                customer=customer,
-                status=status,
-                **validated_data
-            )
-            
-            # Set optional related fields
-            currency = None
-            if currency_id:
-                currency = Currency.objects.get(id=currency_id)
-                sale.currency = currency
-            if payment_mode_id:
-                payment_mode = PaymentMode.objects.get(id=payment_mode_id)
-                sale.payment_mode = payment_mode
-            
-            # Create SaleItem instances and update inventory
-            for item_data in items_data:
-                product = Product.objects.get(id=item_data['product_id'])
-                quantity = int(item_data['quantity'])
-                item_sale_price = Decimal(str(item_data.get('item_sale_price'))) if item_data.get('item_sale_price') is not None else None
-                
-                # Create sale item
-                SaleItem.objects.create(
-                    sale=sale,
-                    product=product,
-                    quantity=quantity,
-                    item_sale_price=item_sale_price
-                )
-                
-                # Update inventory
-                inventory = Inventory.objects.get(product=product, store=store)
-                inventory.quantity -= quantity
-                inventory.save()
-            
-            # Create receivable if not fully paid
-            if status in [Sale.SaleStatus.UNPAID, Sale.SaleStatus.PARTIALLY_PAID]:
-                receivable_amount = actual_amount_with_tax - total_amount
-                Receivable.objects.create(
+            with transaction.atomic():
+                # Fetch optional related objects
+                currency = Currency.objects.get(id=currency_id) if currency_id else None
+                payment_mode = PaymentMode.objects.get(id=payment_mode_id) if payment_mode_id else None
+
+                # Create the Sale instance
+                sale = Sale.objects.create(
                     store_id=store,
-                    sale=sale,
-                    amount=receivable_amount,
-                    currency=currency or sale.currency
+                    customer=customer,
+                    status=status,
+                    currency=currency,
+                    payment_mode=payment_mode,
+                    **validated_data
                 )
-            
-            sale.save()
+
+                # Create all sale items at once
+                sale_items = SaleItem.objects.bulk_create(self.build_sale_items(sale, items, products))
+
+                # Lock and decrement the inventory of every product sold
+                stock_changes = defaultdict(Decimal)
+                for product_id, quantity, _ in items:
+                    stock_changes[product_id] -= quantity
+                Inventory.adjust_stock(store.id, stock_changes)
+
+                # Add the sale to the daily rollup in the same transaction
+                DailyStoreProductSales.record_sale(sale, sale_items)
+
+                # Create receivable if not fully paid
+                if status in [Sale.SaleStatus.UNPAID, Sale.SaleStatus.PARTIALLY_PAID]:
+                    receivable_amount = actual_amount_with_tax - total_amount
+                    Receivable.objects.create(
+                        store_id=store,
+                        sale=sale,
+                        amount=receivable_amount,
+                        currency=currency
+                    )
+
             return sale
             
-        except (Store.DoesNotExist, Customer.DoesNotExist,
-                Currency.DoesNotExist, PaymentMode.DoesNotExist, Product.DoesNotExist,
-                Inventory.DoesNotExist) as e:
+        except (Currency.DoesNotExist, PaymentMode.DoesNotExist, Inventory.DoesNotExist, ValueError) as e:
             raise serializers.ValidationError(str(e))
 
     def update(self, instance, validated_data):
         """Update a Sale instance and its associated items."""
-        items_data = validated_data.pop('items', [])
-        actual_amount = 0
+        items = validated_data.pop('items', [])
+        products = validated_data.pop('products', {})
+        actual_amount_with_tax = validated_data.pop('actual_amount')
+        validated_data.pop('store', None)
+        validated_data.pop('customer', None)
         total_amount = validated_data.get('total_amount', instance.total_amount)
-        tax_rate = validated_data.get('tax', instance.tax)
-
-        # Calculate actual amount from items
-        for item in items_data:
-            product_id = item.get('product_id')
-            quantity = int(item.get('quantity', 0))
-            product = Product.objects.filter(id=product_id).first()
 
-            if product and quantity:
-                actual_amount += product.sale_price * quantity
-        
-        # Apply tax to the actual amount
-        actual_amount_with_tax = actual_amount + (actual_amount * (tax_rate / Decimal('100.0')))
-
-        # Determine sale status based on amount
-        if total_amount <= 0:
-            status = Sale.SaleStatus.UNPAID
-        elif total_amount < actual_amount_with_tax:
-            status = Sale.SaleStatus.PARTIALLY_PAID
-        else:
-            status = Sale.SaleStatus.PAID
+        status = self.sale_status(total_amount, actual_amount_with_tax)
 
         # Update the instance fields
         instance.status = status
         for attr, value in validated_data.items():
             if attr != 'store_id':  # Skip store_id updates
                 setattr(instance, attr, value)
-        
-        instance.save()
-
-        # Handle items update if provided
-        if items_data:
-            # First, restore inventory quantities from old items
-            old_items = SaleItem.objects.filter(sale=instance)
-            for old_item in old_items:
-                inventory = Inventory.objects.get(product=old_item.product, store=instance.store)
-                inventory.quantity += old_item.quantity
-                inventory.save()
-            
-            # Delete old items
-            old_items.delete()
-            
-            # Create new items and update inventory
-            for item_data in items_data:
-                product = Product.objects.get(id=item_data['product_id'])
-                quantity = int(item_data['quantity'])
-                
-                # Validate inventory
-                inventory = Inventory.objects.get(product=product, store=instance.store)
-                if inventory.quantity < quantity:
-                    raise serializers.ValidationError(f"Insufficient inventory for product {product.name}")
-                
-                # Create new sale item
-                SaleItem.objects.create(
-                    sale=instance,
-                    product=product,
-                    quantity=quantity
-                )
-                
-                # Update inventory
-                inventory.quantity -= quantity
-                inventory.save()
 
-        # Handle receivable update
         try:
-            receivable = Receivable.objects.get(sale=instance)
-            if status == Sale.SaleStatus.PAID:
-                # Delete receivable if fully paid
-                receivable.delete()
-            else:
-                # Update receivable amount
-                receivable_amount = actual_amount_with_tax - total_amount
-                receivable.amount = receivable_amount
-                receivable.save()
-        except Receivable.DoesNotExist:
-            # Create new receivable if not fully paid
-            if status in [Sale.SaleStatus.UNPAID, Sale.SaleStatus.PARTIALLY_PAID]:
-                receivable_amount = actual_amount_with_tax - total_amount
-                Receivable.objects.create(
-                    store_id=instance.store,
-                    sale=instance,
-                    amount=receivable_amount,
-                    currency=instance.currency
-                )
+            with transaction.atomic():
+                instance.save()
+
+                # Handle items update if provided
+                if items:
+                    old_items = list(SaleItem.objects.filter(sale=instance).select_related('product'))
+
+                    # Net stock change: restore the old items, take the new ones
+                    stock_changes = defaultdict(Decimal)
+                    for old_item in old_items:
+                        stock_changes[str(old_item.product_id)] += old_item.quantity
+                    for product_id, quantity, _ in items:
+                        stock_changes[product_id] -= quantity
+
+                    # Replace the items and apply the stock change. Saving the
+                    # sale already invalidated the report snapshots covering it,
+                    # and sale items have no delete receivers, so this is one DELETE
+                    SaleItem.objects.filter(id__in=[old_item.id for old_item in old_items]).delete()
+                    new_items = SaleItem.objects.bulk_create(self.build_sale_items(instance, items, products))
+                    Inventory.adjust_stock(instance.store_id_id, stock_changes)
+
+                    # Swap the old items for the new ones in the rollup with one upsert
+                    DailyStoreProductSales.record_changes([(instance, old_items, -1), (instance, new_items, 1)])
+
+                # Handle receivable update
+                try:
+                    receivable = Receivable.objects.get(sale=instance)
+                    if status == Sale.SaleStatus.PAID:
+                        # Delete receivable if fully paid
+                        receivable.delete()
+                    else:
+                        # Update receivable amount
+                        receivable_amount = actual_amount_with_tax - total_amount
+                        receivable.amount = receivable_amount
+                        receivable.save()
+                except Receivable.DoesNotExist:
+                    # Create new receivable if not fully paid
+                    if status in [Sale.SaleStatus.UNPAID, Sale.SaleStatus.PARTIALLY_PAID]:
+                        receivable_amount = actual_amount_with_tax - total_amount
+                        Receivable.objects.create(
+                            store_id=instance.store_id,
+                            sale=instance,
+                            amount=receivable_amount,
+                            currency=instance.currency
+                        )
+
+        except (Inventory.DoesNotExist, ValueError) as e:
+            raise serializers.ValidationError(str(e))
 
         return instance 
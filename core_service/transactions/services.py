@@ -0,0 +1,260 @@
+import logging
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction, IntegrityError
+from companies.models.currency import Currency
+from financials.models.receivable import Receivable
+from inventory.models.inventory import Inventory
+from inventory.models.product import Product
+from transactions.models.customer import Customer
+from transactions.models.daily_store_product_sales import DailyStoreProductSales
+from transactions.models.payment_mode import PaymentMode
+from transactions.models.sale import Sale
+from transactions.models.sale_item import SaleItem
+from transactions.serializers.sale import SaleSerializer
+
+logger = logging.getLogger(__name__)
+
+MAX_BULK_SALES = 1000
+BULK_SALE_CHUNK_SIZE = 100
+
+CREATED = 'created'
+DUPLICATE = 'duplicate'
+FAILED = 'failed'
+
+
+def parse_uuid(value):
+    try:
+        return str(uuid.UUID(str(value)))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def load_snapshot(store, entries):
+    """
+    Load every product, customer, currency and payment mode referenced by a
+    batch of sales with one query each.
+    """
+    product_ids, customer_ids, currency_ids, payment_mode_ids = set(), set(), set(), set()
+    for entry in entries:
+        for item in entry.get('items') or []:
+            if isinstance(item, dict) and parse_uuid(item.get('product_id')):
+                product_ids.add(parse_uuid(item.get('product_id')))
+        for ids, field in (
+            (customer_ids, 'customer_id'),
+            (currency_ids, 'currency_id'),
+            (payment_mode_ids, 'payment_mode_id'),
+        ):
+            if parse_uuid(entry.get(field)):
+                ids.add(parse_uuid(entry.get(field)))
+
+    return {
+        'store': store,
+        'products': {str(product.id): product for product in Product.objects.filter(id__in=product_ids)},
+        'customers': {str(customer.id): customer for customer in Customer.objects.filter(id__in=customer_ids)},
+        'currencies': {str(currency.id): currency for currency in Currency.objects.filter(id__in=currency_ids)},
+        'payment_modes': {str(mode.id): mode for mode in PaymentMode.objects.filter(id__in=payment_mode_ids)},
+    }
+
+
+def validate_sale(store, entry, snapshot):
+    """
+    Validate one uploaded sale against the snapshot with SaleSerializer.
+    Returns (validated_data, errors).
+    """
+    data = {key: value for key, value in entry.items() if key != 'idempotency_key'}
+    data['store_id'] = str(store.id)
+    serializer = SaleSerializer(data=data, context=snapshot)
+    if not serializer.is_valid():
+        return None, serializer.errors
+
+    validated = serializer.validated_data
+    for field, lookup, name in (
+        ('currency_id', 'currencies', 'Currency'),
+        ('payment_mode_id', 'payment_modes', 'PaymentMode'),
+    ):
+        value = validated.pop(field, None)
+        resolved = snapshot[lookup].get(str(value)) if value else None
+        if value and resolved is None:
+            return None, {field: [f"{name} matching query does not exist."]}
+        validated[field.replace('_id', '')] = resolved
+
+    validated['status'] = SaleSerializer.sale_status(validated['total_amount'], validated['actual_amount'])
+    validated['idempotency_key'] = entry['idempotency_key']
+    return validated, None
+
+
+def sale_stock_needs(sale):
+    needs = defaultdict(Decimal)
+    for product_id, quantity, _ in sale['items']:
+        needs[product_id] += quantity
+    return needs
+
+
+def apply_sales_chunk(store, chunk):
+    """
+    Create a chunk of validated sales in one transaction: lock the inventory
+    of every product involved, accept sales in upload order while stock
+    lasts, then insert sales, items and receivables in bulk and apply the
+    combined stock change. Returns {index: result}.
+    """
+    results = {}
+    with transaction.atomic():
+        product_ids = {product_id for _, sale in chunk for product_id, _, _ in sale['items']}
+        locked_rows = Inventory.lock_stock(store.id, product_ids)
+        available = {product_id: row.quantity for product_id, row in locked_rows.items()}
+
+        accepted = []
+        stock_changes = defaultdict(Decimal)
+        for index, sale in chunk:
+            needs = sale_stock_needs(sale)
+            error = None
+            for product_id, quantity in needs.items():
+                if product_id not in available:
+                    error = f"No inventory record found for product {product_id} in store {store.id}"
+                elif available[product_id] < quantity:
+                    error = f"Insufficient inventory for product {sale['products'][product_id].name}"
+                if error:
+                    break
+            if error:
+                results[index] = {'status': FAILED, 'errors': {'items': [error]}}
+                continue
+
+            for product_id, quantity in needs.items():
+                available[product_id] -= quantity
+                stock_changes[product_id] -= quantity
+            accepted.append((index, sale))
+
+        sales = Sale.objects.bulk_create([
+            Sale(
+                store_id=store,
+                customer=sale['customer'],
+                total_amount=sale['total_amount'],
+                tax=sale.get('tax', Decimal('0.00')),
+                currency=sale['currency'],
+                payment_mode=sale['payment_mode'],
+                is_credit=sale.get('is_credit', False),
+                status=sale['status'],
+                idempotency_key=sale['idempotency_key']
+            )
+            for _, sale in accepted
+        ])
+
+        sale_items = {}
+        for sale_object, (_, sale) in zip(sales, accepted):
+            sale_items[sale_object.id] = SaleSerializer.build_sale_items(sale_object, sale['items'], sale['products'])
+        SaleItem.objects.bulk_create([item for items in sale_items.values() for item in items])
+
+        Inventory.adjust_stock(store.id, stock_changes, locked_rows=locked_rows)
+
+        Receivable.objects.bulk_create([
+            Receivable(
+                store_id=store,
+                sale=sale_object,
+                amount=sale['actual_amount'] - sale['total_amount'],
+                currency=sale['currency']
+            )
+            for sale_object, (_, sale) in zip(sales, accepted)
+            if sale['status'] != Sale.SaleStatus.PAID
+        ])
+
+        DailyStoreProductSales.record_sales(
+            [(sale_object, sale_items[sale_object.id]) for sale_object in sales]
+        )
+        for sale_object, (index, _) in zip(sales, accepted):
+            results[index] = {'status': CREATED, 'sale_id': sale_object.id}
+
+    return results
+
+
+def apply_sales(store, chunk):
+    """
+    Apply a chunk, falling back to one sale at a time when a concurrent
+    upload already stored one of its idempotency keys.
+    """
+    try:
+        return apply_sales_chunk(store, chunk)
+    except IntegrityError:
+        if len(chunk) == 1:
+            index, sale = chunk[0]
+            sale_id = Sale.objects.filter(
+                store_id=store, idempotency_key=sale['idempotency_key']
+            ).values_list('id', flat=True).first()
+            if sale_id is None:
+                raise
+            return {index: {'status': DUPLICATE, 'sale_id': sale_id}}
+
+    results = {}
+    for entry in chunk:
+        results.update(apply_sales(store, [entry]))
+    return results
+
+
+def ingest_sales(store, entries, chunk_size=BULK_SALE_CHUNK_SIZE):
+    """
+    Ingest a batch of sales uploaded by a POS terminal and return one result
+    per entry, in upload order.
+
+    Each entry is a SaleSerializer payload plus a client-generated
+    `idempotency_key`. Keys already stored for the store (or repeated
+    earlier in the batch) are reported as duplicates and not applied again.
+    """
+    results = [None] * len(entries)
+    first_index = {}
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            results[index] = {'status': FAILED, 'errors': {'non_field_errors': ["Each sale must be an object."]}}
+            continue
+        key = entry.get('idempotency_key')
+        if not key or not isinstance(key, str) or len(key) > 100:
+            results[index] = {'status': FAILED, 'errors': {'idempotency_key': ["A key of up to 100 characters is required."]}}
+            continue
+        if key in first_index:
+            results[index] = {'status': DUPLICATE, 'duplicate_of': first_index[key]}
+            continue
+        first_index[key] = index
+
+    existing = dict(
+        Sale.objects.filter(store_id=store, idempotency_key__in=first_index.keys())
+        .values_list('idempotency_key', 'id')
+    )
+
+    pending = []
+    for key, index in first_index.items():
+        if key in existing:
+            results[index] = {'status': DUPLICATE, 'sale_id': existing[key]}
+        else:
+            pending.append(index)
+
+    snapshot = load_snapshot(store, [entries[index] for index in pending])
+
+    valid = []
+    for index in pending:
+        sale, errors = validate_sale(store, entries[index], snapshot)
+        if errors:
+            results[index] = {'status': FAILED, 'errors': errors}
+        else:
+            valid.append((index, sale))
+
+    for start in range(0, len(valid), chunk_size):
+        for index, result in apply_sales(store, valid[start:start + chunk_size]).items():
+            results[index] = result
+
+    for index, result in enumerate(results):
+        key = entries[index].get('idempotency_key') if isinstance(entries[index], dict) else None
+        results[index] = result = {'index': index, 'idempotency_key': key, **result}
+        if 'duplicate_of' in result:
+            # A key repeated within the batch shares the outcome of its first use
+            original = results[result.pop('duplicate_of')]
+            if original['status'] == FAILED:
+                result.update(status=FAILED, errors=original['errors'])
+            else:
+                result['sale_id'] = original['sale_id']
+
+    counts = defaultdict(int)
+    for result in results:
+        counts[result['status']] += 1
+    logger.info(f"Bulk sale upload for store {store.id}: {dict(counts)}")
+
+    return results
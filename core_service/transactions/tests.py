@@ -1,3 +1,276 @@
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+import json
+from django.apps import apps
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from companies.models import Currency
+from inventory.models import Product
+from inventory.models.inventory import Inventory
+from transactions.models import DailyStoreProductSales, Sale, SaleItem
+from reports.models import Report
+from transactions.serializers.sale import SaleSerializer
+from transactions.services import CREATED, DUPLICATE, FAILED, apply_sales, load_snapshot, validate_sale
+from core_auth.utils import StatelessUser
+from core_service.testing import StoreTestData
 
-# Create your tests here.
+
+class SaleTestData(StoreTestData):
+    """A store with stocked products, a customer and a currency, shared by the sale tests."""
+
+    purchase_price = Decimal('4')
+
+    @classmethod
+    def create_store_with_products(cls, num_products=2, stock=Decimal('1000')):
+        store, products, customer = super().create_store_with_products(num_products=num_products, stock=stock)
+        currency = Currency.objects.create(name='Birr', code='ETB')
+        return store, products, customer, currency
+
+    @classmethod
+    def sale_payload(cls, store, customer, items, total_amount, **extra):
+        return {
+            'store_id': str(store.id),
+            'customer_id': str(customer.id),
+            'total_amount': str(total_amount),
+            'items': [{'product_id': str(product.id), 'quantity': str(quantity)} for product, quantity in items],
+            **extra
+        }
+
+
+class DailyStoreProductSalesTests(TestCase):
+    def setUp(self):
+        self.store, self.products, self.customer, self.currency = SaleTestData.create_store_with_products()
+
+    def save_sale(self, items, total_amount, instance=None):
+        serializer = SaleSerializer(
+            instance, data=SaleTestData.sale_payload(self.store, self.customer, items, total_amount)
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def rollup(self):
+        return {
+            row.product_id: (row.quantity, row.revenue, row.cost, row.sale_count)
+            for row in DailyStoreProductSales.objects.filter(store=self.store)
+        }
+
+    def test_create_adds_items_at_their_sale_prices(self):
+        first, second = self.products
+        self.save_sale([(first, 2), (second, 1)], Decimal('40'))
+        self.save_sale([(first, 3)], Decimal('30'))
+
+        self.assertEqual(self.rollup(), {
+            first.id: (Decimal('5'), Decimal('50'), Decimal('20'), 2),
+            second.id: (Decimal('1'), Decimal('20'), Decimal('4'), 1),
+        })
+
+    def test_update_replaces_the_old_items(self):
+        first, second = self.products
+        sale = self.save_sale([(first, 2)], Decimal('20'))
+        self.save_sale([(second, 3)], Decimal('60'), instance=sale)
+
+        self.assertEqual(self.rollup(), {
+            second.id: (Decimal('3'), Decimal('60'), Decimal('12'), 1),
+        })
+
+    def test_delete_after_price_change_reverses_exactly(self):
+        first, second = self.products
+        kept = self.save_sale([(first, 1)], Decimal('10'))
+        sale = self.save_sale([(first, 2), (second, 1)], Decimal('40'))
+
+        # Later price changes must not change what the sales counted for
+        Product.objects.filter(id=first.id).update(sale_price=Decimal('99'), purchase_price=Decimal('50'))
+        Sale.objects.get(id=sale.id).delete()
+
+        self.assertEqual(self.rollup(), {
+            first.id: (Decimal('1'), Decimal('10'), Decimal('4'), 1),
+        })
+        kept.delete()
+        self.assertEqual(self.rollup(), {})
+
+    def test_failed_sale_leaves_rollup_unchanged(self):
+        first, _ = self.products
+        serializer = SaleSerializer(data=SaleTestData.sale_payload(self.store, self.customer, [(first, 5000)], '50000'))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertRaises(serializers.ValidationError):
+            serializer.save()
+
+        self.assertEqual(self.rollup(), {})
+
+    def test_backfill_and_rebuild_match_the_maintained_rollup(self):
+        first, second = self.products
+        self.save_sale([(first, 2), (second, 1)], Decimal('40'))
+        self.save_sale([(first, 3)], Decimal('30'))
+        Product.objects.filter(id=first.id).update(sale_price=Decimal('99'), purchase_price=Decimal('50'))
+        expected = self.rollup()
+
+        backfill = import_module('transactions.migrations.0011_backfill_daily_store_product_sales')
+        backfill.backfill_daily_store_product_sales(apps, None)
+        self.assertEqual(self.rollup(), expected)
+
+        call_command('rebuild_rollups', '--store', str(self.store.id), stdout=StringIO())
+        self.assertEqual(self.rollup(), expected)
+
+
+class SaleQueryCountTests(TestCase):
+    """Creating or updating a sale costs a fixed number of queries, however many lines it has."""
+
+    def setUp(self):
+        self.store, self.products, self.customer, _ = SaleTestData.create_store_with_products(num_products=50)
+
+    def payload(self, quantity):
+        total = sum(product.sale_price * quantity for product in self.products)
+        return SaleTestData.sale_payload(
+            self.store, self.customer, [(product, quantity) for product in self.products], total
+        )
+
+    def test_create_fifty_line_sale(self):
+        # products, store, customer; savepoint, sale, snapshot invalidation,
+        # items, inventory lock, stock update, rollup upsert, release
+        with self.assertNumQueries(11):
+            serializer = SaleSerializer(data=self.payload(1))
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            serializer.save()
+
+        stock = Inventory.objects.filter(store=self.store).values_list('quantity', flat=True)
+        self.assertEqual(set(stock), {Decimal('999')})
+
+    def test_update_fifty_line_sale(self):
+        serializer = SaleSerializer(data=self.payload(1))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        sale = serializer.save()
+
+        # products, store, customer; savepoint, sale, snapshot invalidation,
+        # old items, delete, insert, inventory lock, stock update, rollup
+        # upsert, receivable lookup, release
+        with self.assertNumQueries(14):
+            serializer = SaleSerializer(sale, data=self.payload(3))
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            serializer.save()
+
+        stock = Inventory.objects.filter(store=self.store).values_list('quantity', flat=True)
+        self.assertEqual(set(stock), {Decimal('997')})
+        self.assertEqual(sale.items.count(), 50)
+
+    def test_update_invalidates_report_snapshots(self):
+        serializer = SaleSerializer(data=self.payload(1))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        sale = serializer.save()
+        Report.objects.create(
+            store=self.store, report_type=Report.ReportType.SALES, title='Sales',
+            date_range_start=sale.created_at, date_range_end=sale.created_at
+        )
+
+        serializer = SaleSerializer(sale, data=self.payload(2))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        self.assertFalse(Report.objects.exists())
+        self.assertEqual(SaleItem.objects.filter(sale=sale).count(), 50)
+
+
+class SaleCurrencyValidationTests(TestCase):
+    """Single and bulk sales agree that only fully paid sales may omit a currency."""
+
+    def setUp(self):
+        self.store, self.products, self.customer, self.currency = SaleTestData.create_store_with_products()
+
+    def test_unpaid_sale_requires_currency(self):
+        payload = SaleTestData.sale_payload(self.store, self.customer, [(self.products[0], 2)], '5')
+
+        serializer = SaleSerializer(data=payload)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('currency_id', serializer.errors)
+
+        _, errors = validate_sale(self.store, {**payload, 'idempotency_key': 'k1'}, load_snapshot(self.store, [payload]))
+        self.assertIn('currency_id', errors)
+
+    def test_unpaid_sale_with_currency_creates_receivable(self):
+        payload = SaleTestData.sale_payload(
+            self.store, self.customer, [(self.products[0], 2)], '5', currency_id=str(self.currency.id)
+        )
+        serializer = SaleSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        sale = serializer.save()
+
+        self.assertEqual(sale.status, Sale.SaleStatus.PARTIALLY_PAID)
+        self.assertEqual(sale.sale_receivables.get().amount, Decimal('15'))
+
+
+class SaleBulkIngestTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(StatelessUser({'id': 'sale-tests', 'role': 'admin'}))
+        self.store, self.products, self.customer, self.currency = SaleTestData.create_store_with_products()
+        self.url = reverse('transactions:sale-bulk-ingest', kwargs={'store_id': self.store.id})
+
+    def entry(self, key, quantity=1, **extra):
+        product = self.products[0]
+        return {
+            **SaleTestData.sale_payload(self.store, self.customer, [(product, quantity)], product.sale_price * quantity),
+            'idempotency_key': key,
+            **extra
+        }
+
+    def test_creates_sales_and_reports_each_result(self):
+        response = self.client.post(self.url, [
+            self.entry('a'),
+            self.entry('b', quantity=2),
+            self.entry('a'),
+            self.entry('c', quantity=5000),
+        ], format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['duplicates'], response.data['failed']), (2, 1, 1))
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], [CREATED, CREATED, DUPLICATE, FAILED])
+        self.assertEqual(results[2]['sale_id'], results[0]['sale_id'])
+        self.assertEqual(Inventory.objects.get(product=self.products[0]).quantity, Decimal('997'))
+        self.assertEqual(DailyStoreProductSales.objects.get(product=self.products[0]).sale_count, 2)
+
+    def test_replaying_a_batch_creates_nothing(self):
+        batch = [self.entry('a'), self.entry('b')]
+        first = self.client.post(self.url, batch, format='json')
+        replay = self.client.post(self.url, {'sales': batch}, format='json')
+
+        self.assertEqual(replay.data['duplicates'], 2)
+        self.assertEqual(
+            [result['sale_id'] for result in replay.data['results']],
+            [result['sale_id'] for result in first.data['results']]
+        )
+        self.assertEqual(Sale.objects.filter(store_id=self.store).count(), 2)
+        self.assertEqual(Inventory.objects.get(product=self.products[0]).quantity, Decimal('998'))
+
+    def test_accepts_ndjson(self):
+        body = '\n'.join(json.dumps(entry, default=str) for entry in [self.entry('a'), self.entry('b')]) + '\n\n'
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+
+    def test_rejects_malformed_ndjson(self):
+        body = json.dumps(self.entry('a'), default=str) + '\n{not json\n'
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 2', str(response.data))
+        self.assertFalse(Sale.objects.exists())
+
+    def test_concurrently_stored_key_falls_back_to_one_sale_at_a_time(self):
+        entries = [self.entry('a'), self.entry('b')]
+        snapshot = load_snapshot(self.store, entries)
+        chunk = [(index, validate_sale(self.store, entry, snapshot)[0]) for index, entry in enumerate(entries)]
+
+        # Another upload stores key 'b' after this batch checked for it
+        existing = Sale.objects.create(
+            store_id=self.store, customer=self.customer, total_amount=Decimal('10'), idempotency_key='b'
+        )
+        results = apply_sales(self.store, chunk)
+
+        self.assertEqual(results[0]['status'], CREATED)
+        self.assertEqual(results[1], {'status': DUPLICATE, 'sale_id': existing.id})
+        self.assertEqual(Inventory.objects.get(product=self.products[0]).quantity, Decimal('999'))
@@ -3,7 +3,7 @@ from transactions.views.payment_mode import PaymentModeDetailView, PaymentModeLi
 from transactions.views.customer import CustomerListView, CustomerDetailView
 from transactions.views.supplier import SupplierListView, SupplierDetailView
 from transactions.views.sale import (
-    SaleListView, SaleDetailView,
+    SaleListView, SaleDetailView, SaleBulkIngestView,
     SaleItemListView, SaleItemDetailView
 )
 from transactions.views.purchase import (
@@ -24,6 +24,7 @@ urlpatterns = [
     
     # Sale URLs
     path('stores/<uuid:store_id>/sales/', SaleListView.as_view(), name='sale-list'),
+    path('stores/<uuid:store_id>/sales/bulk/', SaleBulkIngestView.as_view(), name='sale-bulk-ingest'),
     path('stores/<uuid:store_id>/sales/<uuid:id>/', SaleDetailView.as_view(), name='sale-detail'),
     path('stores/<uuid:store_id>/sales/<uuid:sale_id>/items/', SaleItemListView.as_view(), name='sale-item-list'),
     path('stores/<uuid:store_id>/sales/<uuid:sale_id>/items/<int:item_id>/', SaleItemDetailView.as_view(), name='sale-item-detail'),
@@ -4,12 +4,17 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.request import Request
+from rest_framework.parsers import JSONParser
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 from transactions.models.sale import Sale
 from transactions.models.sale_item import SaleItem
 from transactions.serializers.sale import SaleSerializer
 from transactions.serializers.sale_item import SaleItemSerializer
 from inventory.models.inventory import Inventory
+from companies.models.store import Store
+from transactions.parsers import NDJSONParser
+from reports.models import invalidate_report_snapshots
+from transactions.services import ingest_sales, MAX_BULK_SALES, CREATED, DUPLICATE, FAILED
 import os
 import requests
 class SaleListView(APIView):
@@ -123,6 +128,7 @@ class SaleItemListView(APIView):
                     return Response(data=serializer.data, status=status.HTTP_201_CREATED)
                 except ValueError as e:
                     sale_item.delete()
+                    invalidate_report_snapshots(sale.store_id_id, sale.created_at)
                     return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
             return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Sale.DoesNotExist:
@@ -221,6 +227,8 @@ class SaleItemDetailView(APIView):
                 )
             
             item.delete()
+            # Nothing listens for sale item deletes; drop the reports counting it
+            invalidate_report_snapshots(sale.store_id_id, sale.created_at)
 
             requests.post(os.getenv('USER_SERVICE_URL') + '/activity-logs/', json={
             "user": request.user.id,
@@ -231,4 +239,44 @@ class SaleItemDetailView(APIView):
 
             return Response({'message': 'Sale item deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
         except Sale.DoesNotExist:
-            return Response({'error': 'Sale not found'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            return Response({'error': 'Sale not found'}, status=status.HTTP_404_NOT_FOUND)
+
+class SaleBulkIngestView(APIView):
+    parser_classes = [JSONParser, NDJSONParser]
+
+    @extend_schema(
+        description=(
+            "Upload a batch of sales queued offline by a POS terminal, as a JSON array "
+            "(or {\"sales\": [...]}) or as NDJSON. Each sale is a regular sale payload plus a "
+            "client-generated idempotency_key; keys already uploaded are reported as duplicates "
+            "and not applied again. Returns one result per sale, in upload order."
+        ),
+        request=SaleSerializer(many=True),
+        responses={
+            200: OpenApiResponse(description="Per-sale results (created, duplicate or failed)"),
+            400: OpenApiResponse(description="Invalid payload"),
+            404: OpenApiResponse(description="Store not found")
+        }
+    )
+    def post(self, request: Request, store_id):
+        try:
+            store = Store.objects.get(pk=store_id)
+        except Store.DoesNotExist:
+            return Response({'error': 'Store not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        entries = request.data.get('sales') if isinstance(request.data, dict) else request.data
+        if not isinstance(entries, list):
+            return Response({'error': 'Expected a list of sales'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(entries) > MAX_BULK_SALES:
+            return Response(
+                {'error': f'At most {MAX_BULK_SALES} sales can be uploaded at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = ingest_sales(store, entries)
+        return Response({
+            'created': sum(1 for result in results if result['status'] == CREATED),
+            'duplicates': sum(1 for result in results if result['status'] == DUPLICATE),
+            'failed': sum(1 for result in results if result['status'] == FAILED),
+            'results': results
+        }, status=status.HTTP_200_OK)
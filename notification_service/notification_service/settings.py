@@ -80,9 +80,42 @@ EMAIL_TIMEOUT = 60
 # Service URLs
 USER_SERVICE_URL = config('USER_SERVICE_URL', default='http://localhost:8000')
 
+# Seconds a store's notification recipients are reused before asking the
+# user service again
+RECIPIENT_CACHE_TTL = config('RECIPIENT_CACHE_TTL', default=300, cast=int)
+RECIPIENT_CACHE_SIZE = config('RECIPIENT_CACHE_SIZE', default=1024, cast=int)
+
 # RabbitMQ
 CLOUDAMQP_URL = config('CLOUDAMQP_URL', default='')
 
+# Notification consumer: unacked messages worked on at once, email sender
+# threads (each keeps one SMTP connection open) and how often to log throughput
+NOTIFICATION_PREFETCH_COUNT = config('NOTIFICATION_PREFETCH_COUNT', default=20, cast=int)
+NOTIFICATION_EMAIL_WORKERS = config('NOTIFICATION_EMAIL_WORKERS', default=4, cast=int)
+NOTIFICATION_METRICS_INTERVAL = config('NOTIFICATION_METRICS_INTERVAL', default=60, cast=int)
+
+# Seconds low stock events of a store are collected before one digest email
+# lists them all; 0 sends each event as soon as it arrives
+LOW_STOCK_DIGEST_WINDOW = config('LOW_STOCK_DIGEST_WINDOW', default=300, cast=int)
+
+# Seconds buffered events claimed for a digest are hidden from other
+# consumers; if the consumer dies before recording the digest they are
+# picked up again once the lease runs out
+LOW_STOCK_DIGEST_LEASE = config('LOW_STOCK_DIGEST_LEASE', default=300, cast=int)
+
+# Seconds a failed message waits before each redelivery; after the last
+# delay it is parked on the dead letter queue
+NOTIFICATION_RETRY_DELAYS = config(
+    'NOTIFICATION_RETRY_DELAYS',
+    default='10,60,300,1800',
+    cast=lambda value: [int(delay) for delay in value.split(',') if delay.strip()]
+)
+
+# Emails that failed with a transient SMTP error are re-sent by
+# resend_failed_notifications, waiting base * 2^(attempt - 1) seconds between tries
+NOTIFICATION_MAX_SEND_ATTEMPTS = config('NOTIFICATION_MAX_SEND_ATTEMPTS', default=5, cast=int)
+NOTIFICATION_RESEND_BASE_DELAY = config('NOTIFICATION_RESEND_BASE_DELAY', default=60, cast=int)
+
 # Logging
 LOGGING = {
     'version': 1,
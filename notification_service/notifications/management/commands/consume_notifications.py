@@ -7,8 +7,15 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = 'Start consuming notification messages from CloudAMQP'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--prefetch', type=int, help='Unacknowledged messages processed at once')
+        parser.add_argument('--workers', type=int, help='Email sender threads')
+
     def handle(self, *args, **options):
-        consumer = RabbitMQConsumer()
+        consumer = RabbitMQConsumer(
+            prefetch_count=options['prefetch'],
+            max_workers=options['workers']
+        )
         
         try:
             self.stdout.write(
@@ -0,0 +1,70 @@
+import gzip
+import json
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from notifications.models import NotificationBody, NotificationLog, ProcessedEvent
+
+class Command(BaseCommand):
+    help = 'Delete (and optionally archive) notification logs and processed event ids older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Keep logs newer than this many days')
+        parser.add_argument('--archive', help='Append pruned logs to this gzipped JSON lines file first')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Logs deleted per query')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        archive = gzip.open(options['archive'], 'at', encoding='utf-8') if options['archive'] else None
+
+        pruned = 0
+        try:
+            # One pass per status so every batch is served by the (status, created_at) index
+            for status, _ in NotificationLog.STATUS_CHOICES:
+                while True:
+                    logs = NotificationLog.objects.filter(
+                        status=status, created_at__lt=cutoff
+                    ).order_by('created_at')[:options['batch_size']]
+                    if archive:
+                        rows = list(logs.select_related('body'))
+                        for log in rows:
+                            archive.write(json.dumps(self.archived(log), cls=DjangoJSONEncoder) + '\n')
+                        ids = [log.id for log in rows]
+                    else:
+                        ids = list(logs.values_list('id', flat=True))
+                    if not ids:
+                        break
+                    NotificationLog.objects.filter(id__in=ids).delete()
+                    pruned += len(ids)
+        finally:
+            if archive:
+                archive.close()
+
+        # Bodies no longer referenced; recently used ones may belong to logs being written
+        orphans, _ = NotificationBody.objects.filter(
+            ~Exists(NotificationLog.objects.filter(body=OuterRef('pk'))),
+            last_used_at__lt=cutoff
+        ).delete()
+
+        # Redeliveries arrive within minutes, so old event ids are no longer needed
+        events, _ = ProcessedEvent.objects.filter(created_at__lt=cutoff).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Pruned {pruned} notification logs, {orphans} unused bodies and {events} processed event ids'
+        ))
+
+    def archived(self, log):
+        return {
+            'id': log.id,
+            'recipient_email': log.recipient_email,
+            'subject': log.subject,
+            'status': log.status,
+            'error_message': log.error_message,
+            'metadata': log.metadata,
+            'sent_at': log.sent_at,
+            'created_at': log.created_at,
+            'html_body': log.html_body,
+            'text_body': log.body.text_body if log.body_id else '',
+        }
@@ -0,0 +1,65 @@
+import logging
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from notifications.models import NotificationLog
+from notifications.services import NotificationService
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Re-send emails that failed with a transient SMTP error once their backoff has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Failed emails claimed per batch')
+        parser.add_argument('--poll-interval', type=int, default=30, help='Seconds to sleep when nothing is due')
+        parser.add_argument('--lease', type=int, default=300, help='Seconds a claimed email is hidden from other workers')
+        parser.add_argument('--once', action='store_true', help='Process the emails due now and exit')
+
+    def handle(self, *args, **options):
+        service = NotificationService()
+        sent = failed = 0
+        try:
+            while True:
+                close_old_connections()
+                logs = self.claim(options['batch_size'], options['lease'])
+                if logs:
+                    for log in logs:
+                        if service.resend_notification(log):
+                            sent += 1
+                        else:
+                            failed += 1
+                    NotificationLog.objects.bulk_update(
+                        logs, ['status', 'sent_at', 'error_message', 'attempts', 'next_attempt_at']
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Stopping re-send worker...'))
+        finally:
+            service.close_email_connections()
+
+        self.stdout.write(self.style.SUCCESS(f'Re-sent {sent} emails, {failed} failed again'))
+
+    def claim(self, batch_size, lease):
+        """
+        Lock due emails, skipping those another worker holds, and push their
+        next attempt past the lease so the lock can be released before sending.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            logs = list(
+                NotificationLog.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('body')
+                .filter(status='failed', next_attempt_at__lte=now)
+                .order_by('next_attempt_at')[:batch_size]
+            )
+            if logs:
+                NotificationLog.objects.filter(id__in=[log.id for log in logs]).update(
+                    next_attempt_at=now + timedelta(seconds=lease)
+                )
+        return logs
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def remove_duplicate_default_templates(apps, schema_editor):
+    # Every low stock email used to insert a fresh copy of the default
+    # template; keep only the most recent one
+    NotificationTemplate = apps.get_model('notifications', 'NotificationTemplate')
+    defaults = NotificationTemplate.objects.filter(name='Default Low Stock Alert', type='low_stock')
+    latest = defaults.order_by('-updated_at').values_list('id', flat=True).first()
+    if latest is not None:
+        defaults.exclude(id=latest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_default_templates, migrations.RunPython.noop),
+    ]
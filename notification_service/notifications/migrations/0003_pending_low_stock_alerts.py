@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:21
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_remove_duplicate_default_templates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificationtemplate',
+            name='type',
+            field=models.CharField(choices=[('low_stock', 'Low Stock Alert'), ('low_stock_digest', 'Low Stock Digest'), ('out_of_stock', 'Out of Stock Alert')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='PendingLowStockAlert',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('company_id', models.CharField(max_length=64)),
+                ('store_id', models.CharField(max_length=64)),
+                ('payload', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'pending_low_stock_alerts',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['company_id', 'store_id', 'created_at'], name='pending_alerts_store_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_pending_low_stock_alerts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationBody',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('html_body', models.TextField()),
+                ('text_body', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'notification_bodies',
+            },
+        ),
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='message_body',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='notificationlog',
+            name='body',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='notifications.notificationbody'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationlog',
+            index=models.Index(fields=['status', 'created_at'], name='notification_logs_status_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+import hashlib
+from django.db import migrations
+
+
+def share_existing_bodies(apps, schema_editor):
+    # Move inline HTML into shared bodies so duplicated renders are stored once
+    NotificationBody = apps.get_model('notifications', 'NotificationBody')
+    NotificationLog = apps.get_model('notifications', 'NotificationLog')
+    while True:
+        logs = list(
+            NotificationLog.objects.filter(body__isnull=True).exclude(message_body='')
+            .only('id', 'message_body')[:1000]
+        )
+        if not logs:
+            break
+        bodies = {}
+        for log in logs:
+            log.body_id = hashlib.sha256(f"{log.message_body}\0".encode()).hexdigest()
+            bodies[log.body_id] = log.message_body
+            log.message_body = ''
+        NotificationBody.objects.bulk_create(
+            [NotificationBody(hash=digest, html_body=html) for digest, html in bodies.items()],
+            ignore_conflicts=True
+        )
+        NotificationLog.objects.bulk_update(logs, ['body', 'message_body'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notification_bodies'),
+    ]
+
+    operations = [
+        migrations.RunPython(share_existing_bodies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_processed_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendinglowstockalert',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:04
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created_at(apps, schema_editor):
+    # Start existing bodies from their creation time so old orphans stay prunable
+    NotificationBody = apps.get_model('notifications', 'NotificationBody')
+    NotificationBody.objects.update(last_used_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0008_pending_alert_claims'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationbody',
+            name='last_used_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
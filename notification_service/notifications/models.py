@@ -1,9 +1,12 @@
 from django.db import models
+from django.utils import timezone
+import hashlib
 import uuid
 
 class NotificationTemplate(models.Model):
     TYPE_CHOICES = [
         ('low_stock', 'Low Stock Alert'),
+        ('low_stock_digest', 'Low Stock Digest'),
         ('out_of_stock', 'Out of Stock Alert'),
     ]
     
@@ -23,6 +26,28 @@ class NotificationTemplate(models.Model):
     def __str__(self):
         return f"{self.name} ({self.type})"
 
+class NotificationBody(models.Model):
+    """
+    A rendered email body, stored once however many notifications share it.
+    Keyed by the SHA-256 of the HTML and text versions.
+    """
+    hash = models.CharField(max_length=64, primary_key=True)
+    html_body = models.TextField()
+    text_body = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped whenever a new log reuses the body, so pruning spares it
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'notification_bodies'
+
+    @staticmethod
+    def hash_for(html_body, text_body=''):
+        return hashlib.sha256(f"{html_body}\0{text_body}".encode()).hexdigest()
+
+    def __str__(self):
+        return self.hash
+
 class NotificationLog(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -33,16 +58,76 @@ class NotificationLog(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     recipient_email = models.EmailField()
     subject = models.CharField(max_length=200)
-    message_body = models.TextField()
+    # Rows written before bodies were shared keep their HTML inline
+    message_body = models.TextField(blank=True, default='')
+    body = models.ForeignKey(NotificationBody, on_delete=models.PROTECT, null=True, blank=True, related_name='logs')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     error_message = models.TextField(blank=True, null=True)
     metadata = models.JSONField(default=dict)
     sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=1)
+    # Set while a failed email is waiting to be re-sent
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'notification_logs'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='notification_logs_status_idx'),
+            models.Index(
+                fields=['next_attempt_at'],
+                name='notification_logs_retry_idx',
+                condition=models.Q(status='failed', next_attempt_at__isnull=False)
+            ),
+        ]
+
+    @property
+    def html_body(self):
+        return self.body.html_body if self.body_id else self.message_body
+
+    def __str__(self):
+        return f"{self.recipient_email} - {self.subject} ({self.status})"
+
+class PendingLowStockAlert(models.Model):
+    """
+    A low stock event waiting to go out in its store's next digest email.
+    Kept in the database so buffered events survive consumer restarts, and
+    only deleted once the digest listing it has been logged.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company_id = models.CharField(max_length=64)
+    store_id = models.CharField(max_length=64)
+    payload = models.JSONField()
+    # Set while a consumer is sending the digest listing this event
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'pending_low_stock_alerts'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['company_id', 'store_id', 'created_at'], name='pending_alerts_store_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.payload.get('product_name')} ({self.store_id})"
+
+
+class ProcessedEvent(models.Model):
+    """
+    The id of an event this service has already handled. Events are
+    delivered at least once, so a redelivered event is recognised here and
+    dropped instead of being buffered again.
+    """
+    event_id = models.CharField(max_length=64, primary_key=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'processed_events'
+        indexes = [
+            models.Index(fields=['created_at'], name='processed_events_created_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.recipient_email} - {self.subject} ({self.status})"
\ No newline at end of file
+        return self.event_id
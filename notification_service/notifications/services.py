@@ -5,124 +5,379 @@ import ssl
 import json
 import logging
 import requests
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
 from urllib.parse import urlparse
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Min, Q
 from django.template import Template, Context
 from django.conf import settings
 from django.utils import timezone
-from .models import NotificationTemplate, NotificationLog
+from .models import NotificationTemplate, NotificationBody, NotificationLog, PendingLowStockAlert, ProcessedEvent
+from .utils import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Low stock recipients per (company_id, store_id); user changes show up
+# once the entry expires
+recipient_cache = TTLCache(
+    ttl=settings.RECIPIENT_CACHE_TTL,
+    maxsize=settings.RECIPIENT_CACHE_SIZE
+)
+
+# Keep-alive connection to the user service
+user_service_session = requests.Session()
+
+LOW_STOCK_QUEUE = 'low_stock_notifications'
+RETRY_EXCHANGE = f'{LOW_STOCK_QUEUE}.retry'
+DEAD_LETTER_QUEUE = f'{LOW_STOCK_QUEUE}.dead'
+
+def retry_queue(delay):
+    return f'{LOW_STOCK_QUEUE}.retry.{delay}s'
+
+class RecipientsUnavailable(Exception):
+    """The user service could not be asked who receives a store's notifications."""
+
+class CompiledTemplate:
+    """Parsed subject, HTML and text bodies of a NotificationTemplate."""
+
+    def __init__(self, template):
+        self.id = template.id
+        self.updated_at = template.updated_at
+        self.subject = Template(template.subject)
+        self.html_body = Template(template.html_body)
+        self.text_body = Template(template.text_body)
+
+    def render(self, context):
+        context = Context(context)
+        return self.subject.render(context), self.html_body.render(context), self.text_body.render(context)
+
+# Compiled templates by template id; replaced when the template's updated_at changes
+compiled_templates = {}
+compiled_templates_lock = threading.Lock()
+
+def get_compiled_template(template):
+    """
+    Return the compiled form of `template`, parsing it only on first use
+    and after it is edited. `template` may be a deferred instance holding
+    just id and updated_at.
+    """
+    with compiled_templates_lock:
+        compiled = compiled_templates.get(template.id)
+    if compiled is not None and compiled.updated_at == template.updated_at:
+        return compiled
+
+    if template.get_deferred_fields():
+        template = NotificationTemplate.objects.get(pk=template.id)
+    compiled = CompiledTemplate(template)
+    with compiled_templates_lock:
+        compiled_templates[template.id] = compiled
+    return compiled
+
 class NotificationService:
     
     def __init__(self):
         self.user_service_url = os.getenv('USER_SERVICE_URL', 'http://localhost:8001')
+        self._local = threading.local()
+        self._lookup_locks = {}
+        self._lookup_locks_guard = threading.Lock()
+        self._email_connections = set()
+        self._connections_lock = threading.Lock()
     
     def get_users_for_notification(self, company_id, store_id):
-        """Get users who should receive low stock notifications"""
+        """
+        Get users who should receive low stock notifications, cached per
+        (company, store) so a burst of alerts for one store costs one lookup.
+        Returns None when the user service could not be reached, as opposed
+        to an empty list for a store nobody should be notified about.
+        """
+        key = (str(company_id), str(store_id))
+        users = recipient_cache.get(key)
+        if users is not None:
+            return users
+
+        # Concurrent workers missing on the same store wait for one lookup
+        with self._lookup_locks_guard:
+            lookup_lock = self._lookup_locks.setdefault(key, threading.Lock())
+        with lookup_lock:
+            users = recipient_cache.get(key)
+            if users is None:
+                users = self.fetch_recipients(company_id, store_id)
+                if users is not None:
+                    recipient_cache.set(key, users)
+        return users
+
+    def fetch_recipients(self, company_id, store_id):
+        """Ask the user service for a store's recipients; None if the lookup failed."""
         try:
-            # Call user management service to get ALL users
-            response = requests.get(
-                f"{self.user_service_url}/users/",
+            response = user_service_session.get(
+                f"{self.user_service_url}/users/recipients/",
+                params={'company_id': company_id, 'store_id': store_id},
                 timeout=10
             )
-            print(self.user_service_url, company_id, store_id)
-            
+            if response.status_code == 404:
+                # User service without the recipients endpoint
+                return self.fetch_recipients_from_user_list(company_id, store_id)
+
             if response.status_code == 200:
-                all_users = response.json()
-                # Filter users client-side based on company_id and role
-                relevant_users = []
-                for user in all_users:
-                    user_company_id = str(user.get('company_id', ''))
-                    user_role = user.get('role', '').lower()
-                    user_store = user.get('assigned_store')
-                    
-                    # Check if user belongs to the same company
-                    if user_company_id == str(company_id):
-                        # Include admins and super_admins from any store in the company
-                        if user_role in ['admin', 'super_admin']:
-                            relevant_users.append(user)
-                        # Include stock_manager only if assigned to this specific store
-                        elif user_role == 'stock_manager' and str(user_store) == str(store_id):
-                            relevant_users.append(user)
-                
-                logger.info(f"Found {len(relevant_users)} relevant users for company {company_id}, store {store_id}")
-                return relevant_users
+                users = response.json()
+                logger.info(f"Found {len(users)} relevant users for company {company_id}, store {store_id}")
+                return users
             else:
                 logger.error(f"Failed to fetch users: {response.status_code} - {response.text}")
-                return []
+                return None
                 
         except requests.exceptions.RequestException as e:
             logger.error(f"Network error fetching users: {e}")
-            return []
+            return None
         except Exception as e:
             logger.error(f"Error fetching users: {e}")
-            return []
-    
+            return None
+
+    def fetch_recipients_from_user_list(self, company_id, store_id):
+        # Call user management service to get ALL users
+        response = user_service_session.get(
+            f"{self.user_service_url}/users/",
+            timeout=10
+        )
+        if response.status_code != 200:
+            logger.error(f"Failed to fetch users: {response.status_code} - {response.text}")
+            return None
+
+        # Filter users client-side based on company_id and role
+        relevant_users = []
+        for user in response.json():
+            user_company_id = str(user.get('company_id', ''))
+            user_role = user.get('role', '').lower()
+            user_store = user.get('assigned_store')
+            
+            # Check if user belongs to the same company
+            if user_company_id == str(company_id):
+                # Include admins and super_admins from any store in the company
+                if user_role in ['admin', 'super_admin']:
+                    relevant_users.append(user)
+                # Include stock_manager only if assigned to this specific store
+                elif user_role == 'stock_manager' and str(user_store) == str(store_id):
+                    relevant_users.append(user)
+        
+        logger.info(f"Found {len(relevant_users)} relevant users for company {company_id}, store {store_id}")
+        return relevant_users
+
+    def get_email_connection(self):
+        """
+        SMTP connection of the calling thread, opened on first use and kept
+        open so each worker pays the handshake once rather than per email.
+        """
+        connection = getattr(self._local, 'email_connection', None)
+        if connection is None:
+            connection = get_connection(fail_silently=False)
+            self._local.email_connection = connection
+            with self._connections_lock:
+                self._email_connections.add(connection)
+        return connection
+
+    def reset_email_connection(self):
+        connection = getattr(self._local, 'email_connection', None)
+        if connection is not None:
+            self._local.email_connection = None
+            with self._connections_lock:
+                self._email_connections.discard(connection)
+            self.close_quietly(connection)
+
+    def close_email_connections(self):
+        with self._connections_lock:
+            connections, self._email_connections = self._email_connections, set()
+        for connection in connections:
+            self.close_quietly(connection)
+
+    @staticmethod
+    def close_quietly(connection):
+        try:
+            connection.close()
+        except Exception as e:
+            logger.warning(f"Error closing SMTP connection: {e}")
+
+    def deliver(self, email):
+        """Send over the thread's SMTP connection, reconnecting once if the server dropped it."""
+        try:
+            return self.get_email_connection().send_messages([email])
+        except smtplib.SMTPServerDisconnected:
+            self.reset_email_connection()
+            return self.get_email_connection().send_messages([email])
+
+    def get_active_template(self, template_type, create_default):
+        """
+        Compiled active template of a type, creating the default one if
+        there is none. Compiled templates are cached per template version, so
+        this costs one small query.
+        """
+        template = NotificationTemplate.objects.filter(
+            type=template_type, is_active=True
+        ).order_by('-updated_at').only('id', 'updated_at').first()
+        if template is None:
+            template = create_default()
+        return get_compiled_template(template)
+
+    def get_low_stock_template(self):
+        return self.get_active_template('low_stock', self.create_default_low_stock_template)
+
+    def get_low_stock_digest_template(self):
+        return self.get_active_template('low_stock_digest', self.create_default_low_stock_digest_template)
+
     def send_low_stock_email(self, recipient_email, product_name, store_name, 
-                           current_quantity, threshold, metadata=None):
+                           current_quantity, threshold, metadata=None, template=None, logs=None):
         """Send low stock email notification"""
         try:
             # Get or create email template
+            if template is None:
+                template = self.get_low_stock_template()
             
-            
-            template = self.create_default_low_stock_template()
-            
-            # Prepare template context
-            context = Context({
+            # Render templates
+            subject, html_body, text_body = template.render({
                 'product_name': product_name,
                 'store_name': store_name,
                 'current_quantity': current_quantity,
                 'threshold': threshold,
                 'recipient_email': recipient_email
             })
-            
-            # Render templates
-            subject_template = Template(template.subject)
-            html_template = Template(template.html_body)
-            text_template = Template(template.text_body)
-            
-            subject = subject_template.render(context)
-            html_body = html_template.render(context)
-            text_body = text_template.render(context)
-            
-            # Create notification log
-            notification_log = NotificationLog.objects.create(
-                recipient_email=recipient_email,
-                subject=subject,
-                message_body=html_body,
-                metadata=metadata or {}
-            )
-            
+        except Exception as e:
+            logger.error(f"Failed to render email to {recipient_email}: {e}")
+            return False
+
+        return self.send_rendered_email(recipient_email, subject, html_body, text_body, metadata, logs)
+
+    def send_low_stock_digest_email(self, recipient_email, store_name, items, metadata=None, template=None, logs=None):
+        """Send one email listing every low stock product of a store"""
+        try:
+            if template is None:
+                template = self.get_low_stock_digest_template()
+
+            subject, html_body, text_body = template.render({
+                'store_name': store_name,
+                'items': items,
+                'product_count': len(items),
+                'recipient_email': recipient_email
+            })
+        except Exception as e:
+            logger.error(f"Failed to render digest to {recipient_email}: {e}")
+            return False
+
+        return self.send_rendered_email(recipient_email, subject, html_body, text_body, metadata, logs)
+
+    def send_rendered_email(self, recipient_email, subject, html_body, text_body, metadata=None, logs=None):
+        """
+        Send a rendered email and log it with its final status. The log row
+        is appended to `logs` for the caller to write in bulk, or written
+        straight away when no list is given.
+        """
+        body = NotificationBody(
+            hash=NotificationBody.hash_for(html_body, text_body),
+            html_body=html_body,
+            text_body=text_body
+        )
+        notification_log = NotificationLog(
+            recipient_email=recipient_email,
+            subject=subject,
+            body=body,
+            metadata=metadata or {}
+        )
+
+        try:
             # Send email
-            send_mail(
+            email = EmailMultiAlternatives(
                 subject=subject,
-                message=text_body,
+                body=text_body,
                 from_email=settings.EMAIL_HOST_USER,
-                recipient_list=[recipient_email],
-                html_message=html_body,
-                fail_silently=False
+                to=[recipient_email]
             )
-            
-            # Update log as sent
+            email.attach_alternative(html_body, 'text/html')
+            self.deliver(email)
+
             notification_log.status = 'sent'
             notification_log.sent_at = timezone.now()
-            notification_log.save()
-            
             logger.info(f"Low stock email sent to {recipient_email}")
-            return True
-            
+            success = True
+
         except Exception as e:
             logger.error(f"Failed to send email to {recipient_email}: {e}")
-            
-            # Update log with error
-            if 'notification_log' in locals():
-                notification_log.status = 'failed'
-                notification_log.error_message = str(e)
-                notification_log.save()
-            
+            self.mark_failed(notification_log, e)
+            success = False
+
+        if logs is None:
+            self.record_notifications([notification_log])
+        else:
+            logs.append(notification_log)
+        return success
+
+    @staticmethod
+    def is_transient_error(error):
+        """Connection problems and 4xx SMTP replies are worth retrying; 5xx rejections are not."""
+        if isinstance(error, smtplib.SMTPResponseException):
+            return 400 <= error.smtp_code < 500
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return all(400 <= code < 500 for code, _ in error.recipients.values())
+        return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+    def mark_failed(self, notification_log, error):
+        """Fail a log and, for transient errors, schedule it for the re-send worker with exponential backoff."""
+        notification_log.status = 'failed'
+        notification_log.error_message = str(error)
+        if self.is_transient_error(error) and notification_log.attempts < settings.NOTIFICATION_MAX_SEND_ATTEMPTS:
+            delay = settings.NOTIFICATION_RESEND_BASE_DELAY * 2 ** (notification_log.attempts - 1)
+            notification_log.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        else:
+            notification_log.next_attempt_at = None
+
+    def resend_notification(self, notification_log):
+        """
+        Re-send a failed email from its logged subject and body. Updates the
+        log in memory; the caller saves it.
+        """
+        notification_log.attempts += 1
+        email = EmailMultiAlternatives(
+            subject=notification_log.subject,
+            body=notification_log.body.text_body if notification_log.body_id else '',
+            from_email=settings.EMAIL_HOST_USER,
+            to=[notification_log.recipient_email]
+        )
+        email.attach_alternative(notification_log.html_body, 'text/html')
+        try:
+            self.deliver(email)
+        except Exception as e:
+            logger.error(
+                f"Re-send {notification_log.attempts} to {notification_log.recipient_email} failed: {e}"
+            )
+            self.mark_failed(notification_log, e)
             return False
+
+        notification_log.status = 'sent'
+        notification_log.sent_at = timezone.now()
+        notification_log.error_message = None
+        notification_log.next_attempt_at = None
+        logger.info(f"Re-sent email to {notification_log.recipient_email} on attempt {notification_log.attempts}")
+        return True
+
+    def record_notifications(self, logs):
+        """
+        Write notification logs and their shared bodies with one insert each.
+        Bodies that already exist have their last_used_at bumped so that
+        prune_notification_logs does not delete one a new log is about to use.
+        """
+        if not logs:
+            return
+        bodies = {log.body.hash: log.body for log in logs}
+        now = timezone.now()
+        for body in bodies.values():
+            body.last_used_at = now
+        NotificationBody.objects.bulk_create(
+            bodies.values(), update_conflicts=True, unique_fields=['hash'], update_fields=['last_used_at']
+        )
+        NotificationLog.objects.bulk_create(logs)
     
     def create_default_low_stock_template(self):
         """Create default low stock email template"""
@@ -448,12 +703,353 @@ Please take immediate action to prevent stockouts.
         )
         return template
 
+    def create_default_low_stock_digest_template(self):
+        """Create default low stock digest email template"""
+        return NotificationTemplate.objects.create(
+            name="Default Low Stock Digest",
+            type="low_stock_digest",
+            subject="🚨 Low Stock Alert: {{ product_count }} products - {{ store_name }}",
+            html_body="""
+            <!DOCTYPE html>
+            <html lang="en">
+            <head>
+                <meta charset="UTF-8">
+                <meta name="viewport" content="width=device-width, initial-scale=1.0">
+                <title>Low Stock Alert</title>
+                <style>
+                    body {
+                        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+                        line-height: 1.6;
+                        color: #333;
+                        max-width: 600px;
+                        margin: 0 auto;
+                        padding: 20px;
+                        background-color: #f4f4f4;
+                    }
+                    .email-container {
+                        background-color: #ffffff;
+                        border-radius: 10px;
+                        padding: 40px;
+                        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+                        border-top: 4px solid #f44336;
+                    }
+                    .header {
+                        text-align: center;
+                        margin-bottom: 30px;
+                    }
+                    .logo {
+                        font-size: 28px;
+                        font-weight: bold;
+                        color: #f44336;
+                        margin-bottom: 10px;
+                    }
+                    .title {
+                        font-size: 24px;
+                        color: #2c3e50;
+                        margin-bottom: 20px;
+                    }
+                    table {
+                        width: 100%;
+                        border-collapse: collapse;
+                        margin: 25px 0;
+                    }
+                    th {
+                        background-color: #f44336;
+                        color: white;
+                        text-align: left;
+                        padding: 10px;
+                    }
+                    td {
+                        padding: 10px;
+                        border-bottom: 1px solid #eee;
+                    }
+                    .quantity-critical {
+                        color: #c62828;
+                        font-weight: bold;
+                    }
+                    .footer {
+                        text-align: center;
+                        margin-top: 40px;
+                        padding-top: 20px;
+                        border-top: 1px solid #eee;
+                        color: #777;
+                        font-size: 14px;
+                    }
+                </style>
+            </head>
+            <body>
+                <div class="email-container">
+                    <div class="header">
+                        <div class="logo">📦 NgedEase</div>
+                        <h1 class="title">Low Inventory Warning</h1>
+                    </div>
+
+                    <p>Dear Inventory Team,</p>
+
+                    <p>{{ product_count }} products at <strong>{{ store_name }}</strong> have reached a critically low stock level and require immediate attention to prevent stockouts.</p>
+
+                    <table>
+                        <tr>
+                            <th>Product</th>
+                            <th>Current Stock</th>
+                            <th>Alert Threshold</th>
+                        </tr>
+                        {% for item in items %}
+                        <tr>
+                            <td>{{ item.product_name }}</td>
+                            <td class="quantity-critical">{{ item.current_quantity }}</td>
+                            <td>{{ item.threshold }}</td>
+                        </tr>
+                        {% endfor %}
+                    </table>
+
+                    <div class="footer">
+                        <p><strong>NgedEase Inventory Management System</strong></p>
+                        <p>This is an automated alert. Please take immediate action to prevent stockouts.</p>
+                    </div>
+                </div>
+            </body>
+            </html>
+            """,
+            text_body="""
+🚨 LOW STOCK ALERT - URGENT ACTION REQUIRED
+
+Dear Inventory Team,
+
+{{ product_count }} products at {{ store_name }} are critically low:
+{% for item in items %}
+• {{ item.product_name }}: {{ item.current_quantity }} left (threshold {{ item.threshold }}){% endfor %}
+
+This is an automated alert from NgedEase Inventory Management System.
+Please take immediate action to prevent stockouts.
+            """
+        )
+
+    def buffer_low_stock_alert(self, message):
+        """
+        Hold a low stock event until its store's digest is sent. Returns None
+        for an event whose `event_id` was already buffered once.
+        """
+        event_id = message.get('event_id')
+        with transaction.atomic():
+            if event_id:
+                _, created = ProcessedEvent.objects.get_or_create(event_id=str(event_id))
+                if not created:
+                    logger.info(f"Dropping redelivered event {event_id}")
+                    return None
+            return PendingLowStockAlert.objects.create(
+                company_id=str(message['company_id']),
+                store_id=str(message['store_id']),
+                payload=message
+            )
+
+    @staticmethod
+    def unclaimed_low_stock_alerts():
+        """Buffered events no consumer holds a live claim on"""
+        return PendingLowStockAlert.objects.filter(
+            Q(claimed_until__isnull=True) | Q(claimed_until__lt=timezone.now())
+        )
+
+    def due_low_stock_digests(self, window):
+        """(company_id, store_id) pairs whose oldest unclaimed event is at least `window` seconds old"""
+        cutoff = timezone.now() - timedelta(seconds=window)
+        return list(
+            self.unclaimed_low_stock_alerts().values('company_id', 'store_id')
+            .annotate(oldest=Min('created_at'))
+            .filter(oldest__lte=cutoff)
+            .values_list('company_id', 'store_id')
+        )
+
+    def claim_low_stock_alerts(self, company_id, store_id):
+        """
+        Lease every unclaimed buffered event of a store in one short
+        transaction. Rows another consumer is locking or holds a lease on
+        are skipped, so each event is claimed once; the events stay in the
+        buffer until release_low_stock_alerts.
+        """
+        with transaction.atomic():
+            alerts = list(
+                self.unclaimed_low_stock_alerts().select_for_update(skip_locked=True)
+                .filter(company_id=company_id, store_id=store_id)
+                .order_by('created_at')
+            )
+            if alerts:
+                PendingLowStockAlert.objects.filter(pk__in=[alert.pk for alert in alerts]).update(
+                    claimed_until=timezone.now() + timedelta(seconds=settings.LOW_STOCK_DIGEST_LEASE)
+                )
+        return alerts
+
+    @staticmethod
+    def release_low_stock_alerts(alerts, **changes):
+        """Drop the claim on `alerts` so a later digest picks them up again"""
+        PendingLowStockAlert.objects.filter(pk__in=[alert.pk for alert in alerts]).update(
+            claimed_until=None, **changes
+        )
+
+    def send_low_stock_digest(self, company_id, store_id):
+        """
+        Send every buffered low stock event of a store to its recipients in
+        one email. The events are leased first, so no rows stay locked while
+        talking to SMTP, and deleted in the transaction that logs the emails;
+        emails that fail are logged for the re-send worker. If the recipients
+        cannot be looked up, RecipientsUnavailable is raised and, like on any
+        other error, the events are released for the next digest.
+        Returns (sent, failed).
+        """
+        alerts = self.claim_low_stock_alerts(company_id, store_id)
+        if not alerts:
+            return 0, 0
+
+        try:
+            return self.send_claimed_low_stock_alerts(company_id, store_id, alerts)
+        except RecipientsUnavailable:
+            # Fresh created_at, so the retry waits a full window
+            self.release_low_stock_alerts(alerts, created_at=timezone.now())
+            raise
+        except Exception:
+            self.release_low_stock_alerts(alerts)
+            raise
+
+    def send_claimed_low_stock_alerts(self, company_id, store_id, alerts):
+        """Send the digest of claimed `alerts`, then log it and drop them from the buffer"""
+        # An inventory row alerting twice in one window is listed once, as last reported
+        latest = {}
+        for alert in alerts:
+            latest[alert.payload.get('inventory_id') or alert.id] = alert.payload
+        items = list(latest.values())
+
+        users = self.get_users_for_notification(company_id, store_id)
+        if users is None:
+            raise RecipientsUnavailable(
+                f"Could not look up recipients for company {company_id}, store {store_id}; "
+                f"{len(alerts)} low stock events kept for the next digest"
+            )
+        if not users:
+            logger.warning(f"No users found for company {company_id}, store {store_id}")
+
+        template = self.get_low_stock_template() if len(items) == 1 else self.get_low_stock_digest_template()
+        store_name = items[-1]['store_name']
+        sent = failed = 0
+        logs = []
+        for user in users:
+            user_email = user.get('email')
+            if not user_email:
+                logger.warning(f"User {user.get('id')} has no email address")
+                continue
+
+            metadata = {
+                'inventory_ids': [item.get('inventory_id') for item in items],
+                'store_id': store_id,
+                'company_id': company_id,
+                'user_id': user.get('id'),
+                'user_role': user.get('role'),
+                'timestamp': items[-1].get('timestamp')
+            }
+            if len(items) == 1:
+                item = items[0]
+                success = self.send_low_stock_email(
+                    recipient_email=user_email,
+                    product_name=item['product_name'],
+                    store_name=store_name,
+                    current_quantity=item['current_quantity'],
+                    threshold=item['threshold'],
+                    metadata={**metadata, 'inventory_id': item.get('inventory_id')},
+                    template=template,
+                    logs=logs
+                )
+            else:
+                success = self.send_low_stock_digest_email(
+                    recipient_email=user_email,
+                    store_name=store_name,
+                    items=items,
+                    metadata=metadata,
+                    template=template,
+                    logs=logs
+                )
+
+            if success:
+                sent += 1
+                logger.info(f"Notification sent to {user_email} ({user.get('role')})")
+            else:
+                failed += 1
+                logger.error(f"Failed to send notification to {user_email}")
+
+        with transaction.atomic():
+            self.record_notifications(logs)
+            PendingLowStockAlert.objects.filter(pk__in=[alert.pk for alert in alerts]).delete()
+
+        logger.info(
+            f"Low stock digest for store {store_id}: {len(items)} products, "
+            f"{sent}/{len(users)} emails sent successfully"
+        )
+        return sent, failed
+
+class ConsumerMetrics:
+    """Thread-safe throughput counters for the notification consumer."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.messages_processed = 0
+        self.messages_failed = 0
+        self.emails_sent = 0
+        self.emails_failed = 0
+        self.digests_sent = 0
+        self.in_flight = 0
+
+    def message_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def message_finished(self, sent, failed, ok=True):
+        with self._lock:
+            self.in_flight -= 1
+            self.emails_sent += sent
+            self.emails_failed += failed
+            if ok:
+                self.messages_processed += 1
+            else:
+                self.messages_failed += 1
+
+    def digest_sent(self, sent, failed):
+        with self._lock:
+            self.digests_sent += 1
+            self.emails_sent += sent
+            self.emails_failed += failed
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started_at, 1e-9)
+            return {
+                'uptime_seconds': round(elapsed, 1),
+                'messages_processed': self.messages_processed,
+                'messages_failed': self.messages_failed,
+                'emails_sent': self.emails_sent,
+                'emails_failed': self.emails_failed,
+                'digests_sent': self.digests_sent,
+                'in_flight': self.in_flight,
+                'messages_per_second': round(self.messages_processed / elapsed, 3),
+                'emails_per_second': round(self.emails_sent / elapsed, 3),
+            }
+
 class RabbitMQConsumer:
     
-    def __init__(self):
+    def __init__(self, prefetch_count=None, max_workers=None):
         self.connection = None
         self.channel = None
         self.notification_service = NotificationService()
+        self.prefetch_count = prefetch_count or settings.NOTIFICATION_PREFETCH_COUNT
+        self.max_workers = max_workers or settings.NOTIFICATION_EMAIL_WORKERS
+        self.executor = None
+        self.metrics = ConsumerMetrics()
+        # Low stock events of a store are coalesced into one digest per window
+        self.digest_window = settings.LOW_STOCK_DIGEST_WINDOW
+        self.retry_delays = settings.NOTIFICATION_RETRY_DELAYS
+        self.digest_check_interval = max(1, min(self.digest_window, 30))
+        self.flush_future = None
+        # Stores whose digest is queued or being sent, so a flush does not queue it twice
+        self.digests_in_flight = set()
+        self.digests_lock = threading.Lock()
     
     def connect(self):
         """Connect to CloudAMQP"""
@@ -485,7 +1081,10 @@ class RabbitMQConsumer:
             
             self.connection = pika.BlockingConnection(connection_params)
             self.channel = self.connection.channel()
-            self.channel.queue_declare(queue='low_stock_notifications', durable=True)
+            self.channel.queue_declare(queue=LOW_STOCK_QUEUE, durable=True)
+            self.declare_retry_queues()
+            # Retries and parked messages are only acked once the broker has them
+            self.channel.confirm_delivery()
             
             logger.info("Connected to CloudAMQP successfully")
             return True
@@ -494,88 +1093,195 @@ class RabbitMQConsumer:
             logger.error(f"Failed to connect to CloudAMQP: {e}")
             return False
     
+    def declare_retry_queues(self):
+        """
+        Messages that fail are published to a retry queue whose TTL matches
+        the next backoff delay. When it expires the broker dead-letters the
+        message back onto the main queue. Once the delays are exhausted, or
+        for malformed messages, they are parked on the dead letter queue.
+        """
+        self.channel.exchange_declare(exchange=RETRY_EXCHANGE, exchange_type='direct', durable=True)
+        for delay in self.retry_delays:
+            queue = retry_queue(delay)
+            self.channel.queue_declare(queue=queue, durable=True, arguments={
+                'x-message-ttl': delay * 1000,
+                'x-dead-letter-exchange': '',
+                'x-dead-letter-routing-key': LOW_STOCK_QUEUE,
+            })
+            self.channel.queue_bind(queue=queue, exchange=RETRY_EXCHANGE, routing_key=queue)
+        self.channel.queue_declare(queue=DEAD_LETTER_QUEUE, durable=True)
+        self.channel.queue_bind(queue=DEAD_LETTER_QUEUE, exchange=RETRY_EXCHANGE, routing_key=DEAD_LETTER_QUEUE)
+
     def process_low_stock_message(self, ch, method, properties, body):
-        """Process incoming low stock notification"""
+        """
+        Validate an incoming low stock notification and hand it to the worker
+        pool. The message is acked from the connection thread once every
+        delivery for it has resolved.
+        """
         try:
-            print('processing message')
             message = json.loads(body)
-            logger.info(f"Processing message: {message}")
-            
-            # Validate message
-            required_fields = ['product_name', 'store_name', 'current_quantity', 'threshold', 'company_id', 'store_id']
-            if not all(field in message for field in required_fields):
-                logger.error(f"Invalid message format: {message}")
-                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-                return
-            
-            # Get users to notify
-            users = self.notification_service.get_users_for_notification(
-                message['company_id'],
-                message['store_id']
-            )
-            
-            if not users:
-                logger.warning(f"No users found for company {message['company_id']}, store {message['store_id']}")
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-                return
-            
-            # Send email to each user
-            success_count = 0
-            for user in users:
-                user_email = user.get('email')
-                if not user_email:
-                    logger.warning(f"User {user.get('id')} has no email address")
-                    continue
-                    
-                success = self.notification_service.send_low_stock_email(
-                    recipient_email=user_email,
-                    product_name=message['product_name'],
-                    store_name=message['store_name'],
-                    current_quantity=message['current_quantity'],
-                    threshold=message['threshold'],
-                    metadata={
-                        'inventory_id': message.get('inventory_id'),
-                        'store_id': message['store_id'],
-                        'company_id': message['company_id'],
-                        'user_id': user.get('id'),
-                        'user_role': user.get('role'),
-                        'timestamp': message.get('timestamp')
-                    }
-                )
-                
-                if success:
-                    success_count += 1
-                    logger.info(f"Notification sent to {user_email} ({user.get('role')})")
-                else:
-                    logger.error(f"Failed to send notification to {user_email}")
-            
-            logger.info(f"Processed notification: {success_count}/{len(users)} emails sent successfully")
-            
-            # Acknowledge message
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            
         except json.JSONDecodeError as e:
             logger.error(f"Invalid JSON in message: {e}")
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            self.reject(ch, method.delivery_tag, properties, body, e, retry=False)
+            return
+
+        # Validate message
+        required_fields = ['product_name', 'store_name', 'current_quantity', 'threshold', 'company_id', 'store_id']
+        if not isinstance(message, dict) or not all(field in message for field in required_fields):
+            logger.error(f"Invalid message format: {message}")
+            self.reject(ch, method.delivery_tag, properties, body, 'Invalid message format', retry=False)
+            return
+
+        self.metrics.message_started()
+        future = self.executor.submit(self.handle_low_stock_message, message)
+        future.add_done_callback(partial(self.message_done, ch, method.delivery_tag, properties, body))
+
+    def reject(self, ch, delivery_tag, properties, body, error, retry=True):
+        """
+        Move a failed message to its next retry queue (or park it on the dead
+        letter queue), then ack the original so the rest of the queue keeps
+        flowing. Runs on the connection thread.
+        """
+        headers = dict((properties.headers if properties else None) or {})
+        attempt = int(headers.get('x-retry-count', 0))
+        if retry and attempt < len(self.retry_delays):
+            routing_key = retry_queue(self.retry_delays[attempt])
+            headers['x-retry-count'] = attempt + 1
+        else:
+            routing_key = DEAD_LETTER_QUEUE
+        headers['x-last-error'] = str(error)[:500]
+
+        try:
+            ch.basic_publish(
+                exchange=RETRY_EXCHANGE,
+                routing_key=routing_key,
+                body=body,
+                properties=pika.BasicProperties(
+                    delivery_mode=2,
+                    content_type=properties.content_type if properties else None,
+                    headers=headers
+                ),
+                mandatory=True
+            )
         except Exception as e:
-            logger.error(f"Error processing message: {e}")
-            # Requeue for retry
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
-    
+            logger.error(f"Could not move message to {routing_key}, requeueing it: {e}")
+            ch.basic_nack(delivery_tag=delivery_tag, requeue=True)
+            return
+
+        logger.warning(f"Message moved to {routing_key}: {error}")
+        ch.basic_ack(delivery_tag=delivery_tag)
+
+    def handle_low_stock_message(self, message):
+        """
+        Buffer one low stock event for its store's digest. Without a digest
+        window the store's digest is sent right away. Runs on a pool thread.
+        """
+        close_old_connections()
+        try:
+            logger.info(f"Processing message: {message}")
+            self.notification_service.buffer_low_stock_alert(message)
+
+            if self.digest_window > 0:
+                return 0, 0
+            return self.notification_service.send_low_stock_digest(
+                str(message['company_id']),
+                str(message['store_id'])
+            )
+        finally:
+            close_old_connections()
+
+    def flush_digests(self):
+        """
+        Hand every store digest whose window has passed to the worker pool,
+        so the stores' digests are sent side by side. Runs on a pool thread.
+        """
+        close_old_connections()
+        try:
+            due = self.notification_service.due_low_stock_digests(self.digest_window)
+        finally:
+            close_old_connections()
+
+        with self.digests_lock:
+            due = [store for store in due if store not in self.digests_in_flight]
+            self.digests_in_flight.update(due)
+
+        for index, (company_id, store_id) in enumerate(due):
+            try:
+                future = self.executor.submit(self.send_digest, company_id, store_id)
+            except RuntimeError:
+                # Shutting down; the rest stay buffered for the next start
+                with self.digests_lock:
+                    self.digests_in_flight.difference_update(due[index:])
+                break
+            future.add_done_callback(self.flush_done)
+
+    def send_digest(self, company_id, store_id):
+        """Send one store's digest. Runs on a pool thread."""
+        close_old_connections()
+        try:
+            sent, failed = self.notification_service.send_low_stock_digest(company_id, store_id)
+            self.metrics.digest_sent(sent, failed)
+        finally:
+            with self.digests_lock:
+                self.digests_in_flight.discard((company_id, store_id))
+            close_old_connections()
+
+    def schedule_digest_flush(self):
+        """Timer callback on the connection thread; at most one flush runs at a time."""
+        if self.flush_future is None or self.flush_future.done():
+            self.flush_future = self.executor.submit(self.flush_digests)
+            self.flush_future.add_done_callback(self.flush_done)
+        self.connection.call_later(self.digest_check_interval, self.schedule_digest_flush)
+
+    def flush_done(self, future):
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Error sending low stock digests: {error}")
+
+    def message_done(self, ch, delivery_tag, properties, body, future):
+        """Record the outcome of a message and settle it on the connection thread."""
+        error = future.exception()
+        if error is None:
+            sent, failed = future.result()
+            self.metrics.message_finished(sent, failed)
+            settle = partial(ch.basic_ack, delivery_tag=delivery_tag)
+        else:
+            logger.error(f"Error processing message: {error}")
+            self.metrics.message_finished(0, 0, ok=False)
+            # Retry after a delay instead of redelivering straight away
+            settle = partial(self.reject, ch, delivery_tag, properties, body, error)
+        self.connection.add_callback_threadsafe(settle)
+
+    def log_metrics(self):
+        logger.info(f"Consumer throughput: {self.metrics.snapshot()}")
+        self.connection.call_later(settings.NOTIFICATION_METRICS_INTERVAL, self.log_metrics)
+
     def start_consuming(self):
         """Start consuming messages"""
         if not self.connect():
             logger.error("Failed to connect to RabbitMQ")
             return
             
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='notification-sender'
+        )
         try:
-            self.channel.basic_qos(prefetch_count=1)
+            # Up to prefetch_count unacked messages are worked on at once
+            self.channel.basic_qos(prefetch_count=self.prefetch_count)
             self.channel.basic_consume(
-                queue='low_stock_notifications',
+                queue=LOW_STOCK_QUEUE,
                 on_message_callback=self.process_low_stock_message
             )
+            self.connection.call_later(settings.NOTIFICATION_METRICS_INTERVAL, self.log_metrics)
+            if self.digest_window > 0:
+                # Also picks up events buffered before a restart
+                self.connection.call_later(self.digest_check_interval, self.schedule_digest_flush)
             
-            logger.info("Starting to consume messages from CloudAMQP...")
+            logger.info(
+                f"Starting to consume messages from CloudAMQP "
+                f"(prefetch {self.prefetch_count}, {self.max_workers} workers)..."
+            )
             self.channel.start_consuming()
             
         except KeyboardInterrupt:
@@ -587,10 +1293,22 @@ class RabbitMQConsumer:
             self.close()
     
     def close(self):
-        """Close connection"""
+        """Finish in-flight messages, then close the SMTP and broker connections"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            try:
+                # Deliver the acks queued by the last workers
+                if self.connection and not self.connection.is_closed:
+                    self.connection.process_data_events(time_limit=0)
+            except Exception as e:
+                logger.error(f"Error flushing acknowledgements: {e}")
+            logger.info(f"Consumer throughput: {self.metrics.snapshot()}")
+        self.notification_service.close_email_connections()
+
         try:
             if self.connection and not self.connection.is_closed:
                 self.connection.close()
                 logger.info("RabbitMQ connection closed")
         except Exception as e:
-            logger.error(f"Error closing connection: {e}")
\ No newline at end of file
+            logger.error(f"Error closing connection: {e}")
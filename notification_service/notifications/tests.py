@@ -1,3 +1,559 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import smtplib
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from notifications import services
+from notifications.models import (
+    NotificationBody, NotificationLog, NotificationTemplate, PendingLowStockAlert, ProcessedEvent
+)
+from notifications.services import NotificationService, RabbitMQConsumer, RecipientsUnavailable
+from notifications.utils import TTLCache
 
-# Create your tests here.
+
+def low_stock_message(**extra):
+    return {
+        'type': 'low_stock_alert',
+        'inventory_id': str(uuid.uuid4()),
+        'product_name': 'Black Shirt',
+        'store_name': 'Main Store',
+        'current_quantity': 3.0,
+        'threshold': 10.0,
+        'store_id': 'store-1',
+        'company_id': 'company-1',
+        **extra
+    }
+
+
+class BufferLowStockAlertTests(TestCase):
+    def setUp(self):
+        self.service = NotificationService()
+
+    def test_redelivered_event_is_dropped(self):
+        message = low_stock_message(event_id=str(uuid.uuid4()))
+
+        self.assertIsNotNone(self.service.buffer_low_stock_alert(message))
+        self.assertIsNone(self.service.buffer_low_stock_alert(dict(message)))
+
+        self.assertEqual(PendingLowStockAlert.objects.count(), 1)
+        self.assertEqual(ProcessedEvent.objects.count(), 1)
+
+    def test_events_without_id_are_always_buffered(self):
+        message = low_stock_message()
+        self.service.buffer_low_stock_alert(message)
+        self.service.buffer_low_stock_alert(message)
+
+        self.assertEqual(PendingLowStockAlert.objects.count(), 2)
+
+
+class NotificationTestCase(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(services, 'recipient_cache', TTLCache(ttl=60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = NotificationService()
+        self.addCleanup(self.service.close_email_connections)
+
+    def recipients(self, users):
+        return mock.patch.object(self.service, 'fetch_recipients', return_value=users)
+
+
+class RecipientLookupTests(NotificationTestCase):
+    users = [{'id': 'u1', 'email': 'admin@example.com', 'role': 'admin'}]
+
+    def response(self, status_code, data=None):
+        return mock.Mock(status_code=status_code, text='', json=mock.Mock(return_value=data))
+
+    def test_repeated_lookups_fetch_once(self):
+        with self.recipients(self.users) as fetch:
+            self.assertEqual(self.service.get_users_for_notification('company-1', 'store-1'), self.users)
+            self.assertEqual(self.service.get_users_for_notification('company-1', 'store-1'), self.users)
+            self.service.get_users_for_notification('company-1', 'store-2')
+
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_failed_lookup_is_not_cached(self):
+        with self.recipients(None) as fetch:
+            self.assertIsNone(self.service.get_users_for_notification('company-1', 'store-1'))
+            self.assertIsNone(self.service.get_users_for_notification('company-1', 'store-1'))
+
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_asks_the_recipients_endpoint(self):
+        with mock.patch.object(services.user_service_session, 'get', return_value=self.response(200, self.users)) as get:
+            self.assertEqual(self.service.fetch_recipients('company-1', 'store-1'), self.users)
+
+        self.assertTrue(get.call_args.args[0].endswith('/users/recipients/'))
+        self.assertEqual(get.call_args.kwargs['params'], {'company_id': 'company-1', 'store_id': 'store-1'})
+
+    def test_falls_back_to_filtering_every_user(self):
+        everyone = [
+            {'email': 'admin@example.com', 'role': 'admin', 'company_id': 'company-1'},
+            {'email': 'stock@example.com', 'role': 'stock_manager', 'company_id': 'company-1', 'assigned_store': 'store-1'},
+            {'email': 'other-store@example.com', 'role': 'stock_manager', 'company_id': 'company-1', 'assigned_store': 'store-2'},
+            {'email': 'sales@example.com', 'role': 'sales', 'company_id': 'company-1', 'assigned_store': 'store-1'},
+            {'email': 'other@example.com', 'role': 'admin', 'company_id': 'company-2'},
+        ]
+        responses = [self.response(404), self.response(200, everyone)]
+        with mock.patch.object(services.user_service_session, 'get', side_effect=responses):
+            users = self.service.fetch_recipients('company-1', 'store-1')
+
+        self.assertEqual([user['email'] for user in users], ['admin@example.com', 'stock@example.com'])
+
+    def test_user_service_error_returns_none(self):
+        with mock.patch.object(services.user_service_session, 'get', return_value=self.response(500)):
+            self.assertIsNone(self.service.fetch_recipients('company-1', 'store-1'))
+
+
+class TemplateCacheTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(services, 'compiled_templates', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.template = NotificationTemplate.objects.create(
+            name='Low Stock', type='low_stock',
+            subject='Low: {{ product_name }}', html_body='<p>{{ product_name }}</p>', text_body='{{ product_name }}'
+        )
+
+    def render(self):
+        return self.service.get_low_stock_template().render({'product_name': 'Shirt'})
+
+    def test_template_is_compiled_once(self):
+        with mock.patch.object(services, 'CompiledTemplate', wraps=services.CompiledTemplate) as compile_template:
+            self.assertEqual(self.render(), ('Low: Shirt', '<p>Shirt</p>', 'Shirt'))
+            with self.assertNumQueries(1):
+                self.render()
+
+        self.assertEqual(compile_template.call_count, 1)
+
+    def test_edited_template_is_recompiled(self):
+        self.render()
+        self.template.subject = 'Reorder {{ product_name }}'
+        self.template.save()
+
+        self.assertEqual(self.render()[0], 'Reorder Shirt')
+
+    def test_default_template_is_created_when_none_is_active(self):
+        NotificationTemplate.objects.all().delete()
+
+        self.assertIn('Shirt', self.render()[0])
+        self.assertEqual(NotificationTemplate.objects.filter(type='low_stock').count(), 1)
+
+
+class EmailConnectionTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(services, 'get_connection', side_effect=lambda **kwargs: mock.Mock())
+        self.get_connection = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_thread_reuses_its_connection(self):
+        self.service.deliver('first')
+        self.service.deliver('second')
+
+        connection = self.service.get_email_connection()
+        self.assertEqual(self.get_connection.call_count, 1)
+        self.assertEqual(connection.send_messages.call_args_list, [mock.call(['first']), mock.call(['second'])])
+
+    def test_each_thread_has_its_own_connection(self):
+        connection = self.service.get_email_connection()
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.service.get_email_connection()))
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(other[0], connection)
+        self.service.close_email_connections()
+        connection.close.assert_called_once_with()
+        other[0].close.assert_called_once_with()
+
+    def test_dropped_connection_is_reopened_once(self):
+        dropped = self.service.get_email_connection()
+        dropped.send_messages.side_effect = smtplib.SMTPServerDisconnected('gone')
+
+        self.assertEqual(self.service.deliver('email'), self.service.get_email_connection().send_messages.return_value)
+
+        dropped.close.assert_called_once_with()
+        fresh = self.service.get_email_connection()
+        self.assertIsNot(fresh, dropped)
+        fresh.send_messages.assert_called_once_with(['email'])
+
+
+class LowStockDigestTests(NotificationTestCase):
+    users = [
+        {'id': 'u1', 'email': 'admin@example.com', 'role': 'admin'},
+        {'id': 'u2', 'email': 'stock@example.com', 'role': 'stock_manager'},
+    ]
+
+    def buffer(self, count):
+        for n in range(count):
+            self.service.buffer_low_stock_alert(low_stock_message(product_name=f'Product {n}'))
+
+    def test_sends_one_digest_per_recipient_and_clears_the_buffer(self):
+        self.buffer(3)
+        with self.recipients(self.users):
+            self.assertEqual(self.service.send_low_stock_digest('company-1', 'store-1'), (2, 0))
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['admin@example.com', 'stock@example.com'])
+        self.assertIn('Product 2', mail.outbox[0].body)
+        self.assertFalse(PendingLowStockAlert.objects.exists())
+        self.assertEqual(NotificationLog.objects.filter(status='sent').count(), 2)
+
+    def test_failed_recipient_lookup_keeps_the_alerts(self):
+        self.buffer(2)
+        with self.recipients(None):
+            with self.assertRaises(RecipientsUnavailable):
+                self.service.send_low_stock_digest('company-1', 'store-1')
+
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(PendingLowStockAlert.objects.count(), 2)
+
+        with self.recipients(self.users):
+            self.assertEqual(self.service.send_low_stock_digest('company-1', 'store-1'), (2, 0))
+        self.assertFalse(PendingLowStockAlert.objects.exists())
+
+    def test_store_without_recipients_clears_the_alerts(self):
+        self.buffer(1)
+        with self.recipients([]):
+            self.assertEqual(self.service.send_low_stock_digest('company-1', 'store-1'), (0, 0))
+
+        self.assertFalse(PendingLowStockAlert.objects.exists())
+
+    def test_any_failure_after_the_claim_keeps_the_alerts(self):
+        self.buffer(2)
+        failures = [
+            mock.patch.object(self.service, 'get_low_stock_digest_template', side_effect=RuntimeError('db down')),
+            mock.patch.object(self.service, 'record_notifications', side_effect=RuntimeError('db down')),
+        ]
+        for failure in failures:
+            with self.recipients(self.users), failure:
+                with self.assertRaises(RuntimeError):
+                    self.service.send_low_stock_digest('company-1', 'store-1')
+
+            self.assertEqual(PendingLowStockAlert.objects.filter(claimed_until__isnull=True).count(), 2)
+
+        with self.recipients(self.users):
+            self.assertEqual(self.service.send_low_stock_digest('company-1', 'store-1'), (2, 0))
+        self.assertFalse(PendingLowStockAlert.objects.exists())
+
+    def test_alerts_of_a_dead_consumer_are_sent_once_the_lease_expires(self):
+        self.buffer(1)
+        # A consumer claimed the alerts and died before recording the digest
+        self.assertEqual(len(self.service.claim_low_stock_alerts('company-1', 'store-1')), 1)
+        self.assertEqual(self.service.due_low_stock_digests(0), [])
+        with self.recipients(self.users):
+            self.assertEqual(self.service.send_low_stock_digest('company-1', 'store-1'), (0, 0))
+
+        PendingLowStockAlert.objects.update(claimed_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.service.due_low_stock_digests(0), [('company-1', 'store-1')])
+        with self.recipients(self.users):
+            self.assertEqual(self.service.send_low_stock_digest('company-1', 'store-1'), (2, 0))
+        self.assertFalse(PendingLowStockAlert.objects.exists())
+
+    def test_alerts_are_claimed_before_sending(self):
+        self.buffer(1)
+
+        def deliver(email):
+            # Nothing is left to claim, or locked, while the email is out
+            self.assertEqual(self.service.claim_low_stock_alerts('company-1', 'store-1'), [])
+            return 1
+
+        with self.recipients(self.users[:1]), mock.patch.object(self.service, 'deliver', side_effect=deliver):
+            self.assertEqual(self.service.send_low_stock_digest('company-1', 'store-1'), (1, 0))
+
+
+class FlushDigestsTests(TestCase):
+    def setUp(self):
+        self.consumer = RabbitMQConsumer(max_workers=4)
+        self.consumer.executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.consumer.executor.shutdown)
+
+    def test_due_store_digests_are_sent_side_by_side(self):
+        stores = [('company-1', 'store-1'), ('company-1', 'store-2'), ('company-2', 'store-3')]
+        # Each send waits until all three are running, so they must run at once
+        barrier = threading.Barrier(len(stores), timeout=5)
+
+        def send(company_id, store_id):
+            barrier.wait()
+            return 1, 0
+
+        service = self.consumer.notification_service
+        with mock.patch.object(service, 'due_low_stock_digests', return_value=stores), \
+                mock.patch.object(service, 'send_low_stock_digest', side_effect=send) as send_digest:
+            self.consumer.flush_digests()
+            self.consumer.executor.shutdown(wait=True)
+
+        self.assertEqual(sorted(call.args for call in send_digest.call_args_list), stores)
+        self.assertEqual(self.consumer.metrics.snapshot()['digests_sent'], 3)
+        self.assertEqual(self.consumer.digests_in_flight, set())
+
+    def test_store_already_in_flight_is_not_queued_again(self):
+        self.consumer.digests_in_flight.add(('company-1', 'store-1'))
+
+        service = self.consumer.notification_service
+        with mock.patch.object(service, 'due_low_stock_digests', return_value=[('company-1', 'store-1')]), \
+                mock.patch.object(service, 'send_low_stock_digest') as send_digest:
+            self.consumer.flush_digests()
+            self.consumer.executor.shutdown(wait=True)
+
+        send_digest.assert_not_called()
+
+
+class PruneNotificationLogsTests(TestCase):
+    def create_log(self, html_body, age_days, status='sent'):
+        body, _ = NotificationBody.objects.get_or_create(
+            hash=NotificationBody.hash_for(html_body, 'text'), defaults={'html_body': html_body, 'text_body': 'text'}
+        )
+        log = NotificationLog.objects.create(
+            recipient_email='admin@example.com', subject=html_body, body=body, status=status
+        )
+        created_at = timezone.now() - timedelta(days=age_days)
+        NotificationLog.objects.filter(id=log.id).update(created_at=created_at)
+        NotificationBody.objects.filter(hash=body.hash).update(created_at=created_at, last_used_at=created_at)
+        return log
+
+    def prune(self, *args):
+        call_command('prune_notification_logs', '--days', '30', '--batch-size', '2', *args, stdout=StringIO())
+
+    def test_deletes_old_logs_bodies_and_event_ids(self):
+        for n in range(3):
+            self.create_log('old', age_days=60, status='failed' if n else 'sent')
+        kept = self.create_log('recent', age_days=1)
+        # A shared body stays while a recent log still uses it
+        shared = self.create_log('shared', age_days=60)
+        shared_recent = self.create_log('shared', age_days=1)
+        ProcessedEvent.objects.create(event_id='old-event')
+        ProcessedEvent.objects.filter(event_id='old-event').update(created_at=timezone.now() - timedelta(days=60))
+        ProcessedEvent.objects.create(event_id='new-event')
+
+        self.prune()
+
+        self.assertEqual(set(NotificationLog.objects.values_list('id', flat=True)), {kept.id, shared_recent.id})
+        self.assertFalse(NotificationLog.objects.filter(id=shared.id).exists())
+        self.assertEqual(set(NotificationBody.objects.values_list('html_body', flat=True)), {'recent', 'shared'})
+        self.assertEqual(list(ProcessedEvent.objects.values_list('event_id', flat=True)), ['new-event'])
+
+    def test_keeps_an_old_body_reused_by_a_log_being_written(self):
+        old = self.create_log('reused', age_days=60)
+        NotificationLog.objects.filter(id=old.id).delete()
+        log = NotificationLog(
+            recipient_email='admin@example.com',
+            subject='reused',
+            body=NotificationBody(hash=old.body_id, html_body='reused', text_body='text')
+        )
+
+        # The consumer has upserted the body but not yet inserted its log
+        with mock.patch.object(NotificationLog.objects, 'bulk_create'):
+            NotificationService().record_notifications([log])
+        self.prune()
+
+        body = NotificationBody.objects.get(hash=old.body_id)
+        self.assertGreater(body.last_used_at, timezone.now() - timedelta(days=1))
+        self.assertLess(body.created_at, timezone.now() - timedelta(days=30))
+
+    def test_archives_pruned_logs(self):
+        old = self.create_log('old', age_days=60)
+        self.create_log('recent', age_days=1)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'logs.jsonl.gz')
+
+        self.prune('--archive', path)
+
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual([row['id'] for row in rows], [str(old.id)])
+        self.assertEqual((rows[0]['html_body'], rows[0]['text_body']), ('old', 'text'))
+
+
+@override_settings(NOTIFICATION_RESEND_BASE_DELAY=60, NOTIFICATION_MAX_SEND_ATTEMPTS=3)
+class ResendFailedNotificationsTests(TestCase):
+    def create_failed_log(self, due_in=-1, attempts=1):
+        body, _ = NotificationBody.objects.get_or_create(
+            hash=NotificationBody.hash_for('<p>Low</p>', 'Low'), defaults={'html_body': '<p>Low</p>', 'text_body': 'Low'}
+        )
+        return NotificationLog.objects.create(
+            recipient_email='admin@example.com', subject='Low stock', body=body, status='failed',
+            attempts=attempts, next_attempt_at=timezone.now() + timedelta(seconds=due_in)
+        )
+
+    def resend(self):
+        call_command('resend_failed_notifications', '--once', stdout=StringIO())
+
+    def test_due_emails_are_resent(self):
+        log = self.create_failed_log()
+
+        self.resend()
+
+        log.refresh_from_db()
+        self.assertEqual((log.status, log.attempts, log.next_attempt_at), ('sent', 2, None))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].body, 'Low')
+        self.assertEqual(mail.outbox[0].alternatives[0][0], '<p>Low</p>')
+
+    def test_emails_not_yet_due_are_left_alone(self):
+        log = self.create_failed_log(due_in=60)
+
+        self.resend()
+
+        log.refresh_from_db()
+        self.assertEqual((log.status, log.attempts), ('failed', 1))
+        self.assertEqual(mail.outbox, [])
+
+    def test_transient_failure_backs_off(self):
+        log = self.create_failed_log()
+        error = smtplib.SMTPResponseException(421, 'try later')
+
+        with mock.patch.object(NotificationService, 'deliver', side_effect=error):
+            before = timezone.now()
+            self.resend()
+
+        log.refresh_from_db()
+        self.assertEqual((log.status, log.attempts), ('failed', 2))
+        # Second attempt failed, so the third waits base * 2 seconds
+        self.assertGreaterEqual(log.next_attempt_at, before + timedelta(seconds=120))
+        self.assertLess(log.next_attempt_at, timezone.now() + timedelta(seconds=121))
+
+    def test_permanent_failure_or_last_attempt_stops_retrying(self):
+        rejected = self.create_failed_log()
+        with mock.patch.object(NotificationService, 'deliver', side_effect=smtplib.SMTPResponseException(550, 'no')):
+            self.resend()
+        rejected.refresh_from_db()
+        self.assertEqual((rejected.status, rejected.next_attempt_at), ('failed', None))
+
+        exhausted = self.create_failed_log(attempts=2)
+        with mock.patch.object(NotificationService, 'deliver', side_effect=smtplib.SMTPServerDisconnected()):
+            self.resend()
+        exhausted.refresh_from_db()
+        self.assertEqual((exhausted.attempts, exhausted.next_attempt_at), (3, None))
+
+
+class RejectTests(TestCase):
+    def setUp(self):
+        self.consumer = RabbitMQConsumer()
+        self.consumer.retry_delays = [10, 60]
+        self.channel = mock.Mock()
+
+    def reject(self, headers=None, retry=True):
+        properties = mock.Mock(headers=headers, content_type='application/json')
+        self.consumer.reject(self.channel, 7, properties, b'{}', ValueError('boom'), retry=retry)
+        publish = self.channel.basic_publish.call_args.kwargs
+        return publish['routing_key'], publish['properties'].headers
+
+    def test_failures_walk_the_retry_queues(self):
+        self.assertEqual(self.reject(), (services.retry_queue(10), {'x-retry-count': 1, 'x-last-error': 'boom'}))
+        self.assertEqual(self.reject({'x-retry-count': 1})[0], services.retry_queue(60))
+        self.assertEqual(self.channel.basic_publish.call_args.kwargs['exchange'], services.RETRY_EXCHANGE)
+        self.channel.basic_ack.assert_called_with(delivery_tag=7)
+
+    def test_exhausted_or_unretryable_messages_are_dead_lettered(self):
+        self.assertEqual(self.reject({'x-retry-count': 2})[0], services.DEAD_LETTER_QUEUE)
+        self.assertEqual(self.reject(retry=False)[0], services.DEAD_LETTER_QUEUE)
+
+    def test_message_is_requeued_when_it_cannot_be_moved(self):
+        self.channel.basic_publish.side_effect = OSError('connection lost')
+        self.consumer.reject(self.channel, 7, None, b'{}', ValueError('boom'))
+
+        self.channel.basic_nack.assert_called_once_with(delivery_tag=7, requeue=True)
+        self.channel.basic_ack.assert_not_called()
+
+
+class ProcessLowStockMessageTests(TestCase):
+    def setUp(self):
+        self.consumer = RabbitMQConsumer()
+        self.consumer.retry_delays = [10]
+        self.consumer.executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.consumer.executor.shutdown)
+        # Callbacks the workers hand to the connection thread, run by the test
+        self.connection_callbacks = []
+        self.consumer.connection = mock.Mock()
+        self.consumer.connection.add_callback_threadsafe.side_effect = self.connection_callbacks.append
+        self.channel = mock.Mock()
+
+    def process(self, body):
+        method = mock.Mock(delivery_tag=7)
+        properties = mock.Mock(headers=None, content_type='application/json')
+        self.consumer.process_low_stock_message(self.channel, method, properties, body)
+
+    def run_connection_callbacks(self):
+        self.consumer.executor.shutdown(wait=True)
+        for callback in self.connection_callbacks:
+            callback()
+
+    def test_message_is_acked_only_once_it_is_handled(self):
+        handled = threading.Event()
+
+        def handle(message):
+            handled.wait(timeout=5)
+            return 2, 1
+
+        with mock.patch.object(self.consumer, 'handle_low_stock_message', side_effect=handle):
+            self.process(json.dumps(low_stock_message()))
+            self.assertEqual(self.consumer.metrics.snapshot()['in_flight'], 1)
+            self.assertEqual(self.connection_callbacks, [])
+            handled.set()
+            self.run_connection_callbacks()
+
+        self.channel.basic_ack.assert_called_once_with(delivery_tag=7)
+        self.channel.basic_publish.assert_not_called()
+        snapshot = self.consumer.metrics.snapshot()
+        self.assertEqual(
+            (snapshot['in_flight'], snapshot['messages_processed'], snapshot['emails_sent'], snapshot['emails_failed']),
+            (0, 1, 2, 1)
+        )
+
+    def test_worker_error_moves_the_message_to_a_retry_queue(self):
+        with mock.patch.object(self.consumer, 'handle_low_stock_message', side_effect=RuntimeError('db down')):
+            self.process(json.dumps(low_stock_message()))
+            self.run_connection_callbacks()
+
+        publish = self.channel.basic_publish.call_args.kwargs
+        self.assertEqual(publish['routing_key'], services.retry_queue(10))
+        self.assertEqual(publish['properties'].headers['x-last-error'], 'db down')
+        self.channel.basic_ack.assert_called_once_with(delivery_tag=7)
+        self.assertEqual(self.consumer.metrics.snapshot()['messages_failed'], 1)
+
+    def test_malformed_message_is_dead_lettered_without_reaching_a_worker(self):
+        with mock.patch.object(self.consumer, 'handle_low_stock_message') as handle:
+            self.process(b'not json')
+            self.process(json.dumps({'type': 'low_stock_alert'}))
+
+        handle.assert_not_called()
+        routing_keys = [call.kwargs['routing_key'] for call in self.channel.basic_publish.call_args_list]
+        self.assertEqual(routing_keys, [services.DEAD_LETTER_QUEUE] * 2)
+        self.assertEqual(self.consumer.metrics.snapshot()['in_flight'], 0)
+
+
+class ConsumerMetricsTests(TestCase):
+    def test_snapshot_reports_counts_and_rates(self):
+        with mock.patch.object(services.time, 'monotonic', side_effect=[100.0, 110.0]):
+            metrics = services.ConsumerMetrics()
+            for _ in range(3):
+                metrics.message_started()
+            metrics.message_finished(4, 1)
+            metrics.message_finished(0, 0, ok=False)
+            metrics.digest_sent(6, 0)
+            snapshot = metrics.snapshot()
+
+        self.assertEqual(snapshot, {
+            'uptime_seconds': 10.0,
+            'messages_processed': 1,
+            'messages_failed': 1,
+            'emails_sent': 10,
+            'emails_failed': 1,
+            'digests_sent': 1,
+            'in_flight': 1,
+            'messages_per_second': 0.1,
+            'emails_per_second': 1.0,
+        })
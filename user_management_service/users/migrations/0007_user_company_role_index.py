@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_assigned_store'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['company_id', 'role'], name='users_company_role_idx'),
+        ),
+    ]
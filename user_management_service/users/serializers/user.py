@@ -43,4 +43,10 @@ class UserSerializer(serializers.ModelSerializer):
             instance.set_password(password)
             
         instance.save()
-        return instance 
\ No newline at end of file
+        return instance 
+
+
+class RecipientSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'email', 'first_name', 'last_name', 'role', 'assigned_store']
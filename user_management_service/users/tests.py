@@ -1,3 +1,44 @@
+import uuid
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from users.models.user import User
 
-# Create your tests here.
+
+class RecipientListViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('user-recipients')
+        self.company_id = uuid.uuid4()
+        self.store_id = str(uuid.uuid4())
+
+    def create_user(self, email, role, company_id=None, **extra):
+        return User.objects.create_user(
+            email=email,
+            first_name='Test',
+            last_name='User',
+            role=role,
+            company_id=company_id or self.company_id,
+            **extra
+        )
+
+    def test_lists_company_admins_and_the_store_stock_managers(self):
+        self.create_user('admin@example.com', 'admin')
+        self.create_user('owner@example.com', 'super_admin')
+        self.create_user('stock@example.com', 'stock_manager', assigned_store=self.store_id)
+        self.create_user('other-store@example.com', 'stock_manager', assigned_store=str(uuid.uuid4()))
+        self.create_user('sales@example.com', 'sales', assigned_store=self.store_id)
+        self.create_user('inactive@example.com', 'admin', is_active=False)
+        self.create_user('other-company@example.com', 'admin', company_id=uuid.uuid4())
+
+        response = self.client.get(self.url, {'company_id': str(self.company_id), 'store_id': self.store_id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(user['email'] for user in response.data),
+            ['admin@example.com', 'owner@example.com', 'stock@example.com']
+        )
+
+    def test_requires_a_valid_company_id(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'company_id': 'not-a-uuid'}).status_code, 400)
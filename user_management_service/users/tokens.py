@@ -0,0 +1,18 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class UserRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's profile claims. Access tokens derived
+    from it (including on refresh) copy the claims, so other services can
+    authorize requests from a locally verified token alone.
+    """
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['email'] = user.email
+        token['role'] = user.role
+        token['company_id'] = str(user.company_id) if user.company_id else ''
+        token['first_name'] = user.first_name
+        token['last_name'] = user.last_name
+        return token
@@ -1,4 +1,4 @@
-from .user import UserListView, UserDetailView
+from .user import UserListView, UserDetailView, RecipientListView
 from .role import RoleListView, RoleDetailView, PermissionListView, PermissionDetailView
 from .activity import ActivityLogView
 from .auth import (
@@ -9,6 +9,7 @@ from .auth import (
 __all__ = [
     'UserListView',
     'UserDetailView',
+    'RecipientListView',
     'RoleListView',
     'RoleDetailView',
     'PermissionListView',
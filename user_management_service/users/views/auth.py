@@ -15,6 +15,7 @@ from django.utils.crypto import get_random_string
 from django.core.mail import send_mail
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from users.tokens import UserRefreshToken
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 from drf_spectacular.types import OpenApiTypes
 
@@ -319,7 +320,7 @@ class VerifyOTPView(APIView):
         if otp_object.is_expired():
             return Response({"error": "OTP has expired"}, status=status.HTTP_400_BAD_REQUEST)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         access_token = str(refresh.access_token)
 
         if user.role == 'stock_manager' or user.role == 'sales':
@@ -484,7 +485,9 @@ class VerifyTokenView(APIView):
                     'properties': {
                         'is_valid': {'type': 'boolean', 'example': True},
                         'user_id': {'type': 'string', 'format': 'uuid', 'example': "123e4567-e89b-12d3-a456-426614174000"},
-                        'email': {'type': 'string', 'format': 'email', 'example': "user@example.com"}
+                        'email': {'type': 'string', 'format': 'email', 'example': "user@example.com"},
+                        'role': {'type': 'string', 'example': "admin"},
+                        'company_id': {'type': 'string', 'format': 'uuid', 'example': "123e4567-e89b-12d3-a456-426614174000"}
                     }
                 }
             ),
@@ -520,6 +523,9 @@ class VerifyTokenView(APIView):
                 'user_id': str(user.id),
                 'email': user.email,
                 'role' : user.role,
+                'company_id': str(user.company_id) if user.company_id else '',
+                'first_name': user.first_name,
+                'last_name': user.last_name,
             }, status=status.HTTP_200_OK)
 
         except (InvalidToken, TokenError, User.DoesNotExist):
@@ -1,11 +1,13 @@
+import uuid
 from django.http import Http404
 from rest_framework.views import APIView
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework import status
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from django.db.models import Q
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from users.models.user import User
-from users.serializers.user import UserSerializer
+from users.serializers.user import RecipientSerializer, UserSerializer
 from rest_framework.permissions import AllowAny
 
 class UserListView(APIView):
@@ -43,6 +45,41 @@ class UserListView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class RecipientListView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        summary="List notification recipients",
+        description="Get the active users of a company who receive a store's stock alerts: "
+                    "every admin and super admin, plus the stock managers assigned to the store",
+        tags=['Users'],
+        parameters=[
+            OpenApiParameter(name='company_id', type=str, required=True, description='Company UUID'),
+            OpenApiParameter(name='store_id', type=str, required=False, description='Store UUID'),
+        ],
+        responses={
+            200: RecipientSerializer(many=True),
+            400: OpenApiResponse(description="Bad Request")
+        }
+    )
+    def get(self, request: Request):
+        company_id = request.query_params.get('company_id')
+        store_id = request.query_params.get('store_id')
+        try:
+            company_id = uuid.UUID(str(company_id))
+        except ValueError:
+            return Response({'error': 'A valid company_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        recipients = Q(role__in=['admin', 'super_admin'])
+        if store_id:
+            recipients |= Q(role='stock_manager', assigned_store=store_id)
+
+        users = User.objects.filter(recipients, company_id=company_id, is_active=True)
+        serializer = RecipientSerializer(users, many=True)
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
+
+
 class UserDetailView(APIView):
     def get_user(self, id):
         try: